@@ -0,0 +1,8 @@
+"""Benchmarks for the GeoSeeq API client.
+
+These are not run by the test suite. They run against the in-memory stand
+in server from `geoseeq.testing`, so no GeoSeeq account is needed. Run
+the whole suite with `python -m benchmarks -o results.json` or a single
+benchmark module directly, e.g. `python -m benchmarks.bench_pagination`.
+Results are JSON; compare two runs with `python -m benchmarks.compare`.
+"""
@@ -0,0 +1,48 @@
+"""Run the benchmark suite and write the results as JSON.
+
+```
+python -m benchmarks -o results.json          # quick run
+python -m benchmarks --full -o results.json   # 100k sample projects and 1GB files
+python -m benchmarks.compare old.json new.json
+```
+"""
+import argparse
+import sys
+
+from . import bench_cache, bench_cli_startup, bench_knex_logging, bench_memory, bench_pagination, bench_transfer
+from .common import environment_info, write_results
+
+
+def suites(full=False):
+    return {
+        "pagination": lambda: bench_pagination.run(
+            bench_pagination.FULL_SAMPLE_COUNTS if full else bench_pagination.DEFAULT_SAMPLE_COUNTS
+        ),
+        "file_system_cache": bench_cache.run,
+        "transfer": lambda: bench_transfer.run(
+            bench_transfer.FULL_FILE_SIZES if full else bench_transfer.DEFAULT_FILE_SIZES
+        ),
+        "cli_startup": bench_cli_startup.run,
+        "knex_logging": bench_knex_logging.run,
+        "memory": bench_memory.run,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Include the largest projects and files")
+    parser.add_argument("--only", nargs="+", default=None, help="Names of the suites to run")
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    to_run = suites(full=args.full)
+    if args.only:
+        to_run = {name: to_run[name] for name in args.only}
+    results = {"environment": environment_info(), "full": args.full, "results": {}}
+    for name, func in to_run.items():
+        print(f"Running {name}", file=sys.stderr)
+        results["results"][name] = func()
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""Benchmark blob cache hit and miss latency.
+
+For each cache backend, the cache is first filled with `prefill` unrelated
+entries, since lookups in a crowded cache are the slow case. Blobs of a few
+sizes are then cached in a temporary directory, read back (hits) and looked
+up under keys that were never cached (misses).
+"""
+import argparse
+import os
+import sys
+import tempfile
+from unittest import mock
+
+from geoseeq import file_system_cache
+from geoseeq.cache_backends import MemoryBlobCache
+from geoseeq.file_system_cache import FileSystemCache
+from geoseeq.memory_cache import MemoryCache, TieredCache
+from geoseeq.sqlite_cache import SqliteCache
+
+from .common import time_repeats, write_results
+
+DEFAULT_BLOB_SIZES = (10, 1000, 10000)  # number of entries in the blob
+BACKENDS = {
+    "file_system": lambda cache_dir: FileSystemCache(),
+    "sqlite": lambda cache_dir: SqliteCache(path=os.path.join(cache_dir, "blobs.sqlite3")),
+    "memory": lambda cache_dir: MemoryBlobCache(),
+    "memory_and_sqlite": lambda cache_dir: TieredCache(
+        SqliteCache(path=os.path.join(cache_dir, "blobs.sqlite3")), memory=MemoryCache()
+    ),
+}
+
+
+def make_blob(n_entries):
+    return {"results": [{"uuid": f"{i:036d}", "name": f"sample_{i}", "metadata": {}} for i in range(n_entries)]}
+
+
+def bench_backend(make_cache, cache_dir, blob_sizes, n_keys, prefill, repeats):
+    cache = make_cache(cache_dir)
+    small_blob = make_blob(1)
+    for i in range(prefill):
+        cache.cache_blob(f"prefill/{i}", small_blob)
+    cases = []
+    for n_entries in blob_sizes:
+        blob = make_blob(n_entries)
+        keys = [f"bench/{n_entries}/{i}" for i in range(n_keys)]
+        missing = [f"missing/{n_entries}/{i}" for i in range(n_keys)]
+
+        def write():
+            for key in keys:
+                cache.cache_blob(key, blob)
+            if hasattr(cache, "flush"):
+                cache.flush()
+
+        write_timing = time_repeats(write, repeats=1)
+        hit = time_repeats(lambda: [cache.get_cached_blob(key) for key in keys], repeats=repeats)
+        miss = time_repeats(lambda: [cache.get_cached_blob(key) for key in missing], repeats=repeats)
+        cases.append({
+            "blob_entries": n_entries,
+            "write_latency_sec": write_timing["median_sec"] / n_keys,
+            "hit_latency_sec": hit["median_sec"] / n_keys,
+            "miss_latency_sec": miss["median_sec"] / n_keys,
+        })
+    return cases
+
+
+def run(blob_sizes=DEFAULT_BLOB_SIZES, n_keys=200, prefill=2000, repeats=5, backends=tuple(BACKENDS)):
+    results = {"n_keys": n_keys, "prefill": prefill, "cases": []}
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"}), \
+                mock.patch.object(file_system_cache, "CACHE_DIR", cache_dir):
+            for case in bench_backend(BACKENDS[backend], cache_dir, blob_sizes, n_keys, prefill, repeats):
+                results["cases"].append(dict(case, backend=backend))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blob-sizes", type=int, nargs="+", default=list(DEFAULT_BLOB_SIZES))
+    parser.add_argument("--n-keys", type=int, default=200)
+    parser.add_argument("--prefill", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    results = run(args.blob_sizes, n_keys=args.n_keys, prefill=args.prefill, backends=args.backends)
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""Benchmark CLI startup time.
+
+Each command runs in a fresh interpreter. `import geoseeq` is included as
+a baseline for the cost of the library itself, along with the slowest
+modules it imports according to `python -X importtime`.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from .common import write_results
+
+COMMANDS = {
+    "python": [sys.executable, "-c", "pass"],
+    "import_geoseeq": [sys.executable, "-c", "import geoseeq"],
+    "cli_version": [sys.executable, "-c", "from geoseeq.cli import main; main()", "version"],
+    "cli_help": [sys.executable, "-c", "from geoseeq.cli import main; main()", "--help"],
+}
+
+
+def time_command(cmd, repeats):
+    times, returncode, stderr = [], None, b""
+    for _ in range(repeats):
+        start = perf_counter()
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(perf_counter() - start)
+        returncode, stderr = proc.returncode, proc.stderr
+    result = {"median_sec": statistics.median(times), "min_sec": min(times), "returncode": returncode}
+    if returncode:
+        result["error"] = stderr.decode("utf-8", errors="replace").strip().splitlines()[-1:]
+    return result
+
+
+def slowest_imports(code="import geoseeq", n=15):
+    """Return the modules with the highest cumulative import time, in seconds."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "cumulative_sec": int(cumulative) / 1e6})
+    return sorted(rows, key=lambda row: -row["cumulative_sec"])[:n]
+
+
+def run(repeats=5):
+    results = {name: time_command(cmd, repeats) for name, cmd in COMMANDS.items()}
+    results["slowest_imports"] = slowest_imports()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    write_results(run(args.repeats), args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
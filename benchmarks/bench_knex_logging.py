@@ -0,0 +1,83 @@
+"""Microbenchmark for the cost of debug logging on the Knex request path.
+
+Sends a large JSON POST through a Knex whose session never touches the
+network, with debug logging disabled and enabled. The old request path
+built and formatted a logging dict with the full body on every request
+regardless of log level, `legacy_formatting` times just that step.
+"""
+import argparse
+import json
+import logging
+from time import perf_counter
+
+from requests.models import Response
+
+from geoseeq import Knex
+
+logger = logging.getLogger("geoseeq_api")
+
+
+class NullSession:
+    """A requests Session stand in that returns an empty 200 response."""
+
+    headers = {}
+
+    def request(self, method, url, data=None, headers=None):
+        response = Response()
+        response.status_code = 200
+        response._content = b"{}"
+        return response
+
+    def close(self):
+        pass
+
+
+def make_body(n_samples):
+    return {
+        "samples": [
+            {"name": f"sample_{i}", "library": "0" * 36, "metadata": {"key": "value" * 10}}
+            for i in range(n_samples)
+        ]
+    }
+
+
+def time_calls(func, n_calls):
+    start = perf_counter()
+    for _ in range(n_calls):
+        func()
+    return (perf_counter() - start) / n_calls
+
+
+def run(n_samples=10000, n_calls=20):
+    knex = Knex("http://localhost", compress_threshold=None)
+    knex.sess = NullSession()
+    body = make_body(n_samples)
+    results = {"body_bytes": len(json.dumps(body)), "n_calls": n_calls}
+
+    original_level = logger.level
+    try:
+        logger.setLevel(logging.WARNING)
+        results["post_debug_off_sec"] = time_calls(lambda: knex.post("bulk_samples", json=body), n_calls)
+        logger.setLevel(logging.DEBUG)
+        results["post_debug_on_sec"] = time_calls(lambda: knex.post("bulk_samples", json=body), n_calls)
+    finally:
+        logger.setLevel(original_level)
+
+    def legacy_formatting():
+        d = {"endpoint_url": knex.endpoint_url, "headers": knex.headers, "url": "bulk_samples", "json": body}
+        return f"Sending POST request. {d}"
+
+    results["legacy_formatting_sec"] = time_calls(legacy_formatting, n_calls)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, default=10000)
+    parser.add_argument("--n-calls", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(n_samples=args.n_samples, n_calls=args.n_calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark the memory footprint of listed objects.
+
+Listing a large project creates one `Sample` per sample and one
+`ResultFolder` and `ResultFile` per folder and file. This builds `n_objects`
+of each from blobs, as listings do, plus the records listings return with
+`records=True`. It reports the bytes allocated per object (measured with
+tracemalloc), the time to build each and the time to set a remote field.
+No server is needed.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from unittest import mock
+from uuid import uuid4
+
+from geoseeq import Knex, Organization
+from geoseeq.sample import Sample
+
+from .common import time_repeats, write_results
+
+DEFAULT_N_OBJECTS = 10 * 1000
+
+
+def sample_blob(i):
+    return {
+        "uuid": str(uuid4()), "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+        "name": f"sample_{i:06d}", "metadata": {}, "library": None, "description": "",
+    }
+
+
+def folder_blob():
+    return {
+        "uuid": str(uuid4()), "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+        "module_name": "reads", "replicate": None, "description": "", "is_private": False,
+    }
+
+
+def file_blob():
+    return {
+        "uuid": str(uuid4()), "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z",
+        "name": "read_1", "stored_data": {}, "pipeline_run": None,
+    }
+
+
+def make_blobs(kind, n_objects):
+    if kind in ("sample", "sample_record"):
+        return [sample_blob(i) for i in range(n_objects)]
+    if kind == "result_folder":
+        return [folder_blob() for _ in range(n_objects)]
+    return [file_blob() for _ in range(n_objects)]
+
+
+def build(kind, project, blobs):
+    """Return a loaded object of `kind` for each blob, sharing one parent."""
+    if kind == "sample_record":
+        record_type, fields = Sample.record_type(), Sample.remote_fields
+        return [record_type(*[blob.get(field) for field in fields], project) for blob in blobs]
+    if kind == "sample":
+        return [_loaded(project.sample(blob["name"]), blob) for blob in blobs]
+    sample = project.sample("parent sample")
+    if kind == "result_folder":
+        return [_loaded(sample.result_folder(blob["module_name"]), blob) for blob in blobs]
+    folder = sample.result_folder("reads")
+    return [_loaded(folder.result_file(blob["name"]), blob) for blob in blobs]
+
+
+def _loaded(obj, blob):
+    obj.load_blob(blob)
+    obj._already_fetched = True
+    obj._modified = False
+    return obj
+
+
+def bytes_per_object(kind, project, n_objects):
+    """Return the bytes allocated by building `n_objects`, divided by `n_objects`.
+
+    The blobs are built first so only the objects themselves are counted.
+    """
+    blobs = make_blobs(kind, n_objects)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build(kind, project, blobs)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / n_objects
+
+
+def run(n_objects=DEFAULT_N_OBJECTS, repeats=5):
+    results = {"n_objects": n_objects, "cases": []}
+    with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}):
+        knex = Knex("http://localhost:1")  # no requests are sent
+        project = Organization(knex, "benchmarks").project("memory")
+        for kind in ("sample", "result_folder", "result_file", "sample_record"):
+            blobs = make_blobs(kind, 1000)
+            build_timing = time_repeats(lambda: build(kind, project, blobs), repeats=repeats)
+            objects = build(kind, project, blobs)
+            case = {
+                "kind": kind,
+                "bytes_per_object": bytes_per_object(kind, project, n_objects),
+                "has_dict": hasattr(objects[0], "__dict__"),
+                "build_latency_sec": build_timing["median_sec"] / len(objects),
+            }
+            if kind != "sample_record":  # records are immutable
+                field = "name" if kind != "result_folder" else "module_name"
+
+                def set_fields():
+                    for obj in objects:
+                        setattr(obj, field, getattr(obj, field))
+                        obj.url_options = obj.url_options  # not a remote field
+
+                timing = time_repeats(set_fields, repeats=repeats)
+                case["setattr_latency_sec"] = timing["median_sec"] / (2 * len(objects))
+            results["cases"].append(case)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-objects", type=int, default=DEFAULT_N_OBJECTS)
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    write_results(run(args.n_objects), args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+"""Benchmark `paginated_iterator` throughput against the stand in server.
+
+Projects with each sample count are created directly in the server state,
+then all samples are listed through `Project.get_sample_uuids`, which
+walks every page of `sample_groups/<uuid>/samples`. The blob cache is
+disabled so every page is fetched from the server.
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+from unittest import mock
+
+from geoseeq.testing import StandInServer
+from geoseeq.utils import paginated_iterator
+
+from .common import client_project, stand_in_knex, synthetic_project, write_results
+
+DEFAULT_SAMPLE_COUNTS = (10, 1000, 10000)
+FULL_SAMPLE_COUNTS = (10, 1000, 10000, 100000)
+
+
+def bench_listing(knex, project):
+    url = f"sample_groups/{project.uuid}/samples"
+    start = perf_counter()
+    n_samples = sum(1 for _ in paginated_iterator(knex, url))
+    seconds = perf_counter() - start
+    return {
+        "n_samples": n_samples,
+        "elapsed_sec": seconds,
+        "samples_per_sec": n_samples / seconds if seconds else None,
+    }
+
+
+def run(sample_counts=DEFAULT_SAMPLE_COUNTS, page_size=100, latency=0.0):
+    results = {"page_size": page_size, "latency_sec": latency, "cases": []}
+    with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}), \
+            StandInServer(page_size=page_size, latency=latency) as server:
+        knex = stand_in_knex(server)
+        for n_samples in sample_counts:
+            project = client_project(knex, synthetic_project(server, n_samples))
+            server.reset_requests()
+            case = {"project_samples": n_samples}
+            try:
+                case.update(bench_listing(knex, project))
+            except Exception as e:  # record failures so one case does not sink a run
+                case["error"] = repr(e)
+            case["n_requests"] = len(server.requests)
+            results["cases"].append(case)
+        knex.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sample-counts", type=int, nargs="+", default=list(DEFAULT_SAMPLE_COUNTS))
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of server latency per request")
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    write_results(run(args.sample_counts, page_size=args.page_size, latency=args.latency), args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+"""Benchmark multipart upload, download and md5 throughput.
+
+Synthetic files are uploaded to the stand in server with
+`multipart_upload_file` at several thread counts, downloaded again with
+`ResultFile.download`, and hashed with `md5_checksum`. Transfers stay on
+localhost, so the numbers measure client overhead rather than network
+bandwidth.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+from unittest import mock
+
+from geoseeq.constants import FIVE_MB
+from geoseeq.testing import StandInServer
+from geoseeq.utils import md5_checksum
+
+from .common import KB, MB, GB, client_project, human_size, make_file, stand_in_knex, \
+    synthetic_project, time_repeats, write_results
+
+DEFAULT_FILE_SIZES = (64 * KB, 16 * MB, 128 * MB)
+FULL_FILE_SIZES = (64 * KB, 16 * MB, 128 * MB, 1 * GB)
+DEFAULT_THREAD_COUNTS = (1, 2, 4, 8)
+
+
+def mb_per_sec(n_bytes, seconds):
+    return (n_bytes / MB) / seconds if seconds else None
+
+
+def bench_md5(path, n_bytes, repeats=3):
+    timing = time_repeats(lambda: md5_checksum(path), repeats=repeats)
+    return {"file_size": n_bytes, "elapsed_sec": timing["median_sec"],
+            "mb_per_sec": mb_per_sec(n_bytes, timing["median_sec"])}
+
+
+def run(file_sizes=DEFAULT_FILE_SIZES, thread_counts=DEFAULT_THREAD_COUNTS, chunk_size=FIVE_MB):
+    results = {"chunk_size": chunk_size, "upload": [], "download": [], "md5": []}
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}), \
+            StandInServer() as server:
+        knex = stand_in_knex(server)
+        project = client_project(knex, synthetic_project(server, 1, project_name="transfers"))
+        folder = project.sample("sample_000000").get().result_folder("benchmarks").idem()
+        for n_bytes in file_sizes:
+            path = make_file(tmpdir, n_bytes)
+            results["md5"].append(bench_md5(path, n_bytes))
+            for threads in thread_counts:
+                result_file = folder.result_file(f"{human_size(n_bytes)}_{threads}_threads").idem()
+                start = perf_counter()
+                result_file.multipart_upload_file(path, n_bytes, chunk_size=chunk_size, threads=threads)
+                seconds = perf_counter() - start
+                results["upload"].append({
+                    "file_size": n_bytes, "threads": threads, "elapsed_sec": seconds,
+                    "mb_per_sec": mb_per_sec(n_bytes, seconds),
+                })
+
+            result_file = folder.result_file(f"{human_size(n_bytes)}_{thread_counts[0]}_threads").get()
+            download_path = os.path.join(tmpdir, "download.bin")
+            start = perf_counter()
+            result_file.download(filename=download_path, cache=False)
+            seconds = perf_counter() - start
+            results["download"].append({
+                "file_size": n_bytes, "elapsed_sec": seconds, "mb_per_sec": mb_per_sec(n_bytes, seconds),
+            })
+            os.remove(download_path)
+            os.remove(path)
+            server.state.s3_objects.clear()  # keep server memory bounded for GB sized files
+        knex.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file-sizes", type=int, nargs="+", default=list(DEFAULT_FILE_SIZES),
+                        help="File sizes in bytes")
+    parser.add_argument("--threads", type=int, nargs="+", default=list(DEFAULT_THREAD_COUNTS))
+    parser.add_argument("--chunk-size", type=int, default=FIVE_MB)
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    write_results(run(args.file_sizes, args.threads, chunk_size=args.chunk_size), args.output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""Shared helpers for the benchmark suite."""
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+from importlib import metadata
+from time import perf_counter
+
+from geoseeq import Knex, Organization
+from geoseeq.constants import FIVE_MB
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+
+def human_size(n_bytes):
+    for unit, size in (("GB", GB), ("MB", MB), ("KB", KB)):
+        if n_bytes >= size:
+            return f"{n_bytes / size:g}{unit}"
+    return f"{n_bytes}B"
+
+
+def time_repeats(func, repeats=5):
+    """Call `func` `repeats` times and return timing statistics in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return {
+        "repeats": repeats,
+        "min_sec": min(times),
+        "median_sec": statistics.median(times),
+        "max_sec": max(times),
+    }
+
+
+def environment_info():
+    """Return details of the machine and package versions a run used."""
+    try:
+        version = metadata.version("geoseeq")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "geoseeq_version": version,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_results(results, path=None):
+    """Write results as JSON to `path`, or stdout if `path` is None."""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path is None:
+        print(text)
+        return
+    with open(path, "w") as f:
+        f.write(text + "\n")
+
+
+def stand_in_knex(server):
+    """Return a knex authenticated against a stand in server."""
+    knex = Knex(server.url)
+    knex.add_api_token("benchmark-token")
+    return knex
+
+
+def synthetic_project(server, n_samples, project_name=None):
+    """Create a project with `n_samples` samples directly in the server state.
+
+    Bypassing HTTP keeps setup fast for projects with 100k samples.
+    """
+    state = server.state
+    with state.lock:
+        try:
+            org_uuid = state.find_org("benchmarks")
+        except Exception:
+            org_uuid = state.create_org({"name": "benchmarks"})["uuid"]
+        project = state.create_project({
+            "organization": org_uuid,
+            "name": project_name or f"project with {n_samples} samples",
+        })
+        for i in range(n_samples):
+            state.create_sample({"library": project["uuid"], "name": f"sample_{i:06d}"})
+    return project
+
+
+def client_project(knex, server_project):
+    """Return a client side Project for a project made by `synthetic_project`."""
+    return Organization(knex, "benchmarks").project(server_project["name"]).get()
+
+
+def make_file(directory, n_bytes, name=None, block_size=FIVE_MB):
+    """Write a file of `n_bytes` pseudo random bytes and return its path."""
+    path = os.path.join(directory, name or f"synthetic_{n_bytes}.bin")
+    block = os.urandom(min(n_bytes, block_size))
+    with open(path, "wb") as f:
+        remaining = n_bytes
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+    return path
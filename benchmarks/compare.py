@@ -0,0 +1,75 @@
+"""Compare two benchmark result files.
+
+Prints every numeric timing, throughput or memory footprint present in both
+files with the ratio new / old. Timings (`*_sec`) and footprints
+(`bytes_per_object`) that grew, or throughputs (`*_per_sec`) that shrank, by
+more than `--threshold` are flagged as regressions and make the command exit
+with status 1.
+"""
+import argparse
+import json
+import sys
+
+
+# Keys that describe a benchmark case rather than measure it
+PARAMETER_KEYS = ("backend", "project_samples", "blob_entries", "file_size", "threads", "module", "kind")
+
+
+def case_label(case):
+    """Label list entries by their parameters so reordered cases still match."""
+    return ",".join(f"{key}={case[key]}" for key in PARAMETER_KEYS if key in case)
+
+
+def flatten(obj, prefix=""):
+    out = {}
+    if isinstance(obj, dict):
+        for key, val in obj.items():
+            out.update(flatten(val, f"{prefix}{key}."))
+    elif isinstance(obj, list):
+        for i, val in enumerate(obj):
+            label = (case_label(val) if isinstance(val, dict) else "") or str(i)
+            out.update(flatten(val, f"{prefix}[{label}]."))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix[:-1]] = obj
+    return out
+
+
+def is_regression(key, ratio, threshold):
+    if key.endswith("per_sec"):
+        return ratio < 1 - threshold
+    if key.endswith(("_sec", "bytes_per_object")):
+        return ratio > 1 + threshold
+    return False
+
+
+def compare(old, new, threshold=0.1):
+    old_values, new_values = flatten(old["results"]), flatten(new["results"])
+    rows = []
+    for key in sorted(set(old_values) & set(new_values)):
+        if not key.endswith(("sec", "bytes_per_object")) or not old_values[key]:
+            continue
+        ratio = new_values[key] / old_values[key]
+        rows.append((key, old_values[key], new_values[key], ratio, is_regression(key, ratio, threshold)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(old, new, threshold=args.threshold)
+    for key, old_val, new_val, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{key}\t{old_val:.6g}\t{new_val:.6g}\t{ratio:.3f}\t{flag}")
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
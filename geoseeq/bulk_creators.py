@@ -6,50 +6,179 @@ from .blob_constructors import (
 )
 import json
 
+from .utils import invalidate_listing, paginated_iterator
+
+BULK_CHUNK_SIZE = 100
+
+# (bulk endpoint, key of the object list in its body and response, fields that identify an object,
+#  listing of the objects under a parent)
+BULK_SAMPLES = ("bulk_samples", "samples", ("library", "name"), "sample_groups/{}/samples")
+BULK_SAMPLE_RESULT_FOLDERS = (
+    "bulk_sample_results", "sample_results", ("sample", "module_name", "replicate"), "sample_ars?sample_id={}",
+)
+BULK_SAMPLE_RESULT_FILES = (
+    "bulk_sample_result_fields", "sample_result_fields", ("analysis_result", "name"),
+    "sample_ar_fields?analysis_result_id={}",
+)
+
+
+def bulk_key(data, key_fields):
+    """Return the fields of a blob or POST body that identify it among its siblings."""
+    return tuple(data.get(field) for field in key_fields)
+
+
+def _bulk_post(knex, bulk_endpoint, objs):
+    """POST `objs` to a bulk endpoint, return their POST bodies and the blobs returned."""
+    url, list_key = bulk_endpoint[:2]
+    post_data = [obj.get_post_data() for obj in objs]
+    result = knex.post(url, json={list_key: post_data})
+    for obj in objs:
+        obj.cache.clear_blob(obj)
+    for listing_url in {listing for obj in objs for listing in obj.listing_urls()}:
+        invalidate_listing(knex, listing_url)
+    return post_data, result[list_key]
+
+
+def bulk_post_blobs(knex, bulk_endpoint, objs):
+    """POST `objs` to a bulk endpoint and return the server blob of each, in order.
+
+    The blob of an object that already existed is None.
+    """
+    key_fields = bulk_endpoint[2]
+    post_data, blobs = _bulk_post(knex, bulk_endpoint, objs)
+    created = {bulk_key(blob, key_fields): blob for blob in blobs if blob}
+    return [created.get(bulk_key(data, key_fields)) for data in post_data]
+
 
 def bulk_create_samples(knex, samples):
     """Create multiple samples at once. Returns a list of created samples.
-    
+
     Only returns samples which were newly created.
     If a sample already exists on the server, it will not be returned.
     """
-    data = {"samples": [sample.get_post_data() for sample in samples]}
-    # print(json.dumps(data, indent=4))
-    result = knex.post("bulk_samples", json=data)
+    _, blobs = _bulk_post(knex, BULK_SAMPLES, samples)
     created_samples = [
-        sample_from_blob(knex, result_blob) for result_blob in result['samples'] if result_blob
+        sample_from_blob(knex, result_blob) for result_blob in blobs if result_blob
     ]
     return created_samples
 
 
 def bulk_create_sample_result_folders(knex, sample_results):
     """Create multiple sample results at once. Returns a list of created sample results.
-    
+
     Only returns sample results which were newly created.
     If a sample result already exists on the server, it will not be returned.
     """
-    data = {"sample_results": [sample_result.get_post_data() for sample_result in sample_results]}
-    result = knex.post(
-        "bulk_sample_results",
-        json=data,
-    )
+    _, blobs = _bulk_post(knex, BULK_SAMPLE_RESULT_FOLDERS, sample_results)
     created_sample_result_folders = [
-        sample_result_folder_from_blob(knex, result_blob) for result_blob in result['sample_results'] if result_blob
+        sample_result_folder_from_blob(knex, result_blob) for result_blob in blobs if result_blob
     ]
     return created_sample_result_folders
 
 
 def bulk_create_sample_result_files(knex, sample_result_fields):
     """Create multiple sample result fields at once. Returns a list of created sample result fields.
-    
+
     Only returns sample result fields which were newly created.
-    If a sample result field already exists on the server, it will not be returned.    
+    If a sample result field already exists on the server, it will not be returned.
     """
-    result = knex.post(
-        "bulk_sample_result_fields",
-        json={"sample_result_fields": [sample_result_field.get_post_data() for sample_result_field in sample_result_fields]},
-    )
+    _, blobs = _bulk_post(knex, BULK_SAMPLE_RESULT_FILES, sample_result_fields)
     created_sample_result_files = [
-        sample_result_file_from_blob(knex, result_blob) for result_blob in result['sample_result_fields'] if result_blob
+        sample_result_file_from_blob(knex, result_blob) for result_blob in blobs if result_blob
     ]
-    return created_sample_result_files
\ No newline at end of file
+    return created_sample_result_files
+
+
+def _mark_fetched(obj, blob, allow_overwrite=False):
+    obj.load_blob(blob, allow_overwrite=allow_overwrite)
+    obj._already_fetched = True
+    obj._modified = False
+    obj._register()
+
+
+def _load_existing(knex, bulk_endpoint, parent, objs, overwritable=frozenset()):
+    """Load `objs`, which already exist under `parent`, from one listing of its children."""
+    key_fields, listing_url = bulk_endpoint[2:]
+    missing = {}
+    for obj in objs:
+        missing.setdefault(bulk_key(obj.get_post_data(), key_fields), []).append(obj)
+    for blob in paginated_iterator(knex, listing_url.format(parent.uuid)):
+        for obj in missing.pop(bulk_key(blob, key_fields), []):
+            _mark_fetched(obj, blob, allow_overwrite=id(obj) in overwritable)
+        if not missing:
+            return
+    for obj in (obj for objs in missing.values() for obj in objs):
+        obj.get(allow_overwrite=id(obj) in overwritable)  # not found in the listing, e.g. the server changed its name
+
+
+def bulk_upsert(knex, bulk_endpoint, objs, chunk_size=BULK_CHUNK_SIZE, map_fn=map, overwritable=()):
+    """Create the objects in `objs` that do not exist yet and load the rest from the server.
+
+    Objects are posted `chunk_size` at a time. Objects that already existed
+    are found by listing the children of their parents, once per parent,
+    rather than fetched one by one, and returned. Unfetched parents are
+    `idem`ed first. `map_fn` runs the requests of each step, pass an
+    executor's `map` to run them in parallel. Objects in `overwritable` take
+    the server's fields even if theirs differ, other objects raise
+    RemoteObjectOverwriteError as `get` does.
+    """
+    overwritable = frozenset(id(obj) for obj in overwritable)
+    objs = [obj for obj in objs if not obj._already_fetched]
+    parents = {}
+    for obj in objs:
+        parent = getattr(obj, obj.parent_field)
+        if not parent._already_fetched:
+            parents.setdefault(id(parent), parent)
+    list(map_fn(lambda parent: parent.idem(), parents.values()))
+
+    chunks = [objs[i:i + chunk_size] for i in range(0, len(objs), chunk_size)]
+    chunk_blobs = map_fn(lambda chunk: bulk_post_blobs(knex, bulk_endpoint, chunk), chunks)
+    existing = {}  # id(parent) -> (parent, objects that already existed under it)
+    for chunk, blobs in zip(chunks, chunk_blobs):
+        for obj, blob in zip(chunk, blobs):
+            if blob is not None:
+                _mark_fetched(obj, blob)
+                continue
+            parent = getattr(obj, obj.parent_field)
+            existing.setdefault(id(parent), (parent, []))[1].append(obj)
+    list(map_fn(
+        lambda item: _load_existing(knex, bulk_endpoint, *item, overwritable=overwritable), existing.values(),
+    ))
+    return [obj for _, existing_objs in existing.values() for obj in existing_objs]
+
+
+def _upsert_map(bulk_endpoint, objs):
+    """Return a dict of the fields that identify each object, with its parent's UUID, to the object."""
+    key_fields = bulk_endpoint[2]
+    return {bulk_key(obj.get_post_data(), key_fields): obj for obj in objs}
+
+
+def bulk_upsert_samples(knex, samples, chunk_size=BULK_CHUNK_SIZE):
+    """Create samples that do not exist yet and fetch the rest.
+
+    Returns a dict of (project UUID, sample name) to sample. Unlike
+    `bulk_create_samples` the dict includes samples which already existed,
+    so reruns need no request per sample.
+    """
+    bulk_upsert(knex, BULK_SAMPLES, samples, chunk_size=chunk_size)
+    return _upsert_map(BULK_SAMPLES, samples)
+
+
+def bulk_upsert_sample_result_folders(knex, sample_results, chunk_size=BULK_CHUNK_SIZE):
+    """Create sample results that do not exist yet and fetch the rest.
+
+    Returns a dict of (sample UUID, module name, replicate) to sample result,
+    including sample results which already existed.
+    """
+    bulk_upsert(knex, BULK_SAMPLE_RESULT_FOLDERS, sample_results, chunk_size=chunk_size)
+    return _upsert_map(BULK_SAMPLE_RESULT_FOLDERS, sample_results)
+
+
+def bulk_upsert_sample_result_files(knex, sample_result_fields, chunk_size=BULK_CHUNK_SIZE):
+    """Create sample result fields that do not exist yet and fetch the rest.
+
+    Returns a dict of (sample result UUID, field name) to sample result
+    field, including sample result fields which already existed.
+    """
+    bulk_upsert(knex, BULK_SAMPLE_RESULT_FILES, sample_result_fields, chunk_size=chunk_size)
+    return _upsert_map(BULK_SAMPLE_RESULT_FILES, sample_result_fields)
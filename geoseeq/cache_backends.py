@@ -0,0 +1,278 @@
+"""Blob cache backends, selectable per Knex.
+
+Every backend has the interface of `FileSystemCache`: `get_cached_blob`,
+`cache_blob`, `clear_blob`, `flush` and a `no_cache` flag. `make_cache`
+builds one from a spec string:
+
+ - `none`: cache nothing
+ - `memory`: an LRU in this process only, good for short lived CLI calls
+ - `directory[:path]`: one JSON file per blob, see `FileSystemCache`
+ - `sqlite[:path]`: one SQLite database, see `SqliteCache`. The default.
+ - `http://...`, `https://...`: a networked key value store, see `HttpKeyValueClient`
+ - `redis://...`: a Redis server, requires the `redis` package
+
+Persistent backends have the process wide memory tier in front of them.
+Pass a spec or a backend as `Knex(cache=...)`, or set GEOSEEQ_CACHE_BACKEND
+to choose the default. Setting USE_GEOSEEQ_CACHE=false always selects `none`.
+Set GEOSEEQ_CACHE_MAX_STALE to serve stale blobs while they are refreshed.
+"""
+import json
+import logging
+import os
+import threading
+from urllib.parse import quote
+
+import requests
+
+from .file_system_cache import CACHED_BLOB_TIME, FileSystemCache, hash_obj
+from .memory_cache import MemoryCache, TieredCache
+from .sqlite_cache import SqliteCache
+from .stale_cache import CACHE_MAX_STALE, StaleWhileRevalidateCache
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+DEFAULT_CACHE_BACKEND = "sqlite"
+KEY_VALUE_TIMEOUT = 5  # seconds, for requests to a networked key value store
+
+
+class NullCache:
+    """A cache that stores nothing."""
+
+    no_cache = True
+
+    def clear_blob(self, obj):
+        pass
+
+    def get_cached_blob(self, obj):
+        return None
+
+    def cache_blob(self, obj, blob):
+        return None
+
+    def flush(self):
+        pass
+
+
+class MemoryBlobCache:
+    """Cache blobs in an LRU in this process only.
+
+    Copies sent to other processes start empty.
+    """
+
+    no_cache = False
+
+    def __init__(self, timeout=CACHED_BLOB_TIME, **kwargs):
+        self.timeout = timeout
+        self.memory = MemoryCache(ttl=timeout, **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        memory = state.pop("memory")
+        state["memory_limits"] = (memory.max_entries, memory.max_bytes, memory.ttl)
+        return state
+
+    def __setstate__(self, state):
+        self.memory = MemoryCache(*state.pop("memory_limits"))
+        self.__dict__.update(state)
+
+    def clear_blob(self, obj):
+        self.memory.delete(hash_obj(obj))
+
+    def get_cached_blob(self, obj):
+        text = self.memory.get(hash_obj(obj))
+        return json.loads(text) if text is not None else None
+
+    def cache_blob(self, obj, blob):
+        self.memory.put(hash_obj(obj), json.dumps(blob))
+
+    def flush(self):
+        pass
+
+
+class KeyValueCache:
+    """Cache blobs in a key value store shared by many processes or machines.
+
+    `client` needs `get(key)`, `set(key, text, expire_seconds)` and
+    `delete(key)`. If the store cannot be reached the call is treated as a
+    miss, the cache never fails the call that used it.
+    """
+
+    no_cache = False
+
+    def __init__(self, client, timeout=CACHED_BLOB_TIME):
+        self.client = client
+        self.timeout = timeout
+
+    @property
+    def cache_id(self):
+        return f"kv:{self.client.url}:{getattr(self.client, 'prefix', '')}"
+
+    def clear_blob(self, obj):
+        try:
+            self.client.delete(hash_obj(obj))
+        except Exception as e:
+            logger.warning(f'Could not clear cached blob. {obj} {e}')
+
+    def get_cached_blob(self, obj):
+        try:
+            text = self.client.get(hash_obj(obj))
+        except Exception as e:
+            logger.warning(f'Could not read cache. {obj} {e}')
+            return None
+        return json.loads(text) if text is not None else None
+
+    def cache_blob(self, obj, blob):
+        try:
+            self.client.set(hash_obj(obj), json.dumps(blob), self.timeout)
+        except Exception as e:
+            logger.warning(f'Could not write cache. {obj} {e}')
+
+    def flush(self):
+        pass
+
+
+class HttpKeyValueClient:
+    """A client for a minimal key value store over HTTP.
+
+    `GET {url}/{key}` returns the value or 404, `PUT {url}/{key}` stores the
+    request body for `X-Expire-Seconds` seconds, `DELETE {url}/{key}`
+    removes it. `geoseeq.testing.StandInKeyValueServer` implements this.
+    """
+
+    def __init__(self, url, timeout=KEY_VALUE_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = self._local.session = requests.Session()
+        return sess
+
+    def _key_url(self, key):
+        return f"{self.url}/{quote(key, safe='')}"
+
+    def get(self, key):
+        response = self.session.get(self._key_url(key), timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.text
+
+    def set(self, key, text, expire_seconds):
+        response = self.session.put(
+            self._key_url(key), data=text.encode("utf-8"), timeout=self.timeout,
+            headers={"Content-Type": "application/json", "X-Expire-Seconds": str(int(expire_seconds))},
+        )
+        response.raise_for_status()
+
+    def delete(self, key):
+        response = self.session.delete(self._key_url(key), timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+
+class RedisKeyValueClient:
+    """A client for a Redis server, keys are prefixed with `prefix`."""
+
+    def __init__(self, url, prefix="geoseeq:"):
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_redis"] = None
+        return state
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError('The redis package is required for redis:// caches, run `pip install redis`.')
+            self._redis = redis.Redis.from_url(self.url)
+        return self._redis
+
+    def get(self, key):
+        value = self.redis.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, text, expire_seconds):
+        self.redis.set(self.prefix + key, text, ex=int(expire_seconds))
+
+    def delete(self, key):
+        self.redis.delete(self.prefix + key)
+
+
+def make_cache(spec=None, max_stale=None, endpoint=""):
+    """Return a cache backend for `spec`, see the module docstring.
+
+    With no spec, GEOSEEQ_CACHE_BACKEND is used. Backend objects are
+    returned unchanged. `endpoint` separates the memory tier entries of
+    caches for different servers. If `max_stale` (default GEOSEEQ_CACHE_MAX_STALE) is
+    set, blobs up to that many seconds past their expiry are served while
+    they are refreshed, see `StaleWhileRevalidateCache`.
+    """
+    if spec is not None and not isinstance(spec, str):
+        return spec
+    if 'false' in os.environ.get('USE_GEOSEEQ_CACHE', 'TRUE').lower():
+        return NullCache()
+    spec = spec or os.environ.get('GEOSEEQ_CACHE_BACKEND') or DEFAULT_CACHE_BACKEND
+    max_stale = CACHE_MAX_STALE if max_stale is None else max_stale
+    if spec == "none":
+        return NullCache()
+    if not max_stale:
+        return _make_backend(spec, CACHED_BLOB_TIME, endpoint)
+    inner = _make_backend(spec, CACHED_BLOB_TIME + max_stale, endpoint)
+    return StaleWhileRevalidateCache(inner, fresh_time=CACHED_BLOB_TIME, max_stale=max_stale)
+
+
+def _make_backend(spec, timeout, endpoint=""):
+    kind, _, location = spec.partition(":")
+    if kind == "memory":
+        return MemoryBlobCache(timeout=timeout)
+    if kind == "directory":
+        persistent = FileSystemCache(timeout=timeout, cache_dir=location or None)
+    elif kind == "sqlite":
+        persistent = SqliteCache(timeout=timeout, path=location or None)
+    elif kind in ("http", "https"):
+        persistent = KeyValueCache(HttpKeyValueClient(spec), timeout=timeout)
+    elif kind == "redis":
+        persistent = KeyValueCache(RedisKeyValueClient(spec), timeout=timeout)
+    else:
+        raise ValueError(f'Unknown cache backend "{spec}". Use none, memory, directory, sqlite or a URL.')
+    return TieredCache(persistent, namespace=endpoint)
+
+
+_default_caches = {}
+_default_caches_lock = threading.Lock()
+
+
+def default_cache(endpoint=""):
+    """Return the process wide cache shared by every Knex of `endpoint` not given its own.
+
+    One cache is made per value of USE_GEOSEEQ_CACHE and GEOSEEQ_CACHE_BACKEND
+    so changing them at runtime still takes effect.
+    """
+    setting = (os.environ.get('USE_GEOSEEQ_CACHE', 'TRUE'), os.environ.get('GEOSEEQ_CACHE_BACKEND'), endpoint)
+    cache = _default_caches.get(setting)
+    if cache is None:
+        with _default_caches_lock:
+            cache = _default_caches.get(setting)
+            if cache is None:
+                cache = _default_caches[setting] = make_cache(endpoint=endpoint)
+    return cache
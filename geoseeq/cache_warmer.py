@@ -0,0 +1,130 @@
+"""Prefetch a project's objects into the blob cache.
+
+Before a large batch job, `warm_project_cache` fetches the organization,
+project, samples, result folders and result files of a project once, on a
+pool of threads. Their blobs are cached under their names and UUIDs and the
+pages of each listing are cached too, so workers sharing the cache resolve
+them without requests to the API until the entries expire.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter, sleep
+
+from .hooks import REQUEST_START
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+WARM_THREADS = 8
+
+
+class RateLimiter:
+    """Block callers so at most `max_per_second` calls proceed each second.
+
+    Subscribe it to `REQUEST_START` on a knex to limit the request rate of
+    every thread using that knex.
+    """
+
+    def __init__(self, max_per_second):
+        self.interval = 1 / max_per_second
+        self._next_slot = monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, event=None, **payload):
+        self.wait()
+
+    def wait(self):
+        with self._lock:
+            now = monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
+
+
+class WarmProgress:
+    """Counts of the objects cached so far, passed to progress callbacks."""
+
+    def __init__(self):
+        self.samples = 0
+        self.folders = 0
+        self.files = 0
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._start = perf_counter()
+
+    def add(self, **counts):
+        with self._lock:
+            for key, n in counts.items():
+                setattr(self, key, getattr(self, key) + n)
+            self.seconds = perf_counter() - self._start
+
+    @property
+    def objects(self):
+        return self.samples + self.folders + self.files
+
+    def to_dict(self):
+        return {
+            "samples": self.samples,
+            "folders": self.folders,
+            "files": self.files,
+            "requests": self.requests,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "requests_per_second": self.requests / self.seconds if self.seconds else 0.0,
+        }
+
+
+def _warm_folder(folder, progress):
+    n_files = sum(1 for _ in folder.get_result_files())
+    progress.add(folders=1, files=n_files)
+
+
+def _warm_sample(sample, progress):
+    folders = list(sample.get_result_folders(cache=False))
+    for folder in folders:
+        _warm_folder(folder, progress)
+    progress.add(samples=1)
+
+
+def warm_project_cache(project, n_threads=WARM_THREADS, max_requests_per_second=None, callback=None):
+    """Fetch every object in `project` into its knex's cache and return a `WarmProgress`.
+
+    Samples are crawled on `n_threads` threads. `callback(progress)` is called
+    after each sample. Errors for one sample are logged and counted, the
+    crawl continues. Listing pages that are already cached are not fetched
+    again.
+    """
+    knex = project.knex
+    progress = WarmProgress()
+    count_request = knex.hooks.subscribe(REQUEST_START, lambda event, **payload: progress.add(requests=1))
+    limiter = None
+    if max_requests_per_second:
+        limiter = knex.hooks.subscribe(REQUEST_START, RateLimiter(max_requests_per_second))
+
+    def warm_sample(sample):
+        try:
+            _warm_sample(sample, progress)
+        except Exception as e:
+            logger.warning(f"Could not warm cache for sample. {sample} {e}")
+            progress.add(errors=1)
+        if callback:
+            callback(progress)
+
+    try:
+        project.get()
+        for folder in project.get_result_folders(cache=False):
+            _warm_folder(folder, progress)
+        with ThreadPoolExecutor(n_threads, thread_name_prefix="geoseeq-warm") as executor:
+            for _ in executor.map(warm_sample, project.get_samples(cache=False)):
+                pass
+        knex.cache.flush()
+    finally:
+        knex.hooks.unsubscribe(REQUEST_START, count_request)
+        if limiter:
+            knex.hooks.unsubscribe(REQUEST_START, limiter)
+    progress.add()
+    return progress
@@ -0,0 +1,157 @@
+import json
+import os
+
+import click
+
+from geoseeq.cache_backends import DEFAULT_CACHE_BACKEND, make_cache
+from geoseeq.sqlite_cache import SqliteCache
+
+from .shared_params import handle_project_id, project_id_arg, use_common_state
+
+
+def human_size(n_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n_bytes < 1024 or unit == 'GB':
+            return f'{n_bytes:.1f}{unit}' if unit != 'B' else f'{n_bytes}B'
+        n_bytes /= 1024
+
+
+def human_age(seconds):
+    if seconds is None:
+        return '-'
+    for unit, size in (('d', 24 * 60 * 60), ('h', 60 * 60), ('m', 60)):
+        if seconds >= size:
+            return f'{seconds / size:.1f}{unit}'
+    return f'{seconds:.0f}s'
+
+
+cache_path_option = click.option(
+    '--cache-path', default=None, type=click.Path(dir_okay=False),
+    help='Path to a SQLite cache database. Defaults to the cache used by the API, see GEOSEEQ_CACHE_BACKEND.'
+)
+
+
+def resolve_cache(cache_path, operation):
+    """Return the persistent cache the API uses, or the SQLite cache at `cache_path`.
+
+    Raise a ClickException if the cache does not support `operation`.
+    """
+    if cache_path:
+        return SqliteCache(path=cache_path)
+    cache = make_cache()
+    for wrapper_attr in ('inner', 'persistent'):  # unwrap the stale and memory tiers
+        cache = getattr(cache, wrapper_attr, cache)
+    if not hasattr(cache, operation):
+        backend = os.environ.get('GEOSEEQ_CACHE_BACKEND') or DEFAULT_CACHE_BACKEND
+        if cache.no_cache:
+            backend = 'none'
+        raise click.ClickException(
+            f'The "{backend}" cache backend does not support {operation}. '
+            'Pass --cache-path or set GEOSEEQ_CACHE_BACKEND to use a SQLite cache.'
+        )
+    return cache
+
+
+@click.group('cache')
+def cli_cache():
+    """Inspect and manage the local cache of API responses."""
+    pass
+
+
+@cli_cache.command('stats')
+@click.option('--json', 'as_json', is_flag=True, help='Print stats as JSON.')
+@cache_path_option
+def cli_cache_stats(as_json, cache_path):
+    """Print the size, entry ages and hit ratio of the cache."""
+    stats = resolve_cache(cache_path, 'stats').stats()
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+        return
+    hit_ratio = stats['hit_ratio']
+    click.echo(f'Path:           {stats["path"]}')
+    click.echo(f'Entries:        {stats["entries"]} of {stats["max_entries"]} ({stats["expired_entries"]} expired)')
+    click.echo(f'Size:           {human_size(stats["size_bytes"])} of {human_size(stats["max_bytes"])} '
+               f'({human_size(stats["file_size_bytes"])} on disk)')
+    click.echo(f'Hit ratio:      {"-" if hit_ratio is None else f"{hit_ratio:.1%}"} '
+               f'({stats["hits"]} hits, {stats["misses"]} misses)')
+    click.echo(f'Entry age:      oldest {human_age(stats["oldest_entry_age_sec"])}, '
+               f'median {human_age(stats["median_entry_age_sec"])}, '
+               f'newest {human_age(stats["newest_entry_age_sec"])}')
+
+
+@cli_cache.command('prune')
+@click.option('--max-bytes', type=int, default=None, help='Evict entries until the cache is under this many bytes.')
+@click.option('--max-entries', type=int, default=None, help='Evict entries until the cache has at most this many entries.')
+@cache_path_option
+def cli_cache_prune(max_bytes, max_entries, cache_path):
+    """Delete expired entries and least recently used entries over budget, then compact the cache."""
+    cache = resolve_cache(cache_path, 'prune')
+    before = cache.store.file_size()
+    deleted = cache.prune(max_bytes=max_bytes, max_entries=max_entries)
+    freed = max(before - cache.store.file_size(), 0)
+    click.echo(f'Deleted {deleted["expired"]} expired and {deleted["evicted"]} least recently used entries, '
+               f'freed {human_size(freed)}.')
+
+
+@cli_cache.command('clear')
+@click.option('-y', '--yes', is_flag=True, help='Do not ask for confirmation.')
+@cache_path_option
+def cli_cache_clear(yes, cache_path):
+    """Delete every entry in the cache."""
+    cache = resolve_cache(cache_path, 'clear')
+    if not yes:
+        click.confirm(f'Delete every entry in {cache.path}?', abort=True)
+    cache.clear()
+    click.echo('Cache cleared.')
+
+
+@cli_cache.command('warm')
+@use_common_state
+@click.option('--threads', type=int, default=8, show_default=True, help='Number of samples to fetch in parallel.')
+@click.option('--max-rate', type=float, default=None, help='Maximum number of API requests per second.')
+@project_id_arg
+def cli_cache_warm(state, threads, max_rate, project_id):
+    """Fetch every sample, folder and file in a project into the cache.
+
+    ---
+
+    Run this before a large batch job so that jobs sharing the cache look up
+    names and UUIDs in the project without calling the API.
+
+    ---
+
+    Example Usage:
+
+    \b
+    # Warm the cache for "My Org/My Project", at most 20 requests per second
+    $ geoseeq cache warm --max-rate 20 "My Org/My Project"
+
+    ---
+
+    Command Arguments:
+
+    \b
+    [PROJECT_ID] is the name or ID of the project to fetch.
+
+    ---
+
+    Use of this tool implies acceptance of the GeoSeeq End User License Agreement.
+    Run `geoseeq eula show` to view the EULA.
+    """
+    from geoseeq.cache_warmer import warm_project_cache
+
+    knex = state.get_knex()
+    proj = handle_project_id(knex, project_id, create=False)
+
+    def report(progress):
+        click.echo(
+            f'\r{progress.samples} samples, {progress.folders} folders, {progress.files} files, '
+            f'{progress.requests} requests ({progress.requests / max(progress.seconds, 1e-9):.1f}/s)',
+            nl=False, err=True,
+        )
+
+    progress = warm_project_cache(proj, n_threads=threads, max_requests_per_second=max_rate, callback=report)
+    report(progress)
+    click.echo('', err=True)
+    click.echo(f'Cached {progress.objects} objects with {progress.requests} requests '
+               f'in {progress.seconds:.1f}s, {progress.errors} errors.')
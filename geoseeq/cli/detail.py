@@ -2,6 +2,7 @@ import click
 import json
 from .shared_params import (
     use_common_state,
+    max_stale_option,
     project_id_arg,
     sample_ids_arg,
     yes_option,
@@ -15,6 +16,7 @@ from geoseeq.id_constructors import resolve_id, pipeline_from_uuid
 
 
 @click.group('detail')
+@max_stale_option
 def cli_detail():
     """Detail objects on GeoSeeq."""
     pass
@@ -4,7 +4,6 @@ from os import makedirs
 from os.path import dirname, join
 
 import click
-import pandas as pd
 from multiprocessing import Pool
 from .shared_params import (
     handle_project_id,
@@ -91,6 +90,7 @@ def cli_download_metadata(state, sample_ids):
     metadata = {}
     for sample in samples:
         metadata[sample.name] = sample.metadata
+    import pandas as pd  # imported lazily, pandas is slow to import
     metadata = pd.DataFrame.from_dict(metadata, orient="index")
     metadata.to_csv(state.outfile)
     click.echo("Metadata successfully downloaded for samples.", err=True)
@@ -0,0 +1,47 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """A click group that imports its subcommands the first time they are used.
+
+    `lazy_subcommands` maps command names to `"module.path:attribute"` strings.
+    Running `geoseeq version` then does not pay for importing the modules
+    (and pandas, tqdm, multiprocessing...) behind every other command.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = dict(lazy_subcommands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_subcommands[cmd_name].split(":")
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        """List subcommands in help, even if some of them fail to import."""
+        commands = []
+        for name in self.list_commands(ctx):
+            try:
+                command = self.get_command(ctx, name)
+            except ImportError as e:
+                commands.append((name, f"Unavailable, {e}"))
+                continue
+            if command is not None and not command.hidden:
+                commands.append((name, command))
+        if not commands:
+            return
+        limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+        rows = [
+            (name, command if isinstance(command, str) else command.get_short_help_str(limit))
+            for name, command in commands
+        ]
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
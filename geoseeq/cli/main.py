@@ -4,20 +4,11 @@ import logging
 import click
 
 
-from .copy import cli_copy
-from .manage import cli_manage
-from .download import cli_download
-from .upload import cli_upload, cli_upload_advanced
-from .user import cli_user
-from .view import cli_view
-from .search import cli_search
-from geoseeq.vc.cli import cli_vc
 from geoseeq.knex import DEFAULT_ENDPOINT
 from geoseeq.utils import set_profile
+from .lazy_group import LazyGroup
 from .shared_params.opts_and_args import overwrite_option
-from .detail import cli_detail
-from .run import cli_app
-from .get_eula import cli_eula
+from .profiling import profiling_options
 
 logger = logging.getLogger('geoseeq_api')
 handler = logging.StreamHandler()
@@ -25,7 +16,17 @@ handler.setFormatter(logging.Formatter('[%(levelname)s] %(name)s :: %(message)s'
 logger.addHandler(handler)
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_subcommands={
+    'download': 'geoseeq.cli.download:cli_download',
+    'upload': 'geoseeq.cli.upload:cli_upload',
+    'manage': 'geoseeq.cli.manage:cli_manage',
+    'view': 'geoseeq.cli.view:cli_view',
+    'search': 'geoseeq.cli.search:cli_search',
+    'app': 'geoseeq.cli.run:cli_app',
+    'eula': 'geoseeq.cli.get_eula:cli_eula',
+    'cache': 'geoseeq.cli.cache:cli_cache',
+})
+@profiling_options
 def main():
     """Command line interface for the GeoSeeq API.
     
@@ -36,14 +37,6 @@ def main():
     """
     pass
 
-main.add_command(cli_download)
-main.add_command(cli_upload)
-main.add_command(cli_manage)
-main.add_command(cli_view)
-main.add_command(cli_search)
-main.add_command(cli_app)
-main.add_command(cli_eula)
-
 @main.command()
 def version():
     """Print the version of the Geoseeq API being used.
@@ -56,23 +49,23 @@ def version():
     click.echo('0.5.6a0')  # remember to update setup
 
 
-@main.group('advanced')
+@main.group('advanced', cls=LazyGroup, lazy_subcommands={
+    'copy': 'geoseeq.cli.copy:cli_copy',
+    'user': 'geoseeq.cli.user:cli_user',
+    'detail': 'geoseeq.cli.detail:cli_detail',
+    'upload': 'geoseeq.cli.upload:cli_upload_advanced',
+})
 def cli_advanced():
     """Advanced commands."""
     pass
 
-cli_advanced.add_command(cli_copy)
-cli_advanced.add_command(cli_user)
-cli_advanced.add_command(cli_detail)
-cli_advanced.add_command(cli_upload_advanced)
-
-@cli_advanced.group('experimental')
+@cli_advanced.group('experimental', cls=LazyGroup, lazy_subcommands={
+    'vc': 'geoseeq.vc.cli:cli_vc',
+})
 def cli_experimental():
     """Experimental commands."""
     pass
 
-cli_experimental.add_command(cli_vc)
-
 @main.command('config')
 @click.option('-p', '--profile', default=None, help='The profile name to use.')
 @overwrite_option
@@ -0,0 +1,184 @@
+"""Profile a CLI command so slow runs can be diagnosed from field reports.
+
+```
+geoseeq --profile-output slow_run download fastqs ...
+GEOSEEQ_PROFILE=slow_run geoseeq download fastqs ...
+```
+
+writes `slow_run.prof` (cProfile data, open with `pstats` or snakeviz) and
+`slow_run.summary.json`, and prints the top functions and top Knex
+endpoints by time to stderr. `--profile-sample-interval` also samples the
+stacks of every thread and writes them in folded format to
+`slow_run.folded.txt` for flame graphs; use it for multithreaded
+transfers since cProfile only sees the main thread. `--profile-memory` traces
+allocations with tracemalloc and reports the largest ones.
+"""
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+import click
+
+from geoseeq.metrics import PROCESS_METRICS
+
+TOP_N = 20
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Periodically record the stacks of all other threads in folded format."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="geoseeq-stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CommandProfiler:
+    """Profile everything that runs between `start` and `finish`."""
+
+    def __init__(self, output_prefix, sample_interval=None, trace_memory=False, top_n=TOP_N):
+        self.output_prefix = output_prefix
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self.top_n = top_n
+        self.profiler = cProfile.Profile()
+        self.sampler = None
+        self._baseline_endpoints = {}
+
+    def start(self):
+        self._baseline_endpoints = {
+            key: (count, seconds) for key, count, seconds in PROCESS_METRICS.top_endpoints(None)
+        }
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.sample_interval:
+            self.sampler = StackSampler(self.sample_interval).start()
+        self.profiler.enable()
+        return self
+
+    def finish(self):
+        """Stop profiling, write the output files and print a summary."""
+        self.profiler.disable()
+        if self.sampler:
+            self.sampler.stop()
+        summary = {
+            "top_functions": self.top_functions(),
+            "top_endpoints": self.top_endpoints(),
+        }
+        if self.trace_memory:
+            summary["memory"] = self.memory_summary()
+            tracemalloc.stop()
+
+        self.profiler.dump_stats(f"{self.output_prefix}.prof")
+        if self.sampler:
+            self.sampler.write(f"{self.output_prefix}.folded.txt")
+        with open(f"{self.output_prefix}.summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        click.echo(format_summary(summary, self.output_prefix), err=True)
+        return summary
+
+    def top_functions(self):
+        """Return the functions with the highest cumulative time."""
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, lineno, name), (_, n_calls, own_time, cum_time, _) in stats.stats.items():
+            rows.append({
+                "function": f"{name} ({filename}:{lineno})",
+                "calls": n_calls,
+                "own_sec": own_time,
+                "cumulative_sec": cum_time,
+            })
+        return sorted(rows, key=lambda row: -row["cumulative_sec"])[:self.top_n]
+
+    def top_endpoints(self):
+        """Return the Knex endpoints that took the most time during the command."""
+        rows = []
+        for key, count, seconds in PROCESS_METRICS.top_endpoints(None):
+            base_count, base_seconds = self._baseline_endpoints.get(key, (0, 0.0))
+            if count > base_count:
+                rows.append({"endpoint": key, "requests": count - base_count, "total_sec": seconds - base_seconds})
+        return sorted(rows, key=lambda row: -row["total_sec"])[:self.top_n]
+
+    def memory_summary(self):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        return {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_allocations": [
+                {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:self.top_n]
+            ],
+        }
+
+
+def format_summary(summary, output_prefix, n_rows=10):
+    lines = [f"Profile written to {output_prefix}.prof", "", "Top functions by cumulative time:"]
+    for row in summary["top_functions"][:n_rows]:
+        lines.append(f"  {row['cumulative_sec']:9.3f}s  {row['calls']:>8}  {row['function']}")
+    lines += ["", "Top Knex endpoints by time:"]
+    for row in summary["top_endpoints"][:n_rows]:
+        lines.append(f"  {row['total_sec']:9.3f}s  {row['requests']:>8}  {row['endpoint']}")
+    if not summary["top_endpoints"]:
+        lines.append("  No requests were made.")
+    if "memory" in summary:
+        lines += ["", f"Peak traced memory: {summary['memory']['peak_bytes'] / 1024 ** 2:.1f} MB"]
+    return "\n".join(lines)
+
+
+def profiling_options(func):
+    """Add options that profile the invoked command to a click group."""
+
+    @click.option('--profile-output', envvar='GEOSEEQ_PROFILE', default=None, metavar='PREFIX',
+                  help='Profile the command and write PREFIX.prof and PREFIX.summary.json.')
+    @click.option('--profile-sample-interval', envvar='GEOSEEQ_PROFILE_SAMPLE_INTERVAL', type=float,
+                  default=None, metavar='SECONDS',
+                  help='Also sample thread stacks at this interval and write PREFIX.folded.txt.')
+    @click.option('--profile-memory/--no-profile-memory', envvar='GEOSEEQ_PROFILE_MEMORY', default=False,
+                  help='Also trace memory allocations while profiling.')
+    @functools.wraps(func)
+    def wrapper(*args, profile_output=None, profile_sample_interval=None, profile_memory=False, **kwargs):
+        if profile_output:
+            profiler = CommandProfiler(
+                profile_output, sample_interval=profile_sample_interval, trace_memory=profile_memory
+            )
+            click.get_current_context().call_on_close(profiler.finish)
+            profiler.start()
+        return func(*args, **kwargs)
+
+    return wrapper
@@ -1,4 +1,3 @@
-from tqdm import tqdm
 from os.path import basename
 
 class TQBar:
@@ -10,6 +9,7 @@ class TQBar:
         self.bar = None
 
     def set_num_chunks(self, n_chunks):
+        from tqdm import tqdm  # imported lazily, only needed once a transfer starts
         self.n_bars = n_chunks
         self.bar = tqdm(total=n_chunks,
                         position=self.pos, desc=self.desc, leave=False, unit="B",
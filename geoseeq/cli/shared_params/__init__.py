@@ -9,4 +9,4 @@ from .id_handlers import (
     handle_multiple_result_file_ids,
 )
 from .opts_and_args import *
-from .common_state import use_common_state
\ No newline at end of file
+from .common_state import use_common_state, max_stale_option
\ No newline at end of file
@@ -4,9 +4,11 @@ import click
 from geoseeq.knex import DEFAULT_ENDPOINT
 
 from geoseeq import Knex
+from geoseeq.cache_backends import make_cache
 from geoseeq.utils import load_auth_profile
 
 logger = logging.getLogger('geoseeq_api')
+CLI_MAX_STALE = 0  # seconds, stale cached blobs are opt in with --max-stale or GEOSEEQ_CLI_MAX_STALE
 
 
 class State(object):
@@ -16,11 +18,13 @@ class State(object):
         self.endpoint = DEFAULT_ENDPOINT
         self.outfile = None
         self.log_level = 20
+        self.max_stale = None
         self._knex = None
 
     def get_knex(self):
         logger.setLevel(self.log_level)
-        self._knex = Knex(self.endpoint)
+        cache = make_cache(max_stale=self.max_stale) if self.max_stale else None
+        self._knex = Knex(self.endpoint, cache=cache)
         if self.api_token:
             self._knex.add_api_token(self.api_token)
         return self._knex
@@ -44,6 +48,24 @@ def log_level_option(f):
                         callback=callback)(f)
 
 
+def max_stale_option(f):
+    """Serve cached blobs up to `--max-stale` seconds past expiry while they are refreshed.
+
+    For groups of read only, interactive commands. Off unless set.
+    """
+    def callback(ctx, param, value):
+        state = ctx.ensure_object(State)
+        state.max_stale = value
+        return value
+    return click.option('--max-stale',
+                        type=float,
+                        default=CLI_MAX_STALE,
+                        envvar='GEOSEEQ_CLI_MAX_STALE',
+                        expose_value=False,
+                        help='Seconds past expiry that cached data may be shown while it is refreshed. 0, the default, disables.',
+                        callback=callback)(f)
+
+
 def api_token_option(f):
     def callback(ctx, param, value):
         state = ctx.ensure_object(State)
@@ -11,7 +11,7 @@ from geoseeq.blob_constructors import (
 )
 from geoseeq.knex import GeoseeqNotFoundError
 from os.path import isfile
-from geoseeq.id_constructors.utils import is_grn, is_uuid, is_grn_or_uuid
+from geoseeq.id_constructors.utils import is_grn, is_uuid, is_grn_or_uuid, resolve_first
 from .obj_getters import (
     _get_org,
     _get_org_and_proj,
@@ -124,12 +124,11 @@ def handle_folder_id(knex, folder_id, yes=False, private=True, create=True):
         return folder
     elif is_grn_or_uuid(folder_id):
         folder_uuid = folder_id.split(':')[-1]  # this gives a UUID either way
-        # we guess that this is a sample folder, TODO: use GRN if available
-        try:
-            folder = sample_result_folder_from_uuid(knex, folder_uuid)
-        except GeoseeqNotFoundError:
-            folder = project_result_folder_from_uuid(knex, folder_uuid)
-        return folder
+        # guess whichever kind of folder the last folder UUID was, TODO: use GRN if available
+        return resolve_first(knex, "folder_uuid", [
+            ("sample", lambda: sample_result_folder_from_uuid(knex, folder_uuid)),
+            ("project", lambda: project_result_folder_from_uuid(knex, folder_uuid)),
+        ])
     raise ValueError('sample_folder_id must be a UUID, an organization name and project name, or a GRN')
 
 
@@ -207,10 +206,10 @@ def handle_project_or_sample_id(knex, proj_or_sample_id, yes=False, private=True
             return proj
     elif is_grn_or_uuid(proj_or_sample_id):
         proj_or_sample_id = proj_or_sample_id.split(':')[-1]
-        try:
-            return sample_from_uuid(knex, proj_or_sample_id)
-        except GeoseeqNotFoundError:
-            return project_from_uuid(knex, proj_or_sample_id)
+        return resolve_first(knex, "project_or_sample_uuid", [
+            ("sample", lambda: sample_from_uuid(knex, proj_or_sample_id)),
+            ("project", lambda: project_from_uuid(knex, proj_or_sample_id)),
+        ])
     raise ValueError(f'ID must be a UUID, path, or a GRN')
 
 
@@ -1,26 +1,21 @@
 import click
 
-from .upload import (
-    cli_upload_file,
-    cli_upload_folder,
-    cli_metadata,
-)
-from .upload_reads import cli_upload_reads_wizard
-from .upload_advanced import cli_find_urls_for_reads
+from ..lazy_group import LazyGroup
 
-@click.group('upload')
+
+@click.group('upload', cls=LazyGroup, lazy_subcommands={
+    'reads': 'geoseeq.cli.upload.upload_reads:cli_upload_reads_wizard',
+    'files': 'geoseeq.cli.upload.upload:cli_upload_file',
+    'folders': 'geoseeq.cli.upload.upload:cli_upload_folder',
+    'metadata': 'geoseeq.cli.upload.upload:cli_metadata',
+})
 def cli_upload():
     """Upload files to GeoSeeq."""
     pass
 
-cli_upload.add_command(cli_upload_reads_wizard)
-cli_upload.add_command(cli_upload_file)
-cli_upload.add_command(cli_upload_folder)
-cli_upload.add_command(cli_metadata)
-
-@click.group('upload')
+@click.group('upload', cls=LazyGroup, lazy_subcommands={
+    'read-links': 'geoseeq.cli.upload.upload_advanced:cli_find_urls_for_reads',
+})
 def cli_upload_advanced():
     """Advanced tools to upload files to GeoSeeq."""
-    pass
-
-cli_upload_advanced.add_command(cli_find_urls_for_reads)
\ No newline at end of file
+    pass
\ No newline at end of file
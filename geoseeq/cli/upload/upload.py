@@ -2,7 +2,6 @@ import logging
 import json
 
 import click
-import pandas as pd
 import requests
 from os.path import basename, isdir, isfile, exists
 from geoseeq.knex import GeoseeqNotFoundError
@@ -200,6 +199,7 @@ def cli_metadata(state, overwrite, yes, private, create, index_col, encoding, pr
     """
     knex = state.get_knex()
     proj = handle_project_id(knex, project_id, yes, private)
+    import pandas as pd  # imported lazily, pandas is slow to import
     tbl = pd.read_csv(table, index_col=index_col, encoding=encoding)
     samples = []
     plan = {
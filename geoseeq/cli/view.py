@@ -4,6 +4,7 @@ from geoseeq import Organization
 from geoseeq.id_constructors import resolve_id
 from .shared_params import (
     use_common_state,
+    max_stale_option,
     project_id_arg,
     sample_ids_arg,
     yes_option,
@@ -18,6 +19,7 @@ from geoseeq.blob_constructors import org_from_uuid, pipeline_from_blob
 
 
 @click.group('view')
+@max_stale_option
 def cli_view():
     """View objects on GeoSeeq."""
     pass
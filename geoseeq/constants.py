@@ -4,6 +4,11 @@ from os.path import join
 FIVE_MB = 5 * (1024 ** 2)
 FASTQ_MODULE_NAMES = ['short_read::paired_end', 'short_read::single_end', 'long_read::nanopore']
 DEFAULT_ENDPOINT = "https://backend.geoseeq.com"
+# JSON request bodies at least this large (in bytes) are gzipped before sending
+GZIP_REQUEST_THRESHOLD = int(environ.get("GEOSEEQ_GZIP_REQUEST_THRESHOLD", 256 * 1024))
+GZIP_COMPRESSION_LEVEL = 6
+# request and response bodies are truncated to this many characters in debug logs
+MAX_LOGGED_BODY_LENGTH = 2000
 
 CONFIG_FOLDER = environ.get("XDG_CONFIG_HOME", join(environ["HOME"], ".config"))
 CONFIG_DIR = environ.get("GEOSEEQ_CONFIG_DIR", join(CONFIG_FOLDER, "geoseeq"))
@@ -1,6 +1,8 @@
 import json
 import logging
 import os
+import tempfile
+from contextlib import contextmanager
 from glob import glob
 from hashlib import sha256
 from random import randint
@@ -9,7 +11,17 @@ from time import time
 logger = logging.getLogger(__name__)  # Same name as calling module
 logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
 CACHED_BLOB_TIME = 3 * 60 * 60  # 3 hours in seconds
-CACHE_DIR = os.environ.get('GEOSEEQ_API_CACHE_DIR', '.')
+
+
+def default_cache_dir():
+    """Return GEOSEEQ_API_CACHE_DIR, or a geoseeq directory in the XDG cache directory."""
+    if os.environ.get('GEOSEEQ_API_CACHE_DIR'):
+        return os.environ['GEOSEEQ_API_CACHE_DIR']
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache_home, 'geoseeq')
+
+
+CACHE_DIR = default_cache_dir()
 
 
 def hash_obj(obj):
@@ -21,6 +33,44 @@ def hash_obj(obj):
     return result
 
 
+@contextmanager
+def cache_dir_lock(dirpath):
+    """Hold an exclusive lock on a cache directory, across processes where supported."""
+    try:
+        import fcntl
+    except ImportError:  # not available on Windows, rely on atomic renames alone
+        yield
+        return
+    with open(os.path.join(dirpath, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_atomic(filepath, text):
+    """Write `text` to `filepath` so that readers see either no file or the whole file."""
+    fd, tmp_filepath = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_filepath)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def remove_if_exists(filepath):
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+
+
 def time_since_file_cached(blob_filepath):
     timestamp = int(blob_filepath.split('__')[-1].split('.json')[0])
     elapsed_time = int(time()) - timestamp
@@ -29,9 +79,14 @@ def time_since_file_cached(blob_filepath):
 
 class FileSystemCache:
 
-    def __init__(self, timeout=CACHED_BLOB_TIME):
+    def __init__(self, timeout=CACHED_BLOB_TIME, cache_dir=None):
         self.no_cache = 'false' in os.environ.get('USE_GEOSEEQ_CACHE', 'TRUE').lower()
         self.timeout = timeout
+        self.cache_dir = cache_dir
+
+    @property
+    def cache_id(self):
+        return f"directory:{os.path.abspath(self.cache_dir or CACHE_DIR)}"
 
     def clear_blob(self, obj):
         if self.no_cache:
@@ -39,14 +94,11 @@ class FileSystemCache:
         blob_filepath, path_exists = self.get_cached_blob_filepath(obj)
         if path_exists:
             logger.debug(f'Clearing cached blob. {blob_filepath}')
-            try:
-                os.remove(blob_filepath)
-            except FileNotFoundError:
-                logger.debug(f'Blob was deleted before it could be removed. {obj}')
-                pass
+            with cache_dir_lock(os.path.dirname(blob_filepath)):
+                remove_if_exists(blob_filepath)
 
     def get_cached_blob_filepath(self, obj):
-        path_base = f'{CACHE_DIR}/.geoseeq_api_cache/v1/geoseeq_api_cache__{hash_obj(obj)}'
+        path_base = f'{self.cache_dir or CACHE_DIR}/.geoseeq_api_cache/v1/geoseeq_api_cache__{hash_obj(obj)}'
         os.makedirs(os.path.dirname(path_base), exist_ok=True)
         paths = sorted(glob(f'{path_base}__*.json'))
         if paths:
@@ -66,27 +118,32 @@ class FileSystemCache:
         elapsed_time = time_since_file_cached(blob_filepath)
         if elapsed_time > (self.timeout + randint(0, self.timeout // 10)):  # cache is stale
             logger.debug(f'Found stale cached blob. {obj}')
-            os.remove(blob_filepath)
+            remove_if_exists(blob_filepath)
             return None
         logger.debug(f'Found good cached blob. {obj}')
         try:
-            blob = json.loads(open(blob_filepath).read())
-            return blob
+            with open(blob_filepath) as f:
+                return json.loads(f.read())
         except FileNotFoundError:
             logger.debug(f'Blob was deleted before it could be returned. {obj}')
             return None
+        except ValueError:  # only files from before writes were atomic can be partial
+            logger.debug(f'Found unreadable cached blob. {obj}')
+            remove_if_exists(blob_filepath)
+            return None
 
     def cache_blob(self, obj, blob):
         if self.no_cache:
             return None
-        logger.debug(f'Caching blob. {obj} {blob}')
+        logger.debug(f'Caching blob. {obj}')
         blob_filepath, path_exists = self.get_cached_blob_filepath(obj)
         if path_exists:  # save a new cache if an old one exists
             elapsed_time = time_since_file_cached(blob_filepath)
             if elapsed_time < ((self.timeout / 2) + randint(0, self.timeout // 10)):
                 # Only reload a file if it is old enough
                 return
-            self.clear_blob(obj)
-            return self.cache_blob(obj, blob)
-        with open(blob_filepath, 'w') as f:
-            f.write(json.dumps(blob))
+        new_filepath = blob_filepath.rsplit('__', 1)[0] + f'__{int(time())}.json'
+        with cache_dir_lock(os.path.dirname(blob_filepath)):
+            write_atomic(new_filepath, json.dumps(blob))
+            if path_exists and blob_filepath != new_filepath:
+                remove_if_exists(blob_filepath)
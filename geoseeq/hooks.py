@@ -0,0 +1,122 @@
+"""A small event bus for requests, file parts and file transfers.
+
+Subscribers are called synchronously, in the thread that emitted the event,
+as `callback(event, **payload)`. Emitting an event nobody subscribed to costs
+a single dict lookup.
+
+Events and their payloads:
+
+ - `REQUEST_START`: method, url, endpoint
+ - `REQUEST_FINISH`: method, url, endpoint, status_code, seconds, bytes_out, bytes_in
+ - `RETRY_SCHEDULED`: attempt, delay and either endpoint (API requests)
+   or direction, filepath, part_number (file parts)
+ - `FILE_STARTED`: direction, filepath, file_size
+ - `PART_UPLOADED`: filepath, part_number, n_bytes, seconds
+ - `PART_DOWNLOADED`: filepath, n_bytes, seconds
+ - `FILE_COMPLETED`: direction, filepath, n_bytes, seconds
+"""
+import logging
+import threading
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+REQUEST_START = "request_start"
+REQUEST_FINISH = "request_finish"
+RETRY_SCHEDULED = "retry_scheduled"
+FILE_STARTED = "file_started"
+PART_UPLOADED = "part_uploaded"
+PART_DOWNLOADED = "part_downloaded"
+FILE_COMPLETED = "file_completed"
+ALL_EVENTS = "*"
+
+
+class HookBus:
+    """Dispatch events to subscribed callbacks.
+
+    Subscribing and unsubscribing replace immutable tuples so `emit` never
+    needs a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # event -> tuple of callbacks, excluding wildcards
+        self._wildcard = ()
+        self._dispatch = {}  # event -> tuple of callbacks, including wildcards
+
+    def __reduce__(self):
+        # Callbacks (progress bars, locks, etc.) are often not picklable.
+        # Copies sent to other processes start without subscribers.
+        return (HookBus, ())
+
+    def _rebuild(self):
+        self._dispatch = {
+            event: callbacks + self._wildcard
+            for event, callbacks in self._subscribers.items()
+        }
+
+    def subscribe(self, event, callback):
+        """Call `callback` whenever `event` is emitted. Return the callback.
+
+        Use `ALL_EVENTS` to receive every event.
+        """
+        with self._lock:
+            if event == ALL_EVENTS:
+                self._wildcard = self._wildcard + (callback,)
+            else:
+                self._subscribers[event] = self._subscribers.get(event, ()) + (callback,)
+            self._rebuild()
+        return callback
+
+    def unsubscribe(self, event, callback):
+        with self._lock:
+            if event == ALL_EVENTS:
+                self._wildcard = tuple(cb for cb in self._wildcard if cb is not callback)
+            else:
+                callbacks = tuple(cb for cb in self._subscribers.get(event, ()) if cb is not callback)
+                if callbacks:
+                    self._subscribers[event] = callbacks
+                else:
+                    self._subscribers.pop(event, None)
+            self._rebuild()
+
+    def has_subscribers(self, event):
+        return bool(self._dispatch.get(event, self._wildcard))
+
+    def emit(self, event, **payload):
+        callbacks = self._dispatch.get(event, self._wildcard)
+        if not callbacks:
+            return
+        for callback in callbacks:
+            try:
+                callback(event, **payload)
+            except Exception:
+                logger.exception(f"Hook for event {event} failed. {callback}")
+
+
+class ProgressTrackerHook:
+    """Adapt a progress tracker with `set_num_chunks` and `update` to the bus.
+
+    Only events for `filepath` are passed to the tracker.
+    """
+
+    def __init__(self, progress_tracker, filepath):
+        self.progress_tracker = progress_tracker
+        self.filepath = filepath
+
+    def __call__(self, event, filepath=None, **payload):
+        if filepath != self.filepath:
+            return
+        if event == FILE_STARTED:
+            self.progress_tracker.set_num_chunks(payload["file_size"])
+        elif event in (PART_UPLOADED, PART_DOWNLOADED):
+            self.progress_tracker.update(payload["n_bytes"])
+
+    def attach(self, bus):
+        for event in (FILE_STARTED, PART_UPLOADED, PART_DOWNLOADED):
+            bus.subscribe(event, self)
+        return self
+
+    def detach(self, bus):
+        for event in (FILE_STARTED, PART_UPLOADED, PART_DOWNLOADED):
+            bus.unsubscribe(event, self)
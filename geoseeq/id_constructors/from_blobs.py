@@ -2,15 +2,36 @@ from geoseeq import GeoseeqNotFoundError
 from geoseeq.knex import with_knex
 
 
+def _materialize(knex, obj_type, blob, build, already_fetched, modified):
+    """Return the knex's instance of the object in `blob`, calling `build()` if it has none.
+
+    An existing instance that was neither fetched nor modified is loaded
+    from `blob`, otherwise it is returned as it is.
+    """
+    obj = knex.identity_map.get(obj_type, blob.get("uuid"))
+    if obj is None:
+        obj = build()
+        obj.load_blob(blob)
+        obj._already_fetched = already_fetched
+        obj._modified = modified
+        existing = knex.identity_map.add(obj)
+        if existing is obj:
+            return obj
+        obj = existing
+    if not (obj._already_fetched or obj._modified):
+        obj.load_blob(blob, allow_overwrite=True)
+        obj._already_fetched = already_fetched
+        obj._modified = modified
+    return obj
+
+
 @with_knex
 def org_from_blob(knex, blob, already_fetched=True, modified=False):
     """Return an Organization object from a blob."""
     from geoseeq.organization import Organization  # import here to avoid circular import
-    org = Organization(knex, blob["name"])
-    org.load_blob(blob)
-    org._already_fetched = already_fetched
-    org._modified = modified
-    return org
+    return _materialize(
+        knex, Organization, blob, lambda: Organization(knex, blob["name"]), already_fetched, modified
+    )
 
 
 @with_knex
@@ -20,11 +41,10 @@ def project_from_blob(knex, blob, already_fetched=True, modified=False):
         knex, blob["organization_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.project import Project  # import here to avoid circular import
-    grp = Project(knex, org, blob["name"], is_library=blob["is_library"])
-    grp.load_blob(blob)
-    grp._already_fetched = already_fetched
-    grp._modified = modified
-    return grp
+    return _materialize(
+        knex, Project, blob, lambda: Project(knex, org, blob["name"], is_library=blob["is_library"]),
+        already_fetched, modified,
+    )
 
 
 sample_group_from_blob = project_from_blob  # Alias
@@ -37,11 +57,10 @@ def sample_from_blob(knex, blob, already_fetched=True, modified=False):
         knex, blob["library_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.sample import Sample  # import here to avoid circular import
-    sample = Sample(knex, lib, blob["name"], metadata=blob["metadata"])
-    sample.load_blob(blob)
-    sample._already_fetched = already_fetched
-    sample._modified = modified
-    return sample
+    return _materialize(
+        knex, Sample, blob, lambda: Sample(knex, lib, blob["name"], metadata=blob["metadata"]),
+        already_fetched, modified,
+    )
 
 
 @with_knex
@@ -51,13 +70,13 @@ def project_result_folder_from_blob(knex, blob, already_fetched=True, modified=F
         knex, blob["sample_group_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.result import ProjectResultFolder  # import here to avoid circular import
-    ar = ProjectResultFolder(
-        knex, group, blob["module_name"], replicate=blob["replicate"], metadata=blob["metadata"]
+    return _materialize(
+        knex, ProjectResultFolder, blob,
+        lambda: ProjectResultFolder(
+            knex, group, blob["module_name"], replicate=blob["replicate"], metadata=blob["metadata"]
+        ),
+        already_fetched, modified,
     )
-    ar.load_blob(blob)
-    ar._already_fetched = already_fetched
-    ar._modified = modified
-    return ar
 
 
 sample_group_ar_from_blob = project_result_folder_from_blob  # Alias
@@ -70,13 +89,13 @@ def sample_result_folder_from_blob(knex, blob, already_fetched=True, modified=Fa
         knex, blob["sample_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.result import SampleResultFolder  # import here to avoid circular import
-    ar = SampleResultFolder(
-        knex, sample, blob["module_name"], replicate=blob["replicate"], metadata=blob["metadata"]
+    return _materialize(
+        knex, SampleResultFolder, blob,
+        lambda: SampleResultFolder(
+            knex, sample, blob["module_name"], replicate=blob["replicate"], metadata=blob["metadata"]
+        ),
+        already_fetched, modified,
     )
-    ar.load_blob(blob)
-    ar._already_fetched = already_fetched
-    ar._modified = modified
-    return ar
 
 
 sample_ar_from_blob = sample_result_folder_from_blob  # Alias
@@ -89,11 +108,10 @@ def sample_result_file_from_blob(knex, blob, already_fetched=True, modified=Fals
         knex, blob["analysis_result_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.result import SampleResultFile  # import here to avoid circular import
-    arf = SampleResultFile(knex, ar, blob["name"], data=blob["stored_data"])
-    arf.load_blob(blob)
-    ar._already_fetched = already_fetched
-    ar._modified = modified
-    return arf
+    return _materialize(
+        knex, SampleResultFile, blob, lambda: SampleResultFile(knex, ar, blob["name"], data=blob["stored_data"]),
+        already_fetched, modified,
+    )
 
 
 sample_ar_field_from_blob = sample_result_file_from_blob  # Alias
@@ -106,11 +124,10 @@ def project_result_file_from_blob(knex, blob, already_fetched=True, modified=Fal
         knex, blob["analysis_result_obj"], already_fetched=already_fetched, modified=modified
     )
     from geoseeq.result import ProjectResultFile  # import here to avoid circular import
-    arf = ProjectResultFile(knex, ar, blob["name"], data=blob["stored_data"])
-    arf.load_blob(blob)
-    ar._already_fetched = already_fetched
-    ar._modified = modified
-    return arf
+    return _materialize(
+        knex, ProjectResultFile, blob, lambda: ProjectResultFile(knex, ar, blob["name"], data=blob["stored_data"]),
+        already_fetched, modified,
+    )
 
 
 sample_group_ar_field_from_blob = project_result_file_from_blob  # Alias
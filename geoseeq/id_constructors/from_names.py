@@ -13,8 +13,8 @@ Unlike UUIDs or GRNs names can be changed by the user.
 This makes them more human-readable, but not reliable for permanent references.
 """
 from geoseeq.organization import Organization
-from geoseeq import GeoseeqNotFoundError
 from geoseeq.knex import with_knex
+from .utils import resolve_first
 
 
 @with_knex
@@ -94,10 +94,10 @@ def result_folder_from_name(knex, name):
     """
     tkns = name.split("/")
     if len(tkns) >= 4:
-        try:
-            return sample_result_folder_from_name(knex, name)
-        except GeoseeqNotFoundError:
-            return project_result_folder_from_name(knex, name)
+        return resolve_first(knex, "folder_name", [
+            ("sample", lambda: sample_result_folder_from_name(knex, name)),
+            ("project", lambda: project_result_folder_from_name(knex, name)),
+        ])
     else:  # can't be a sample result folder
         return project_result_folder_from_name(knex, name)
 
@@ -138,9 +138,9 @@ def result_file_from_name(knex, name):
     """
     tkns = name.split("/")
     if len(tkns) >= 5:
-        try:
-            return sample_result_file_from_name(knex, name)
-        except GeoseeqNotFoundError:
-            return project_result_file_from_name(knex, name)
+        return resolve_first(knex, "file_name", [
+            ("sample", lambda: sample_result_file_from_name(knex, name)),
+            ("project", lambda: project_result_file_from_name(knex, name)),
+        ])
     else:  # can't be a sample result file
         return project_result_file_from_name(knex, name)
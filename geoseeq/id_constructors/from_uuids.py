@@ -1,22 +1,37 @@
-from geoseeq import GeoseeqNotFoundError
 from geoseeq.knex import with_knex
 from .from_blobs import *
+from .utils import resolve_first
+
+
+def _from_uuid(knex, uuid_url_prefix, uuid, from_blob):
+    """Return the object fetched from `{uuid_url_prefix}/{uuid}`, from the cache if possible.
+
+    Fetched blobs are cached under the UUID, the object's names and, for
+    the parents nested in the blob, theirs too.
+    """
+    from geoseeq.remote_object import uuid_cache_key  # import here to avoid circular import
+    blob = knex.cache.get_cached_blob(uuid_cache_key(uuid_url_prefix, uuid))
+    if blob:
+        try:
+            return from_blob(knex, blob)
+        except KeyError:  # cached from a response that did not nest the parents
+            pass
+    blob = knex.get(f"{uuid_url_prefix}/{uuid}")
+    obj = from_blob(knex, blob)
+    obj.cache_blob(blob, include_parents=True)
+    return obj
 
 
 @with_knex
 def org_from_uuid(knex, uuid):
     """Return the organization object which the uuid points to."""
-    blob = knex.get(f"organizations/{uuid}")
-    org = org_from_blob(knex, blob)
-    return org
+    return _from_uuid(knex, "organizations", uuid, org_from_blob)
 
 
 @with_knex
 def project_from_uuid(knex, uuid):
     """Return the project object which the uuid points to."""
-    blob = knex.get(f"sample_groups/{uuid}")
-    project = project_from_blob(knex, blob)
-    return project
+    return _from_uuid(knex, "sample_groups", uuid, project_from_blob)
 
 
 sample_group_from_uuid = project_from_uuid  # Alias
@@ -25,17 +40,13 @@ sample_group_from_uuid = project_from_uuid  # Alias
 @with_knex
 def sample_from_uuid(knex, uuid):
     """Return the sample object which the uuid points to."""
-    blob = knex.get(f"samples/{uuid}")
-    sample = sample_from_blob(knex, blob)
-    return sample
+    return _from_uuid(knex, "samples", uuid, sample_from_blob)
 
 
 @with_knex
 def sample_result_folder_from_uuid(knex, uuid):
     """Return the sample result folder object which the uuid points to."""
-    blob = knex.get(f"sample_ars/{uuid}")
-    ar = sample_result_folder_from_blob(knex, blob)
-    return ar
+    return _from_uuid(knex, "sample_ars", uuid, sample_result_folder_from_blob)
 
 
 sample_ar_from_uuid = sample_result_folder_from_uuid  # Alias
@@ -44,9 +55,7 @@ sample_ar_from_uuid = sample_result_folder_from_uuid  # Alias
 @with_knex
 def project_result_folder_from_uuid(knex, uuid):
     """Return the project result folder object which the uuid points to."""
-    blob = knex.get(f"sample_group_ars/{uuid}")
-    ar = project_result_folder_from_blob(knex, blob)
-    return ar
+    return _from_uuid(knex, "sample_group_ars", uuid, project_result_folder_from_blob)
 
 
 sample_group_ar_from_uuid = project_result_folder_from_uuid  # Alias
@@ -58,18 +67,16 @@ def result_folder_from_uuid(knex, uuid):
 
     Guess the result folder is a sample result folder. If not, try a project result folder.
     """
-    try:
-        return sample_result_folder_from_uuid(knex, uuid)
-    except GeoseeqNotFoundError:
-        return project_result_folder_from_uuid(knex, uuid)
+    return resolve_first(knex, "folder_uuid", [
+        ("sample", lambda: sample_result_folder_from_uuid(knex, uuid)),
+        ("project", lambda: project_result_folder_from_uuid(knex, uuid)),
+    ])
 
 
 @with_knex
 def sample_result_file_from_uuid(knex, uuid):
     """Return the sample result file object which the uuid points to."""
-    blob = knex.get(f"sample_ar_fields/{uuid}")
-    ar = sample_result_file_from_blob(knex, blob)
-    return ar
+    return _from_uuid(knex, "sample_ar_fields", uuid, sample_result_file_from_blob)
 
 
 sample_ar_field_from_uuid = sample_result_file_from_uuid  # Alias
@@ -78,9 +85,7 @@ sample_ar_field_from_uuid = sample_result_file_from_uuid  # Alias
 @with_knex
 def project_result_file_from_uuid(knex, uuid):
     """Return the project result file object which the uuid points to."""
-    blob = knex.get(f"sample_group_ar_fields/{uuid}")
-    ar = project_result_file_from_blob(knex, blob)
-    return ar
+    return _from_uuid(knex, "sample_group_ar_fields", uuid, project_result_file_from_blob)
 
 
 sample_group_ar_field_from_uuid = project_result_file_from_uuid  # Alias
@@ -92,10 +97,10 @@ def result_file_from_uuid(knex, uuid):
 
     Guess the result file is a sample result file. If not, try a project result file.
     """
-    try:
-        return sample_result_file_from_uuid(knex, uuid)
-    except GeoseeqNotFoundError:
-        return project_result_file_from_uuid(knex, uuid)
+    return resolve_first(knex, "file_uuid", [
+        ("sample", lambda: sample_result_file_from_uuid(knex, uuid)),
+        ("project", lambda: project_result_file_from_uuid(knex, uuid)),
+    ])
     
 
 @with_knex
@@ -21,7 +21,7 @@ from .from_names import (
     project_result_file_from_name,
     result_file_from_name,
 )
-from .utils import is_name, is_grn
+from .utils import is_name, is_grn, resolve_first
 from geoseeq.knex import with_knex
 
 
@@ -45,15 +45,15 @@ def resolve_name(knex, name):
     if len(tkns) == 2:  # project
         return "project", project_from_name(knex, name)
     if len(tkns) == 3:  # sample or project result folder
-        try:
-            return "sample", sample_from_name(knex, name)
-        except GeoseeqNotFoundError:
-            return "folder", result_folder_from_name(knex, name)
+        return resolve_first(knex, "name_3", [
+            ("sample", lambda: ("sample", sample_from_name(knex, name))),
+            ("folder", lambda: ("folder", result_folder_from_name(knex, name))),
+        ])
     if len(tkns) == 4:  # sample result folder or project result file
-        try:
-            return "folder", result_folder_from_name(knex, name)
-        except GeoseeqNotFoundError:
-            return "file", result_file_from_name(knex, name)
+        return resolve_first(knex, "name_4", [
+            ("folder", lambda: ("folder", result_folder_from_name(knex, name))),
+            ("file", lambda: ("file", result_file_from_name(knex, name))),
+        ])
     if len(tkns) == 5:  # sample result file
         return "file", result_file_from_name(knex, name)
     raise GeoseeqNotFoundError(f'Name "{name}" not found')
@@ -1,4 +1,7 @@
 import uuid
+from contextlib import nullcontext
+
+from geoseeq.knex import GeoseeqNotFoundError
 
 
 def is_grn(el):
@@ -32,3 +35,28 @@ def is_name(el):
 def is_grn_or_uuid(el):
     """Return True if `el` is a GRN or a UUID"""
     return is_grn(el) or is_uuid(el)
+
+
+def resolve_first(knex, kind, guesses):
+    """Return the result of the first guess that does not raise GeoseeqNotFoundError.
+
+    `guesses` is a list of (label, function) pairs. The guess that resolved
+    the last ID of the same `kind` with this knex is tried first, so a
+    batch of IDs of one type stops paying for the wrong guess. URLs the
+    guesses did not find are not requested again for a short time.
+    """
+    guesses = dict(guesses)
+    not_found = getattr(knex, 'not_found', None)
+    labels = not_found.order(kind, list(guesses)) if not_found else list(guesses)
+    remembering = getattr(knex, 'remembering_not_found', nullcontext)
+    for i, label in enumerate(labels):
+        try:
+            with remembering():
+                result = guesses[label]()
+        except GeoseeqNotFoundError:
+            if i == len(labels) - 1:
+                raise
+            continue
+        if not_found:
+            not_found.record(kind, label)
+        return result
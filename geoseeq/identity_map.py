@@ -0,0 +1,66 @@
+"""A per Knex map from server objects to the one instance that represents each.
+
+Blobs for samples, folders and files embed their parents, so building
+objects from many blobs used to build a new organization and project for
+each one, every copy fetched and cached on its own. `IdentityMap` keeps a
+weak reference to each instance under its UUID and its name chain, so the
+blob constructors in `geoseeq.id_constructors` return the existing
+instance instead. Instances are dropped once nothing else refers to them.
+"""
+import threading
+import weakref
+
+
+class IdentityMap:
+    """Weakly map UUIDs and name chains to RemoteObject instances."""
+
+    def __init__(self):
+        self._objects = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Copies sent to other processes start empty
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def _keys(self, obj):
+        keys = [("name", type(obj).__name__, obj.pre_hash())]
+        if obj.uuid:
+            keys.append(("uuid", type(obj).__name__, obj.uuid))
+        return keys
+
+    def get(self, obj_type, uuid):
+        """Return the instance of `obj_type` with `uuid`, or None."""
+        if not uuid:
+            return None
+        return self._objects.get(("uuid", obj_type.__name__, uuid))
+
+    def add(self, obj):
+        """Register `obj` and return it, or the instance already registered for it."""
+        keys = self._keys(obj)
+        with self._lock:
+            instance = obj
+            for key in keys:
+                existing = self._objects.get(key)
+                if existing is not None:
+                    instance = existing
+                    break
+            for key in keys:
+                self._objects.setdefault(key, instance)
+        return instance
+
+    def discard(self, obj):
+        """Forget `obj`, e.g. once it is deleted."""
+        with self._lock:
+            for key in self._keys(obj):
+                if self._objects.get(key) is obj:
+                    del self._objects[key]
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
@@ -1,15 +1,47 @@
+import gzip
+import json as jsonlib
 import logging
 import requests
+import threading
+from contextlib import contextmanager
 from os import environ
-from .file_system_cache import FileSystemCache
+from time import perf_counter
+from .cache_backends import make_cache, default_cache
+from .hooks import HookBus, REQUEST_START, REQUEST_FINISH, RETRY_SCHEDULED
+from .metrics import KnexMetrics, PROCESS_METRICS, endpoint_key
+from .identity_map import IdentityMap
+from .not_found_cache import NotFoundCache
+from .transport import transport_from_env
 from geoseeq.utils import load_auth_profile
-from geoseeq.constants import DEFAULT_ENDPOINT
+from geoseeq.constants import (
+    DEFAULT_ENDPOINT,
+    GZIP_COMPRESSION_LEVEL,
+    GZIP_REQUEST_THRESHOLD,
+    MAX_LOGGED_BODY_LENGTH,
+)
 
 
 logger = logging.getLogger("geoseeq_api")  # Same name as calling module
 logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
 
 
+def truncate_for_log(text, max_length=MAX_LOGGED_BODY_LENGTH):
+    """Return `text` shortened to at most `max_length` characters for logging."""
+    if len(text) <= max_length:
+        return text
+    return f"{text[:max_length]}... [{len(text) - max_length} more characters]"
+
+
+def _rejects_encoding(response):
+    """Return True if `response` refuses a request because its body was compressed."""
+    if response.status_code == 415:
+        return True
+    if response.status_code == 400:
+        content = (response.content or b"").lower()
+        return b"encoding" in content or b"gzip" in content
+    return False
+
+
 def clean_url(url):
     if url[-1] == "/":
         url = url[:-1]
@@ -56,16 +88,38 @@ class GeoseeqOtherError(GeoseeqGeneralError):
 
 class Knex:
 
-    def __init__(self, endpoint_url=DEFAULT_ENDPOINT):
+    def __init__(self, endpoint_url=DEFAULT_ENDPOINT, compress_threshold=GZIP_REQUEST_THRESHOLD, transport=None,
+                 cache=None):
         self.endpoint_url = endpoint_url
         self.endpoint_url += "/api"
         self.auth = None
-        self.headers = {"Accept": "application/json"}
-        self.cache = FileSystemCache()
+        self.headers = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        self.compress_threshold = compress_threshold
+        self.transport = transport or transport_from_env()
+        self.hooks = HookBus()
+        self._metrics = KnexMetrics(parent=PROCESS_METRICS).subscribe_to(self.hooks)
+        self.cache = (
+            make_cache(cache, endpoint=self.endpoint_url) if cache is not None
+            else default_cache(self.endpoint_url)
+        )
+        self.not_found = NotFoundCache()
+        self._local = threading.local()  # per thread state, see `batch()` and `remembering_not_found()`
+        self.identity_map = IdentityMap()
         self._verify = self._set_verify()
         self.sess = self._new_session()
         self.auth_required = False
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_local", None)
+        return state
+
+    def __setstate__(self, state):
+        # hooks are not carried across processes, reattach metrics to the new bus
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._metrics.subscribe_to(self.hooks)
+
     def __enter__(self):
         return self
 
@@ -87,6 +141,45 @@ class Knex:
 
     def close(self):
         self.sess.close()
+        self.transport.close()
+
+    @property
+    def active_batch(self):
+        """The Batch queueing the creates and saves of this thread, see `batch()`."""
+        return getattr(self._local, "active_batch", None)
+
+    @contextmanager
+    def batch(self, chunk_size=None, n_threads=None):
+        """Queue the creates and saves made in the block and send them in bulk when it exits.
+
+        See `geoseeq.unit_of_work`. A batch opened inside another joins it.
+        Batches are per thread, other threads using this knex are not batched.
+        """
+        from .unit_of_work import Batch, BATCH_CHUNK_SIZE, BATCH_THREADS  # import here to avoid circular import
+        if self.active_batch is not None:
+            yield self.active_batch
+            return
+        batch = Batch(self, chunk_size=chunk_size or BATCH_CHUNK_SIZE, n_threads=n_threads or BATCH_THREADS)
+        self._local.active_batch = batch
+        try:
+            yield batch
+        finally:
+            self._local.active_batch = None
+        batch.flush()
+
+    @contextmanager
+    def remembering_not_found(self):
+        """Skip and record GETs in the block that return 404, for the guesses of ID resolvers.
+
+        See `geoseeq.not_found_cache`. Other GETs, e.g. polling for an object
+        that will be created, always reach the server.
+        """
+        previous = getattr(self._local, "remember_not_found", False)
+        self._local.remember_not_found = True
+        try:
+            yield
+        finally:
+            self._local.remember_not_found = previous
 
     def _new_session(self):
         if hasattr(self, 'sess') and self.sess:
@@ -109,10 +202,16 @@ class Knex:
             return True
 
 
-    def _logging_info(self, **kwargs):
-        base = {"endpoint_url": self.endpoint_url, "headers": self.headers}
-        base.update(kwargs)
-        return base
+    def _render_request(self, url, json=None):
+        """Return a description of a request for debug logs.
+
+        Only call this if debug logging is enabled, rendering large bodies
+        is expensive. Bodies are truncated and auth tokens are never shown.
+        """
+        info = {"endpoint_url": self.endpoint_url, "url": url, "authenticated": bool(self.auth)}
+        if json is not None:
+            info["json"] = truncate_for_log(jsonlib.dumps(json, default=str))
+        return info
 
     def _clean_url(self, url, url_options={}):
         url = clean_url(url)
@@ -128,6 +227,62 @@ class Knex:
                 url += "?" + opts
         return url
 
+    def _encode_json_body(self, json):
+        """Return a tuple of (body bytes, headers) for a JSON request body.
+
+        Bodies of at least `compress_threshold` bytes are gzipped. Set
+        `compress_threshold` to None to disable compression.
+        """
+        body = jsonlib.dumps(json, allow_nan=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.compress_threshold is not None and len(body) >= self.compress_threshold:
+            body = gzip.compress(body, compresslevel=GZIP_COMPRESSION_LEVEL, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def _send(self, method, url, json=None):
+        """Send a request and record metrics for it.
+
+        JSON bodies are compressed if they are large. If the server rejects
+        the content encoding of a compressed body we resend it uncompressed
+        and stop compressing requests from this knex.
+        """
+        key = endpoint_key(method, url)
+        body, headers = None, None
+        if json is not None:
+            body, headers = self._encode_json_body(json)
+        response = self._timed_request(key, method, url, body, headers)
+        if headers and "Content-Encoding" in headers and _rejects_encoding(response):
+            logger.info(f"Server rejected gzipped request body, disabling compression. {url}")
+            self.hooks.emit(RETRY_SCHEDULED, endpoint=key, attempt=1, delay=0)
+            self.compress_threshold = None
+            body, headers = self._encode_json_body(json)
+            response = self._timed_request(key, method, url, body, headers)
+        return response
+
+    def _timed_request(self, key, method, url, body, headers):
+        self.hooks.emit(REQUEST_START, method=method, url=url, endpoint=key)
+        start = perf_counter()
+        try:
+            response = self.transport.send(self.sess, method, url, data=body, headers=headers)
+        except Exception:
+            self.hooks.emit(
+                REQUEST_FINISH, method=method, url=url, endpoint=key, status_code=None,
+                seconds=perf_counter() - start, bytes_out=len(body or b""), bytes_in=0,
+            )
+            raise
+        bytes_in = response.headers.get("Content-Length")
+        bytes_in = int(bytes_in) if bytes_in else len(response.content or b"")
+        self.hooks.emit(
+            REQUEST_FINISH, method=method, url=url, endpoint=key, status_code=response.status_code,
+            seconds=perf_counter() - start, bytes_out=len(body or b""), bytes_in=bytes_in,
+        )
+        return response
+
+    def metrics(self):
+        """Return a snapshot of the requests and transfers made by this knex."""
+        return self._metrics.snapshot()
+
     def add_api_token(self, token):
         self.auth = TokenAuth(token)
         self.sess = self._new_session()
@@ -146,7 +301,8 @@ class Knex:
                 raise GeoseeqTimeoutError(e, response.content)
             raise GeoseeqOtherError(e, response.content)
         except Exception:
-            logger.debug(f"Request failed. {response}\n{response.content}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Request failed. {response}\n{truncate_for_log(response.content)}")
             raise
         if json_response:
             return response.json()
@@ -155,56 +311,36 @@ class Knex:
     def instance_code(self):
         return "gsr1"  # TODO
 
-    def get(self, url, url_options={}, **kwargs):
+    def _request(self, method, url, json=None, url_options={}, **kwargs):
         url = self._clean_url(url, url_options=url_options)
-        d = self._logging_info(url=url, auth_token=self.auth)
         self.check_auth_required()
-        logger.debug(f"Sending GET request. {d}")
-        response = self.sess.get(f"{self.endpoint_url}/{url}")
-        resp = self._handle_response(response, **kwargs)
-        return resp
+        remember_not_found = method == "GET" and getattr(self._local, "remember_not_found", False)
+        if remember_not_found and url in self.not_found:
+            logger.debug(f"Skipping request, recently not found. {url}")
+            raise GeoseeqNotFoundError(f"Recently not found: {url}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending {method} request. {self._render_request(url, json)}")
+        response = self._send(method, f"{self.endpoint_url}/{url}", json)
+        if remember_not_found and response.status_code == 404:
+            self.not_found.add(url)
+        elif method != "GET" and response.ok:
+            self.not_found.clear()  # the write may have created something not found before
+        return self._handle_response(response, **kwargs)
+
+    def get(self, url, url_options={}, **kwargs):
+        return self._request("GET", url, url_options=url_options, **kwargs)
 
     def post(self, url, json={}, url_options={}, **kwargs):
-        url = self._clean_url(url, url_options=url_options)
-        d = self._logging_info(url=url, auth_token=self.auth, json=json)
-        self.check_auth_required()
-        logger.debug(f"Sending POST request. {d}")
-        response = self.sess.post(
-            f"{self.endpoint_url}/{url}",
-            json=json
-        )
-        return self._handle_response(response, **kwargs)
+        return self._request("POST", url, json=json, url_options=url_options, **kwargs)
 
     def put(self, url, json={}, url_options={}, **kwargs):
-        url = self._clean_url(url, url_options=url_options)
-        d = self._logging_info(url=url, auth_token=self.auth, json=json)
-        self.check_auth_required()
-        logger.debug(f"Sending PUT request. {d}")
-        response = self.sess.put(
-            f"{self.endpoint_url}/{url}",
-            json=json,
-        )
-        return self._handle_response(response, **kwargs)
+        return self._request("PUT", url, json=json, url_options=url_options, **kwargs)
 
     def patch(self, url, json={}, url_options={}, **kwargs):
-        url = self._clean_url(url, url_options=url_options)
-        d = self._logging_info(url=url, auth_token=self.auth, json=json)
-        self.check_auth_required()
-        logger.debug(f"Sending PATCH request. {d}")
-        response = self.sess.patch(
-            f"{self.endpoint_url}/{url}",
-            json=json,
-        )
-        return self._handle_response(response, **kwargs)
+        return self._request("PATCH", url, json=json, url_options=url_options, **kwargs)
 
     def delete(self, url, json={}, url_options={}, **kwargs):
-        url = self._clean_url(url, url_options=url_options)
-        d = self._logging_info(url=url, auth_token=self.auth)
-        self.check_auth_required()
-        logger.debug(f"Sending DELETE request. {d}")
-        response = self.sess.delete(f"{self.endpoint_url}/{url}", json=json)
-        logger.debug(f"DELETE request response:\n{response}")
-        return self._handle_response(response, json_response=False, **kwargs)
+        return self._request("DELETE", url, json=json, url_options=url_options, json_response=False, **kwargs)
 
     @classmethod
     def load_profile(cls, profile=""):
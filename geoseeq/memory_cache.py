@@ -0,0 +1,165 @@
+"""A process wide, in memory tier in front of the persistent blob cache.
+
+Crawls call `parent.idem()` for every child, so the same organization and
+project blobs are read over and over. `MemoryCache` keeps recently used
+blobs in a thread safe LRU bounded by entry count and total size, with a
+TTL. `TieredCache` checks it before the persistent cache and clears both
+on `clear_blob`. Its memory keys are prefixed with the id of the persistent
+store and the API endpoint, so caches of different backends or servers
+sharing the process wide tier never read each other's blobs.
+
+Blobs are kept as JSON text and parsed on every hit, callers often mutate
+the blobs they load (e.g. `sample.metadata[...] = ...`) and must not change
+the cached copy. The memory tier is per process; blobs cleared in another
+process stay in this one until their TTL runs out, which is never longer
+than the timeout of the persistent cache. Listing generations are not kept
+in memory, so listings invalidated by another process are refetched at once.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from .file_system_cache import hash_obj
+
+MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("GEOSEEQ_MEMORY_CACHE_MAX_ENTRIES", 10 * 1000))
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get("GEOSEEQ_MEMORY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+MEMORY_CACHE_TTL = float(os.environ.get("GEOSEEQ_MEMORY_CACHE_TTL", 5 * 60))  # seconds
+
+
+class MemoryCache:
+    """A thread safe LRU of JSON text, bounded by entries and bytes, with a TTL."""
+
+    def __init__(self, max_entries=MEMORY_CACHE_MAX_ENTRIES, max_bytes=MEMORY_CACHE_MAX_BYTES,
+                 ttl=MEMORY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (json text, expires at)
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the JSON text for `key` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if monotonic() > entry[1]:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, text, ttl=None):
+        """Store `text` for `ttl` seconds, at most the TTL of this cache."""
+        if len(text) > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (text, monotonic() + ttl)
+            self._n_bytes += len(text)
+            while len(self._entries) > self.max_entries or self._n_bytes > self.max_bytes:
+                _, (old_text, _) = self._entries.popitem(last=False)
+                self._n_bytes -= len(old_text)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._n_bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._n_bytes -= len(entry[0])
+
+
+PROCESS_MEMORY_CACHE = MemoryCache()
+
+MEMORY_UNCACHED_PREFIXES = ("listing-generation/",)
+
+
+def store_id(cache):
+    """Return an id for the store behind `cache`, the same for caches sharing it."""
+    cache_id = getattr(cache, "cache_id", None)
+    if cache_id is None:
+        cache_id = f"{type(cache).__name__}:{id(cache)}"
+    return cache_id
+
+
+class TieredCache:
+    """Check a memory cache before a persistent cache with the same interface.
+
+    `namespace`, e.g. the API endpoint, separates the memory keys of caches
+    over the same store.
+    """
+
+    def __init__(self, persistent, memory=PROCESS_MEMORY_CACHE, namespace=""):
+        self.persistent = persistent
+        self.memory = memory
+        self.no_cache = persistent.no_cache
+        self.namespace = f"{store_id(persistent)}|{namespace}"
+        self.memory_ttl = getattr(persistent, "timeout", None)
+
+    def __getstate__(self):
+        # other processes use their own process wide memory cache
+        state = self.__dict__.copy()
+        state["memory"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memory = PROCESS_MEMORY_CACHE
+
+    def _memory_key(self, obj):
+        """Return the memory key of `obj`, None if it is not kept in memory."""
+        if isinstance(obj, str) and obj.startswith(MEMORY_UNCACHED_PREFIXES):
+            return None
+        return f"{self.namespace}/{hash_obj(obj)}"
+
+    def clear_blob(self, obj):
+        if self.no_cache:
+            return
+        key = self._memory_key(obj)
+        if key is not None:
+            self.memory.delete(key)
+        self.persistent.clear_blob(obj)
+
+    def get_cached_blob(self, obj):
+        if self.no_cache:
+            return None
+        key = self._memory_key(obj)
+        if key is None:
+            return self.persistent.get_cached_blob(obj)
+        text = self.memory.get(key)
+        if text is not None:
+            return json.loads(text)
+        blob = self.persistent.get_cached_blob(obj)
+        if blob is not None:
+            self.memory.put(key, json.dumps(blob), ttl=self.memory_ttl)
+        return blob
+
+    def cache_blob(self, obj, blob):
+        if self.no_cache:
+            return None
+        key = self._memory_key(obj)
+        if key is not None:
+            self.memory.put(key, json.dumps(blob), ttl=self.memory_ttl)
+        return self.persistent.cache_blob(obj, blob)
+
+    def flush(self):
+        self.persistent.flush()
@@ -0,0 +1,350 @@
+"""Per-endpoint request metrics and transfer statistics for Knex.
+
+Every Knex records into its own `KnexMetrics` and into the process wide
+`PROCESS_METRICS`. The process wide metrics can be written out when the
+interpreter exits by setting environment variables:
+
+ - `GEOSEEQ_METRICS_JSON`: path to a JSON file
+ - `GEOSEEQ_METRICS_PROM`: path to a Prometheus text format file, suitable
+   for the node exporter textfile collector
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+from tempfile import NamedTemporaryFile
+
+from .hooks import (
+    REQUEST_FINISH,
+    RETRY_SCHEDULED,
+    PART_UPLOADED,
+    PART_DOWNLOADED,
+    FILE_COMPLETED,
+)
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UUID_REGEX = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+NESTED_COLLECTIONS = {"sample_groups", "samples", "analysis_results", "fields"}
+
+
+def endpoint_key(method, url):
+    """Return a low cardinality key for a request, e.g. `GET samples/{uuid}`.
+
+    Query strings are dropped, UUIDs are replaced with `{uuid}` and object
+    names in `nested/` URLs are replaced with `{name}`.
+    """
+    path = url.split("?")[0].strip("/")
+    if "://" in path:  # absolute urls, e.g. pagination links
+        path = path.split("/api/", 1)[-1]
+    tkns = path.split("/")
+    if tkns[0] == "nested":
+        tkns = ["nested"] + [
+            tkn if tkn in NESTED_COLLECTIONS else "{name}" for tkn in tkns[1:]
+        ]
+    else:
+        tkns = ["{uuid}" if UUID_REGEX.match(tkn) else tkn for tkn in tkns]
+    return f"{method.upper()} {'/'.join(tkns)}"
+
+
+class Histogram:
+    """A fixed bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        """Return a dict with cumulative bucket counts, keyed by upper bound."""
+        cumulative, total = {}, 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.count = 0
+        self.latency = Histogram()
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.retries = 0
+        self.status_codes = {}
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "latency": self.latency.to_dict(),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "retries": self.retries,
+            "status_codes": dict(self.status_codes),
+        }
+
+
+class TransferStats:
+
+    def __init__(self):
+        self.files = 0
+        self.file_bytes = 0
+        self.file_seconds = 0.0
+        self.parts = 0
+        self.part_bytes = 0
+        self.part_latency = Histogram()
+        self.retries = 0
+
+    def to_dict(self):
+        part_seconds = self.part_latency.sum
+        return {
+            "files": self.files,
+            "file_bytes": self.file_bytes,
+            "file_seconds": self.file_seconds,
+            "file_throughput_bytes_per_sec": self.file_bytes / self.file_seconds if self.file_seconds else 0.0,
+            "parts": self.parts,
+            "part_bytes": self.part_bytes,
+            "part_latency": self.part_latency.to_dict(),
+            "part_throughput_bytes_per_sec": self.part_bytes / part_seconds if part_seconds else 0.0,
+            "retries": self.retries,
+        }
+
+
+class KnexMetrics:
+    """Thread safe counters for requests made and bytes transferred.
+
+    If `parent` is given every observation is recorded there as well.
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __reduce__(self):
+        # Locks cannot be pickled. Knexes sent to worker processes start with
+        # empty metrics that feed the process wide metrics of the worker.
+        return (_new_knex_metrics, ())
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.transfers = {}
+
+    def _endpoint(self, key):
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointStats()
+        return self.endpoints[key]
+
+    def _transfer(self, direction):
+        if direction not in self.transfers:
+            self.transfers[direction] = TransferStats()
+        return self.transfers[direction]
+
+    def record_request(self, key, status_code, seconds, bytes_out=0, bytes_in=0):
+        """Record one HTTP request. `status_code` is None if no response was received."""
+        status = str(status_code) if status_code is not None else "error"
+        with self._lock:
+            stats = self._endpoint(key)
+            stats.count += 1
+            stats.latency.observe(seconds)
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+        if self.parent:
+            self.parent.record_request(key, status_code, seconds, bytes_out=bytes_out, bytes_in=bytes_in)
+
+    def record_retry(self, key):
+        """Record that a request to `key` is being retried."""
+        with self._lock:
+            self._endpoint(key).retries += 1
+        if self.parent:
+            self.parent.record_retry(key)
+
+    def record_part(self, direction, n_bytes, seconds):
+        """Record one part (or chunk) of an upload or download."""
+        with self._lock:
+            stats = self._transfer(direction)
+            stats.parts += 1
+            stats.part_bytes += n_bytes
+            stats.part_latency.observe(seconds)
+        if self.parent:
+            self.parent.record_part(direction, n_bytes, seconds)
+
+    def record_part_retry(self, direction):
+        with self._lock:
+            self._transfer(direction).retries += 1
+        if self.parent:
+            self.parent.record_part_retry(direction)
+
+    def record_file(self, direction, n_bytes, seconds):
+        """Record a complete file upload or download."""
+        with self._lock:
+            stats = self._transfer(direction)
+            stats.files += 1
+            stats.file_bytes += n_bytes
+            stats.file_seconds += seconds
+        if self.parent:
+            self.parent.record_file(direction, n_bytes, seconds)
+
+    def subscribe_to(self, bus):
+        """Record metrics for the events emitted on a HookBus."""
+        for event in (REQUEST_FINISH, RETRY_SCHEDULED, PART_UPLOADED, PART_DOWNLOADED, FILE_COMPLETED):
+            bus.subscribe(event, self._on_event)
+        return self
+
+    def _on_event(self, event, **payload):
+        if event == REQUEST_FINISH:
+            self.record_request(
+                payload["endpoint"], payload["status_code"], payload["seconds"],
+                bytes_out=payload["bytes_out"], bytes_in=payload["bytes_in"],
+            )
+        elif event == RETRY_SCHEDULED:
+            if "endpoint" in payload:
+                self.record_retry(payload["endpoint"])
+            else:
+                self.record_part_retry(payload["direction"])
+        elif event == PART_UPLOADED:
+            self.record_part("upload", payload["n_bytes"], payload["seconds"])
+        elif event == PART_DOWNLOADED:
+            self.record_part("download", payload["n_bytes"], payload["seconds"])
+        elif event == FILE_COMPLETED:
+            self.record_file(payload["direction"], payload["n_bytes"], payload["seconds"])
+
+    def snapshot(self):
+        """Return a JSON serializable copy of the current metrics."""
+        with self._lock:
+            return {
+                "endpoints": {key: stats.to_dict() for key, stats in self.endpoints.items()},
+                "transfers": {key: stats.to_dict() for key, stats in self.transfers.items()},
+            }
+
+    def top_endpoints(self, n=10):
+        """Return a list of (endpoint, count, total seconds) sorted by total time.
+
+        Return every endpoint if `n` is None.
+        """
+        snapshot = self.snapshot()
+        rows = [
+            (key, stats["count"], stats["latency"]["sum"])
+            for key, stats in snapshot["endpoints"].items()
+        ]
+        return sorted(rows, key=lambda row: -row[2])[:n]
+
+
+PROCESS_METRICS = KnexMetrics()
+
+
+def _new_knex_metrics():
+    return KnexMetrics(parent=PROCESS_METRICS)
+
+
+def _escape_label(val):
+    return str(val).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_histogram(lines, name, labels, histogram):
+    for bound, count in histogram["buckets"].items():
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram['sum']}")
+    lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+
+
+def to_prometheus(snapshot):
+    """Return a metrics snapshot in the Prometheus text exposition format."""
+    lines = []
+    endpoints = snapshot["endpoints"]
+    lines += [
+        "# HELP geoseeq_requests_total Requests sent to the GeoSeeq API.",
+        "# TYPE geoseeq_requests_total counter",
+    ]
+    for key, stats in endpoints.items():
+        for status, count in stats["status_codes"].items():
+            lines.append(f'geoseeq_requests_total{{endpoint="{_escape_label(key)}",status="{status}"}} {count}')
+    lines += [
+        "# HELP geoseeq_request_duration_seconds Latency of requests to the GeoSeeq API.",
+        "# TYPE geoseeq_request_duration_seconds histogram",
+    ]
+    for key, stats in endpoints.items():
+        _prometheus_histogram(lines, "geoseeq_request_duration_seconds", f'endpoint="{_escape_label(key)}"', stats["latency"])
+    for field, help_text in [
+        ("bytes_out", "Bytes sent to the GeoSeeq API."),
+        ("bytes_in", "Bytes received from the GeoSeeq API."),
+        ("retries", "Requests to the GeoSeeq API that were retried."),
+    ]:
+        name = f"geoseeq_request_{field}_total"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for key, stats in endpoints.items():
+            lines.append(f'{name}{{endpoint="{_escape_label(key)}"}} {stats[field]}')
+
+    transfers = snapshot["transfers"]
+    for field, help_text in [
+        ("files", "Files transferred."),
+        ("file_bytes", "Bytes in files transferred."),
+        ("parts", "File parts transferred."),
+        ("retries", "File parts that were retried."),
+    ]:
+        name = f"geoseeq_transfer_{field}_total"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for direction, stats in transfers.items():
+            lines.append(f'{name}{{direction="{direction}"}} {stats[field]}')
+    lines += [
+        "# HELP geoseeq_transfer_part_duration_seconds Latency of file part transfers.",
+        "# TYPE geoseeq_transfer_part_duration_seconds histogram",
+    ]
+    for direction, stats in transfers.items():
+        _prometheus_histogram(lines, "geoseeq_transfer_part_duration_seconds", f'direction="{direction}"', stats["part_latency"])
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(filepath, text):
+    """Write `text` to `filepath` so readers never see a partial file."""
+    dirpath = os.path.dirname(os.path.abspath(filepath))
+    with NamedTemporaryFile("w", dir=dirpath, delete=False) as f:
+        f.write(text)
+    os.replace(f.name, filepath)
+
+
+def write_json(filepath, snapshot=None):
+    snapshot = snapshot or PROCESS_METRICS.snapshot()
+    _atomic_write(filepath, json.dumps(snapshot, indent=2))
+
+
+def write_prometheus(filepath, snapshot=None):
+    snapshot = snapshot or PROCESS_METRICS.snapshot()
+    _atomic_write(filepath, to_prometheus(snapshot))
+
+
+def _write_metrics_at_exit(json_path, prom_path):
+    snapshot = PROCESS_METRICS.snapshot()
+    try:
+        if json_path:
+            write_json(json_path, snapshot)
+        if prom_path:
+            write_prometheus(prom_path, snapshot)
+    except OSError as e:
+        logger.warning(f"Could not write GeoSeeq metrics. {e}")
+
+
+def write_metrics_at_exit(json_path=None, prom_path=None):
+    """Write the process wide metrics to the given files when the interpreter exits."""
+    atexit.register(_write_metrics_at_exit, json_path, prom_path)
+
+
+if os.environ.get("GEOSEEQ_METRICS_JSON") or os.environ.get("GEOSEEQ_METRICS_PROM"):
+    write_metrics_at_exit(
+        json_path=os.environ.get("GEOSEEQ_METRICS_JSON"),
+        prom_path=os.environ.get("GEOSEEQ_METRICS_PROM"),
+    )
@@ -0,0 +1,73 @@
+"""A short lived, per Knex record of lookups that returned 404.
+
+Many IDs can be one of two types, e.g. a folder UUID may be a sample or a
+project folder, and resolvers guess one type before falling back to the
+other. `NotFoundCache` remembers which guessed URLs were not found so the
+same failing request is not sent twice within `NOT_FOUND_TTL`, and which guess
+resolved the last ID of each kind so batches of IDs of one type try the
+right endpoint first. Only GETs sent inside `knex.remembering_not_found()`,
+as `resolve_first` does for its guesses, are recorded and skipped.
+
+Any successful write through the Knex clears the URLs, since it may have
+created what was not found.
+"""
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+NOT_FOUND_TTL = float(os.environ.get("GEOSEEQ_NOT_FOUND_TTL", 30))  # seconds, 0 disables
+NOT_FOUND_MAX_ENTRIES = 10 * 1000
+
+
+class NotFoundCache:
+    """Remember URLs that returned 404 and the guesses that resolved IDs."""
+
+    def __init__(self, ttl=NOT_FOUND_TTL, max_entries=NOT_FOUND_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hints = {}  # kind of ID -> label of the guess that last resolved one
+        self._urls = OrderedDict()  # url -> expires at
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        with self._lock:
+            expires_at = self._urls.get(url)
+            if expires_at is None:
+                return False
+            if monotonic() > expires_at:
+                del self._urls[url]
+                return False
+            return True
+
+    def add(self, url):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._urls.pop(url, None)
+            self._urls[url] = monotonic() + self.ttl
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+    def order(self, kind, labels):
+        """Return `labels` with the one that last resolved an ID of `kind` first."""
+        hint = self.hints.get(kind)
+        if hint not in labels:
+            return list(labels)
+        return [hint] + [label for label in labels if label != hint]
+
+    def record(self, kind, label):
+        self.hints[kind] = label
@@ -12,6 +12,7 @@ class Organization(RemoteObject):
     ]
     parent_field = None
     url_prefix = 'organizations'
+    uuid_url_prefix = 'organizations'
 
     def __init__(self, knex, name):
         super().__init__(self)
@@ -22,12 +23,10 @@ class Organization(RemoteObject):
         return f'nested/{self.name}'
 
     def _save(self):
-        data = {
-            field: getattr(self, field)
-            for field in self.remote_fields if hasattr(self, field)
-        }
-        url = f'{self.url_prefix}/{self.uuid}'
-        self.knex.put(url, json=data)
+        data = self.get_patch_data()
+        if data:
+            url = f'{self.url_prefix}/{self.uuid}'
+            self.knex.patch(url, json=data)
 
     def _get(self, allow_overwrite=False):
         """Fetch the result from the server."""
@@ -1,10 +1,10 @@
 from .result import ProjectResultFolder
 from .remote_object import RemoteObject
+from .records import iter_column_pages, iter_records
 from .sample import Sample
 from .utils import paginated_iterator
 from .pipeline import Pipeline
 import json
-import pandas as pd
 import logging
 
 logger = logging.getLogger("geoseeq_api")
@@ -25,6 +25,8 @@ class Project(RemoteObject):
     ]
     parent_field = "org"
     url_prefix = "sample_groups"
+    uuid_url_prefix = "sample_groups"
+    parent_blob_field = "organization_obj"
 
     def __init__(
         self,
@@ -74,10 +76,16 @@ class Project(RemoteObject):
     def nested_url(self):
         return self.org.nested_url() + f"/sample_groups/{self.name}"
 
+    def listing_urls(self):
+        return [f"sample_groups/{self.uuid}/samples"] if self.uuid else []
+
     def _save_group_obj(self):
-        data = self.get_post_data()
-        url = f"sample_groups/{self.uuid}"
-        self.knex.put(url, json=data)
+        data = self.get_patch_data()
+        if self.new_org:
+            data["organization"] = self.get_post_data()["organization"]
+        if data:
+            url = f"sample_groups/{self.uuid}"
+            self.knex.patch(url, json=data)
 
     def _save_sample_list(self):
         sample_uuids = []
@@ -106,14 +114,17 @@ class Project(RemoteObject):
 
     def _get(self, allow_overwrite=False):
         """Fetch the result from the server."""
-        self.org.idem()
         blob = self.get_cached_blob()
         if not blob:
-            blob = self.knex.get(self.nested_url())
+            blob = self._get_nested_blob(self.nested_url())
             self.load_blob(blob, allow_overwrite=allow_overwrite)
-            self.cache_blob(blob)
+            self.cache_blob(blob, include_parents=True)
         else:
             self.load_blob(blob)
+        self._load_parent_blobs(blob)
+
+    def _fetch_parent(self):
+        return self.org._idem()
 
     def _create(self):
         self.org.idem()
@@ -167,8 +178,15 @@ class Project(RemoteObject):
         Alias for result_folder."""
         return self.result_folder(*args, **kwargs)
 
-    def get_samples(self, cache=True, error_handler=None):
-        """Yield samples fetched from the server."""
+    def get_samples(self, cache=True, error_handler=None, records=False):
+        """Yield samples fetched from the server.
+
+        With `records` yield immutable records instead, see `geoseeq.records`.
+        """
+        if records:
+            url = f"sample_groups/{self.uuid}/samples"
+            yield from iter_records(self.knex, url, Sample, self, error_handler=error_handler)
+            return
         if cache and self._get_sample_cache:
             for sample in self._get_sample_cache:
                 yield sample
@@ -190,6 +208,10 @@ class Project(RemoteObject):
             for sample in self._get_sample_cache:
                 yield sample
 
+    def get_sample_columns(self, fields=("uuid", "name")):
+        """Yield each page of this project's samples as a dict of field to list of values."""
+        return iter_column_pages(self.knex, f"sample_groups/{self.uuid}/samples", fields)
+
     def get_sample_uuids(self, cache=True, error_handler=None):
         """Yield samples uuids fetched from the server."""
         if cache and self._get_sample_cache:
@@ -218,17 +240,24 @@ class Project(RemoteObject):
         Alias for get_result_folders."""
         return self.get_result_folders(cache=cache)
 
-    def get_result_folders(self, cache=True):
-        """Yield ProjectResultFolder objects for this project fetched from the server."""
+    def get_result_folders(self, cache=True, records=False):
+        """Yield ProjectResultFolder objects for this project fetched from the server.
+
+        With `records` yield immutable records instead, see `geoseeq.records`.
+        """
+        if records:
+            url = f"sample_group_ars?sample_group_id={self.uuid}"
+            yield from iter_records(self.knex, url, ProjectResultFolder, self)
+            return
         if cache and self._get_result_cache:
             for ar in self._get_result_cache:
                 yield ar
             return
         url = f"sample_group_ars?sample_group_id={self.uuid}"
-        result = self.knex.get(url)
-        for result_blob in result["results"]:
+        for result_blob in paginated_iterator(self.knex, url):
             result = self.analysis_result(result_blob["module_name"])
             result.load_blob(result_blob)
+            result.cache_blob(result_blob)
             # We just fetched from the server so we change the RemoteObject
             # meta properties to reflect that
             result._already_fetched = True
@@ -253,6 +282,7 @@ class Project(RemoteObject):
 
     def get_sample_metadata(self):
         """Return a pandas dataframe with sample metadata."""
+        import pandas as pd  # imported lazily, pandas is slow to import
         url = f"sample_groups/{self.uuid}/metadata"
         blob = self.knex.get(url)
         return pd.DataFrame.from_dict(blob, orient="index")
@@ -0,0 +1,60 @@
+"""Immutable records and columnar pages for large listings.
+
+Listing methods build a full `RemoteObject` per blob: the blob is checked
+field by field, the parent is wired in and the blob is cached. Callers that
+only read a few fields of many samples or files can pass `records=True` to
+get records instead. A record is a named tuple of the type's remote fields
+and its parent, `record.to_object()` builds the full object when needed.
+
+`iter_column_pages` goes further and yields each page of a listing as a
+dict of field name to a list of values, one per blob.
+"""
+from collections import namedtuple
+
+from .utils import paginated_iterator, paginated_pages
+
+
+class RecordMixin:
+    """Methods shared by every record type."""
+
+    __slots__ = ()
+    _object_type = None
+
+    def to_blob(self):
+        """Return the remote fields of this record as a dict."""
+        blob = self._asdict()
+        del blob["parent"]
+        return blob
+
+    def to_object(self):
+        """Return the full RemoteObject for this record, marked as fetched."""
+        obj = self._object_type._new_from_record(self)
+        obj.load_blob(self.to_blob())
+        obj._already_fetched = True
+        obj._modified = False
+        return obj
+
+
+def make_record_type(cls):
+    """Return a new named tuple type for the remote fields of `cls` and a parent."""
+    fields = list(cls.remote_fields) + ["parent"]
+    base = namedtuple(f"{cls.__name__}Record", fields)
+    return type(base.__name__, (RecordMixin, base), {"__slots__": (), "_object_type": cls})
+
+
+def iter_records(knex, url, cls, parent, error_handler=None):
+    """Yield a record of type `cls` for every blob in the listing at `url`."""
+    record_type = cls.record_type()
+    fields = cls.remote_fields
+    for blob in paginated_iterator(knex, url, error_handler=error_handler):
+        yield record_type(*[blob.get(field) for field in fields], parent)
+
+
+def iter_column_pages(knex, url, fields):
+    """Yield every page of the listing at `url` as a dict of field to list of values.
+
+    Fields missing from a blob are None.
+    """
+    for page in paginated_pages(knex, url):
+        blobs = page["results"]
+        yield {field: [blob.get(field) for blob in blobs] for field in fields}
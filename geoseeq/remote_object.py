@@ -1,8 +1,15 @@
+import hashlib
+import json
 import logging
+from copy import copy
+from itertools import chain
 
 from requests.exceptions import HTTPError
 
-from .file_system_cache import FileSystemCache
+from .cache_backends import default_cache
+from .knex import GeoseeqNotFoundError, truncate_for_log
+from .records import make_record_type
+from .utils import invalidate_listing
 
 logger = logging.getLogger("geoseeq_api")  # Same name as calling module
 logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
@@ -16,26 +23,163 @@ class RemoteObjectOverwriteError(RemoteObjectError):
     pass
 
 
+def uuid_cache_key(uuid_url_prefix, uuid):
+    """Return the cache key of the blob fetched from `{uuid_url_prefix}/{uuid}`."""
+    return f"uuid/{uuid_url_prefix}/{uuid}"
+
+
+_EMPTY_CLEAN_STATES = {}  # clean states with only empty containers, shared between objects
+
+
+def _container_digest(val):
+    """Return a short digest of a dict or list field's contents."""
+    try:
+        text = json.dumps(val, sort_keys=True, default=str)
+    except TypeError:  # keys of mixed types can not be sorted
+        text = json.dumps(val, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _container_snapshot(obj):
+    """Return digests of the dict and list fields of `obj` as (field, digest) pairs.
+
+    Setting a field marks it dirty, but changes made inside a container, e.g.
+    to metadata, are only found by comparing it to this snapshot. Digests
+    are much cheaper to take and keep than copies of every fetched object.
+    """
+    containers = [
+        (field, val)
+        for field in obj.remote_fields
+        for val in (getattr(obj, field, None),)
+        if isinstance(val, (dict, list))
+    ]
+    if any(val for _, val in containers):
+        return tuple((field, _container_digest(val)) for field, val in containers)
+    key = tuple((field, type(val)) for field, val in containers)
+    state = _EMPTY_CLEAN_STATES.get(key)
+    if state is None:
+        state = _EMPTY_CLEAN_STATES.setdefault(
+            key, tuple((field, _container_digest(val)) for field, val in containers),
+        )
+    return state
+
+
 class RemoteObject:
+    # Types listed by the thousand (samples, folders and files) declare
+    # __slots__ all the way up so their instances have no __dict__.
+    __slots__ = (
+        "knex", "uuid", "created_at", "updated_at", "blob", "url_options",
+        "_already_fetched", "_modified", "_deleted", "_revalidating",
+        "_clean_state", "_dirty", "_clean_parent", "__weakref__",
+    )
+    remote_fields = []
     optional_remote_fields = []
+    parent_field = None
+    uuid_url_prefix = None  # URL that fetches this type by UUID, its blobs are cached under it too
+    parent_blob_field = None  # Key of the parent's blob in this object's blob
+    _tracked_fields = frozenset()  # remote fields and the parent field, setting one marks the object modified
+    _optional_fields = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        tracked = set(cls.remote_fields)
+        if cls.parent_field:
+            tracked.add(cls.parent_field)
+        cls._tracked_fields = frozenset(tracked)
+        cls._optional_fields = frozenset(cls.optional_remote_fields)
+
+    @classmethod
+    def record_type(cls):
+        """Return the immutable record type for blobs of this type, see `geoseeq.records`."""
+        record_type = cls.__dict__.get("_record_type")
+        if record_type is None:
+            record_type = cls._record_type = make_record_type(cls)
+        return record_type
+
+    @classmethod
+    def _new_from_record(cls, record):
+        """Return an unfetched object with the names in `record`."""
+        raise NotImplementedError(f"{cls.__name__} has no record type.")
 
     def __init__(self, *args, **kwargs):
         self._already_fetched = False
         self._modified = False
         self._deleted = False
+        self._revalidating = False  # True on copies that refresh a stale cached blob
+        self._clean_state = None  # container snapshot taken when last fetched or saved
+        self._dirty = None  # remote fields and the parent field set since then
+        self._clean_parent = None  # the parent when last fetched or saved, if it was set since
         self.blob = None
         self.uuid = None
-        self.cache = FileSystemCache()
         self.url_options = {}
 
+    def __setstate__(self, state):
+        # Restore attributes directly, setting them normally marks the object modified
+        dict_state, slot_state = state if isinstance(state, tuple) else (state, None)
+        for key, val in chain((dict_state or {}).items(), (slot_state or {}).items()):
+            object.__setattr__(self, key, val)
+
     def __setattr__(self, key, val):
         if hasattr(self, "deleted") and self._deleted:
             logger.error(f"Attribute cannot be set, RemoteObject has been deleted. {self}")
             raise RemoteObjectError("This object has been deleted.")
+        if key == self.parent_field and getattr(self, "_clean_state", None) is not None and not self.parent_changed():
+            super(RemoteObject, self).__setattr__("_clean_parent", getattr(self, key, None))
         super(RemoteObject, self).__setattr__(key, val)
-        if key in self.remote_fields or key == self.parent_field:
+        if key in self._tracked_fields:
             logger.debug(f'Setting RemoteObject modified. key "{key}"')
             super(RemoteObject, self).__setattr__("_modified", True)
+            if getattr(self, "_clean_state", None) is not None:
+                if self._dirty is None:
+                    super(RemoteObject, self).__setattr__("_dirty", set())
+                self._dirty.add(key)
+        elif key == "_modified" and not val and getattr(self, "_already_fetched", False):
+            # The object now matches the server, start finding dirty fields from here
+            self._mark_clean()
+
+    def _mark_clean(self):
+        object.__setattr__(self, "_clean_state", _container_snapshot(self))
+        object.__setattr__(self, "_dirty", None)
+        object.__setattr__(self, "_clean_parent", None)
+
+    def dirty_fields(self):
+        """Return the remote fields changed since this object was last fetched or saved.
+
+        Changes inside dict and list fields, e.g. `sample.metadata["key"] = 1`,
+        are included. Every field is dirty if the object was never fetched.
+        """
+        clean_state = getattr(self, "_clean_state", None)
+        if clean_state is None:
+            return [field for field in self.remote_fields if getattr(self, field, None) is not None]
+        dirty = set(self._dirty or ())
+        dirty.update(
+            field for field, clean in clean_state
+            if field not in dirty and _container_digest(getattr(self, field, None)) != clean
+        )
+        return [field for field in self.remote_fields if field in dirty]
+
+    def parent_changed(self):
+        """Return True if the parent was set since this object was last fetched or saved."""
+        dirty = getattr(self, "_dirty", None)
+        return bool(dirty) and self.parent_field in dirty
+
+    def _moved_from_listing_urls(self):
+        """Return the listing URLs of the parent this object had before its parent was set."""
+        if not self.parent_changed():
+            return []
+        moved = copy(self)
+        object.__setattr__(moved, self.parent_field, self._clean_parent)
+        return moved.listing_urls()
+
+    def get_patch_data(self):
+        """Return a dict of the dirty remote fields, the body of a PATCH that saves this object."""
+        return {field: getattr(self, field, None) for field in self.dirty_fields()}
+
+    @property
+    def cache(self):
+        """The blob cache of this object's knex."""
+        cache = getattr(self.knex, "cache", None)
+        return cache if cache is not None else default_cache()
 
     @property
     def inherited_url_options(self):
@@ -47,19 +191,102 @@ class RemoteObject:
     
     def get_remote_fields(self):
         for key in self.remote_fields:
-            yield key, getattr(self, key), key in self.optional_remote_fields
+            yield key, getattr(self, key), key in self._optional_fields
+
+    def listing_urls(self):
+        """Return the URLs of cached listings that include this object."""
+        return []
 
     def invalidate_cache(self):
+        """Evict this object's cached blob and every cached listing that includes it."""
         self.cache.clear_blob(self)
+        if self.uuid_url_prefix and self.uuid:
+            self.cache.clear_blob(uuid_cache_key(self.uuid_url_prefix, self.uuid))
+        for url in self.listing_urls():
+            invalidate_listing(self.knex, url)
 
     def get_cached_blob(self):
+        if self._revalidating:
+            return None
         return self.cache.get_cached_blob(self)
 
-    def cache_blob(self, blob):
-        return self.cache.cache_blob(self, blob)
+    def _cached_blob_refresher(self):
+        """Return a function that fetches this object's blob into the cache without changing this object.
+
+        The copy it fetches into is taken now, before a stale blob is loaded
+        into this object, so the fresh blob never conflicts with the stale one.
+        """
+        fresh = copy(self)
+        object.__setattr__(fresh, "_already_fetched", False)
+        object.__setattr__(fresh, "_revalidating", True)
+        return fresh._get
+
+    def cache_blob(self, blob, include_parents=False):
+        """Cache `blob` under this object's name chain and under its UUID.
+
+        With `include_parents` the parent blobs nested in `blob` are cached
+        too, if they are complete.
+        """
+        self.cache.cache_blob(self, blob)
+        uuid = blob.get("uuid")
+        if self.uuid_url_prefix and uuid:
+            self.cache.cache_blob(uuid_cache_key(self.uuid_url_prefix, uuid), blob)
+        if not include_parents or not self.parent_blob_field:
+            return
+        parent = getattr(self, self.parent_field, None)
+        parent_blob = blob.get(self.parent_blob_field)
+        if isinstance(parent, RemoteObject) and isinstance(parent_blob, dict) and parent.is_complete_blob(parent_blob):
+            parent.cache_blob(parent_blob, include_parents=True)
+
+    def _fetch_parent(self):
+        """Fetch this object's parent after its nested GET failed, e.g. `parent._idem()`.
+
+        Return True if a parent had to be created.
+        """
+        return False
+
+    def _get_nested_blob(self, url, **kwargs):
+        """GET this object's blob from its nested `url` without fetching its parents first.
+
+        If the object is not found the parents are fetched as they always
+        were, which may create them. The GET is retried once if a parent was
+        created, otherwise the 404 stands.
+        """
+        try:
+            return self.knex.get(url, **kwargs)
+        except GeoseeqNotFoundError:
+            if not self._fetch_parent():
+                raise
+            return self.knex.get(url, **kwargs)
+
+    def _load_parent_blobs(self, blob):
+        """Load unfetched parents from the parent blobs nested in `blob`.
+
+        Falls back to `_fetch_parent` if a nested blob is missing or incomplete.
+        """
+        parent = getattr(self, self.parent_field, None) if self.parent_field else None
+        if not isinstance(parent, RemoteObject) or parent._already_fetched:
+            return
+        parent_blob = blob.get(self.parent_blob_field) if self.parent_blob_field else None
+        if not isinstance(parent_blob, dict) or not parent.is_complete_blob(parent_blob):
+            self._fetch_parent()
+            return
+        parent.load_blob(parent_blob)
+        parent._already_fetched = True
+        parent._modified = False
+        parent._register()
+        parent._load_parent_blobs(parent_blob)
+
+    def is_complete_blob(self, blob):
+        """Return True if `blob` has every required remote field of this object."""
+        return all(
+            field in blob for field in self.remote_fields
+            if field not in self._optional_fields
+        )
 
     def load_blob(self, blob, allow_overwrite=False):
-        logger.debug(f"Loading blob. {blob}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Loading blob. {truncate_for_log(str(blob))}")
         if self._deleted:
             logger.error(f"Cannot load blob, RemoteObject has been deleted. {self}")
             raise RemoteObjectError("This object has been deleted.")
@@ -68,7 +295,7 @@ class RemoteObject:
             try:
                 new = blob[field]
             except KeyError:
-                if field not in self.optional_remote_fields:
+                if field not in self._optional_fields:
                     logger.error(f"Blob being loaded is missing key. {field}")
                     raise KeyError(
                         f"Key {field} is missing for object {self} (type {type(self)})\
@@ -120,6 +347,7 @@ class RemoteObject:
             self._get(allow_overwrite=allow_overwrite)
             self._already_fetched = True
             self._modified = False
+            self._register()
         else:
             logger.debug(f"RemoteObject has already been fetched. {self}")
         return self
@@ -130,11 +358,14 @@ class RemoteObject:
             logger.error(f"Cannot create blob, RemoteObject has been deleted. {self}")
             raise RemoteObjectError("This object has been deleted.")
         if not self._already_fetched:
+            if self._queue_create():
+                return self
             logger.debug(f"Creating RemoteBlob. {self}")
-            self.cache.clear_blob(self)
             self._create()
+            self.invalidate_cache()
             self._already_fetched = True
             self._modified = False
+            self._register()
         else:
             logger.debug(f"RemoteObject has already been fetched. {self}")
         return self
@@ -146,36 +377,68 @@ class RemoteObject:
         if self._deleted:
             logger.error(f"Cannot save blob, RemoteObject has been deleted. {self}")
             raise RemoteObjectError("This object has been deleted.")
+        batch = getattr(self.knex, "active_batch", None)
+        if batch is not None and batch.queue_save(self):
+            return
         if not self._already_fetched:
             msg = "Attempting to SAVE an object which has not been fetched is disallowed."
             raise RemoteObjectError(msg)
-        if self._modified:
+        if self._modified or self.dirty_fields():
             logger.debug(f"Saving RemoteBlob. {self}")
-            self.cache.clear_blob(self)
+            moved_from = self._moved_from_listing_urls()
             self._save()
+            self.invalidate_cache()
+            for url in moved_from:  # the old parent no longer includes this object
+                invalidate_listing(self.knex, url)
             self._modified = False
         else:
             logger.debug(f"RemoteBlob has not been modified. Nothing to save. {self}")
 
     def idem(self):
         """Make the state of this object match the server."""
+        self._idem()
+        return self
+
+    def _idem(self):
+        """Make the state of this object match the server. Return True if it was created."""
         if self._deleted:
             raise RemoteObjectError("This object has been deleted.")
         if not self._already_fetched:
+            if self._queue_create():  # the bulk create skips objects that exist
+                return False
             try:
                 self.get()
             except HTTPError:
                 self.create()
+                return True
         else:
             self.save()
-        return self
+        return False
+
+    def _queue_create(self):
+        """Queue this object in the knex's active batch. Return False if it must be created now."""
+        batch = getattr(self.knex, "active_batch", None)
+        return batch is not None and batch.queue_create(self)
 
     def delete(self):
         logger.debug(f"Deleting RemoteBlob. {self}")
         self.knex.delete(self.nested_url())
+        self.invalidate_cache()
+        self._unregister()
         self._already_fetched = False
         self._deleted = True
 
+    def _register(self):
+        """Make this the knex's instance of this object, unless it already has one."""
+        identity_map = getattr(self.knex, "identity_map", None)
+        if identity_map is not None:
+            identity_map.add(self)
+
+    def _unregister(self):
+        identity_map = getattr(self.knex, "identity_map", None)
+        if identity_map is not None:
+            identity_map.discard(self)
+
     @classmethod
     def all_uuids(self, knex):
         """Return a list of all objects of this type."""
@@ -3,6 +3,7 @@ from geoseeq.constants import FASTQ_MODULE_NAMES
 
 class SampleBioInfoFolder:
     """Abstract class that adds bioinformatic functionality to a SampleResultFolder."""
+    __slots__ = ()
 
     @property
     def is_fastq(self):
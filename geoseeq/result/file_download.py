@@ -2,29 +2,39 @@
 import urllib.request
 import logging
 import requests
+from time import perf_counter
 from os.path import basename, getsize, join, isfile
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
 from geoseeq.utils import download_ftp
 from geoseeq.constants import FIVE_MB
+from geoseeq.hooks import (
+    HookBus,
+    ProgressTrackerHook,
+    FILE_STARTED,
+    PART_DOWNLOADED,
+    FILE_COMPLETED,
+)
 
 logger = logging.getLogger("geoseeq_api")  # Same name as calling module
 
 
-def _download_head(url, filename, head=None, progress_tracker=None):
+def _download_head(url, filename, head=None, hooks=None):
     headers = None
     if head and head > 0:
         headers = {"Range": f"bytes=0-{head}"}
     response = requests.get(url, stream=True, headers=headers)
     response.raise_for_status()
     total_size_in_bytes = int(response.headers.get('content-length', 0))
-    if progress_tracker: progress_tracker.set_num_chunks(total_size_in_bytes)
+    if hooks: hooks.emit(FILE_STARTED, direction="download", filepath=filename, file_size=total_size_in_bytes)
     block_size = FIVE_MB
     with open(filename, 'wb') as file:
+        start = perf_counter()
         for data in response.iter_content(block_size):
-            if progress_tracker: progress_tracker.update(len(data))
+            if hooks: hooks.emit(PART_DOWNLOADED, filepath=filename, n_bytes=len(data), seconds=perf_counter() - start)
             file.write(data)
+            start = perf_counter()
     return filename
 
 
@@ -44,8 +54,19 @@ def guess_download_kind(url):
         return 'generic'
 
 
-def download_url(url, kind='guess', filename=None, head=None, progress_tracker=None):
-    """Return a local filepath to the downloaded file. Download the file."""
+def download_url(url, kind='guess', filename=None, head=None, progress_tracker=None, hooks=None):
+    """Return a local filepath to the downloaded file. Download the file.
+
+    Download progress is emitted on `hooks`, if given. `progress_tracker` is
+    subscribed to those events for the duration of the download.
+    """
+    if progress_tracker:
+        hooks = hooks or HookBus()
+        tracker_hook = ProgressTrackerHook(progress_tracker, filename).attach(hooks)
+        try:
+            return download_url(url, kind=kind, filename=filename, head=head, hooks=hooks)
+        finally:
+            tracker_hook.detach(hooks)
     if kind == 'guess':
         kind = guess_download_kind(url)
         logger.info(f"Guessed download kind: {kind} for {url}")
@@ -53,9 +74,9 @@ def download_url(url, kind='guess', filename=None, head=None, progress_tracker=N
     if kind == 'generic':
         return _download_generic(url, filename, head=head)
     elif kind == 's3':
-        return _download_head(url, filename, head=head, progress_tracker=progress_tracker)
+        return _download_head(url, filename, head=head, hooks=hooks)
     elif kind == 'azure':
-        return _download_head(url, filename, head=head)
+        return _download_head(url, filename, head=head, hooks=hooks)
     elif kind == 'ftp':
         return download_ftp(url, filename, head=head)
     else:
@@ -65,6 +86,7 @@ def download_url(url, kind='guess', filename=None, head=None, progress_tracker=N
 
 class ResultFileDownload:
     """Abstract class that handles download methods for result files."""
+    __slots__ = ()
 
     def get_download_url(self):
         """Return a URL that can be used to download the file for this result."""
@@ -110,9 +132,14 @@ class ResultFileDownload:
                 return filename
 
         url = self.get_download_url()
+        start = perf_counter()
         filepath = download_url(
             url, blob_type, filename,
-            head=head, progress_tracker=progress_tracker
+            head=head, progress_tracker=progress_tracker, hooks=self.knex.hooks
+        )
+        self.knex.hooks.emit(
+            FILE_COMPLETED, direction="download", filepath=filepath,
+            n_bytes=getsize(filepath), seconds=perf_counter() - start,
         )
         if cache and flag_suffix:
             # create flag file
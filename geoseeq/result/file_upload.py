@@ -1,12 +1,20 @@
 
 import time
 import json
+from time import perf_counter
 from os.path import basename, getsize
 from pathlib import Path
 
 import requests
 
 from geoseeq.knex import GeoseeqGeneralError
+from geoseeq.hooks import (
+    ProgressTrackerHook,
+    FILE_STARTED,
+    PART_UPLOADED,
+    FILE_COMPLETED,
+    RETRY_SCHEDULED,
+)
 from geoseeq.constants import FIVE_MB
 from geoseeq.utils import md5_checksum
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -42,6 +50,7 @@ class FileChunker:
 
 class ResultFileUpload:
     """Abstract class that handles upload methods for result files."""
+    __slots__ = ()
 
     def _create_multipart_upload(self, filepath, file_size, optional_fields):
         optional_fields = optional_fields if optional_fields else {}
@@ -79,11 +88,16 @@ class ResultFileUpload:
         attempts = 0
         while attempts < max_retries:
             try:
+                start = perf_counter()
                 if session:
                     http_response = session.put(url, data=file_chunk)
                 else:
                     http_response = requests.put(url, data=file_chunk)
                 http_response.raise_for_status()
+                self.knex.hooks.emit(
+                    PART_UPLOADED, filepath=file_chunker.filepath, part_number=num + 1,
+                    n_bytes=len(file_chunk), seconds=perf_counter() - start,
+                )
                 logger.debug(f"Upload for part {num + 1} succeeded.")
                 break
             except requests.exceptions.HTTPError:
@@ -93,6 +107,10 @@ class ResultFileUpload:
                 attempts += 1
                 if attempts == max_retries:
                     raise
+                self.knex.hooks.emit(
+                    RETRY_SCHEDULED, direction="upload", filepath=file_chunker.filepath,
+                    part_number=num + 1, attempt=attempts, delay=10**attempts,
+                )
                 time.sleep(10**attempts)  # exponential backoff, (10 ** 2)s default max
         return {"ETag": http_response.headers["ETag"], "PartNumber": num + 1}
     
@@ -107,15 +125,15 @@ class ResultFileUpload:
             json_response=False,
         )
         response.raise_for_status()
+        self.invalidate_cache()  # the upload changed stored_data
 
-    def _upload_parts(self, file_chunker, urls, max_retries, session, progress_tracker, threads):
+    def _upload_parts(self, file_chunker, urls, max_retries, session, threads):
         if threads == 1:
             logger.info(f"Uploading parts in series for {file_chunker.filepath}")
             complete_parts = []
             for num, url in enumerate(list(urls.values())):
                 response_part = self._upload_one_part(file_chunker, url, num, max_retries, session)
                 complete_parts.append(response_part)
-                if progress_tracker: progress_tracker.update(file_chunker.get_chunk_size(num))
                 logger.info(f'Uploaded part {num + 1} of {len(urls)} for "{file_chunker.filepath}"')
             return complete_parts
         
@@ -131,7 +149,6 @@ class ResultFileUpload:
             for future in as_completed(futures):
                 response_part = future.result()
                 complete_parts.append(response_part)
-                if progress_tracker: progress_tracker.update(file_chunker.get_chunk_size(response_part["PartNumber"] - 1))
                 logger.info(
                     f'Uploaded part {response_part["PartNumber"]} of {len(urls)} for "{file_chunker.filepath}"'
                 )
@@ -149,15 +166,31 @@ class ResultFileUpload:
         progress_tracker=None,
         threads=1,
     ):
-        """Upload a file to S3 using the multipart upload process."""
+        """Upload a file to S3 using the multipart upload process.
+
+        Progress is reported through the events on `self.knex.hooks`.
+        `progress_tracker` is subscribed to those events for this file.
+        """
         logger.info(f"Uploading {filepath} to S3 using multipart upload.")
-        upload_id, urls = self._prep_multipart_upload(filepath, file_size, chunk_size, optional_fields)
-        logger.info(f'Starting upload for "{filepath}"')
-        complete_parts = []
-        file_chunker = FileChunker(filepath, chunk_size).load_all_chunks()
-        if progress_tracker: progress_tracker.set_num_chunks(file_chunker.file_size)
-        complete_parts = self._upload_parts(file_chunker, urls, max_retries, session, progress_tracker, threads)
-        self._finish_multipart_upload(upload_id, complete_parts)
+        if progress_tracker:
+            tracker_hook = ProgressTrackerHook(progress_tracker, filepath).attach(self.knex.hooks)
+        try:
+            start = perf_counter()
+            upload_id, urls = self._prep_multipart_upload(filepath, file_size, chunk_size, optional_fields)
+            logger.info(f'Starting upload for "{filepath}"')
+            file_chunker = FileChunker(filepath, chunk_size).load_all_chunks()
+            self.knex.hooks.emit(
+                FILE_STARTED, direction="upload", filepath=filepath, file_size=file_chunker.file_size
+            )
+            complete_parts = self._upload_parts(file_chunker, urls, max_retries, session, threads)
+            self._finish_multipart_upload(upload_id, complete_parts)
+            self.knex.hooks.emit(
+                FILE_COMPLETED, direction="upload", filepath=filepath,
+                n_bytes=file_size, seconds=perf_counter() - start,
+            )
+        finally:
+            if progress_tracker:
+                tracker_hook.detach(self.knex.hooks)
         logger.info(f'Finished Upload for "{filepath}"')
         return self
 
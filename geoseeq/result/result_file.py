@@ -21,6 +21,7 @@ from .file_download import ResultFileDownload
 
 
 class ResultFile(RemoteObject, ResultFileUpload, ResultFileDownload):
+    __slots__ = ("parent", "name", "stored_data", "pipeline_run", "_cached_filename", "_temp_filename")
     remote_fields = [
         "uuid",
         "created_at",
@@ -33,6 +34,7 @@ class ResultFile(RemoteObject, ResultFileUpload, ResultFileDownload):
         "pipeline_run",
     ]
     parent_field = "parent"
+    parent_blob_field = "analysis_result_obj"
 
     def __init__(self, knex, parent, field_name, pipeline_run=None, data={}):
         super().__init__(self)
@@ -94,17 +96,26 @@ class ResultFile(RemoteObject, ResultFileUpload, ResultFileDownload):
         # except TypeError:
         #     return basename(self.get_blob_filename())
 
+    @classmethod
+    def _new_from_record(cls, record):
+        return record.parent.result_file(record.name)
+
     def _save(self):
-        data = {field: getattr(self, field) for field in self.remote_fields if hasattr(self, field)}
-        data["analysis_result"] = self.parent.uuid
-        url = f"{self.canon_url()}/{self.uuid}"
-        self.knex.put(url, json=data)
+        data = self.get_patch_data()
+        if self.parent_changed():
+            data["analysis_result"] = self.parent.uuid
+        if data:
+            url = f"{self.canon_url()}/{self.uuid}"
+            self.knex.patch(url, json=data)
 
     def _get(self, allow_overwrite=False):
         """Fetch the result from the server."""
-        self.parent.idem()
-        blob = self.knex.get(self.nested_url())
+        blob = self._get_nested_blob(self.nested_url())
         self.load_blob(blob, allow_overwrite=allow_overwrite)
+        self._load_parent_blobs(blob)
+
+    def _fetch_parent(self):
+        return self.parent._idem()
 
     def _get_from_list(self, allow_overwrite=False):
         """Fetch the result from the server by listing the parent's children and finding this field.
@@ -199,16 +210,16 @@ class ResultFile(RemoteObject, ResultFileUpload, ResultFileDownload):
         }
         return self.save()
     
-    def idem(self):
+    def _idem(self):
         try:
-            return super().idem()
+            return super()._idem()
         except GeoseeqOtherError as e:
             if "The fields analysis_result, name must make a unique set." in str(e):
                 # this typically happens when the field name has a character that doesn't work well in URLs
                 self._get_from_list(allow_overwrite=True)
             else:
                 raise e
-        return self
+        return False
 
     def _create(self):
         check_json_serialization(self.stored_data)
@@ -240,6 +251,12 @@ class ResultFile(RemoteObject, ResultFileUpload, ResultFileDownload):
 AnalysisResultField = ResultFile
 
 class SampleResultFile(ResultFile):
+    __slots__ = ()
+    uuid_url_prefix = "sample_ar_fields"
+
+    def listing_urls(self):
+        return [f"sample_ar_fields?analysis_result_id={self.parent.uuid}"] if self.parent.uuid else []
+
     def canon_url(self):
         return "sample_ar_fields"
 
@@ -250,6 +267,12 @@ SampleAnalysisResultField = SampleResultFile
 
 
 class ProjectResultFile(ResultFile):
+    __slots__ = ()
+    uuid_url_prefix = "sample_group_ar_fields"
+
+    def listing_urls(self):
+        return [f"sample_group_ar_fields?analysis_result_id={self.parent.uuid}"] if self.parent.uuid else []
+
     def canon_url(self):
         return "sample_group_ar_fields"
 
@@ -10,8 +10,9 @@ from tempfile import NamedTemporaryFile
 import requests
 
 from geoseeq.constants import FIVE_MB
+from geoseeq.records import iter_column_pages, iter_records
 from geoseeq.remote_object import RemoteObject, RemoteObjectError
-from geoseeq.utils import download_ftp, md5_checksum
+from geoseeq.utils import download_ftp, md5_checksum, paginated_iterator
 
 from .bioinfo import SampleBioInfoFolder
 from .result_file import ProjectResultFile, SampleResultFile
@@ -19,6 +20,9 @@ from .utils import *
 
 
 class ResultFolder(RemoteObject):
+    __slots__ = (
+        "parent", "module_name", "replicate", "description", "is_private", "metadata", "_get_field_cache",
+    )
     remote_fields = [
         "uuid",
         "created_at",
@@ -33,20 +37,28 @@ class ResultFolder(RemoteObject):
     def name(self):
         return self.module_name
 
+    def get_result_file_columns(self, fields=("uuid", "name", "stored_data")):
+        """Yield each page of this folder's files as a dict of field to list of values."""
+        url = f"{self.result_file_type.uuid_url_prefix}?analysis_result_id={self.uuid}"
+        return iter_column_pages(self.knex, url, fields)
+
     def _get(self, allow_overwrite=False):
         """Fetch the result from the server."""
-        self.parent.idem()
         logger.debug(f"Getting AnalysisResult.")
         blob = self.get_cached_blob()
         if not blob:
             url = self.nested_url()
             if self.replicate:
                 url += f"?replicate={self.replicate}"
-            blob = self.knex.get(url, url_options=self.inherited_url_options)
+            blob = self._get_nested_blob(url, url_options=self.inherited_url_options)
             self.load_blob(blob, allow_overwrite=allow_overwrite)
-            self.cache_blob(blob)
+            self.cache_blob(blob, include_parents=True)
         else:
             self.load_blob(blob)
+        self._load_parent_blobs(blob)
+
+    def _fetch_parent(self):
+        return self.parent._idem()
 
     def pre_hash(self):
         key = self.module_name + self.parent.pre_hash()
@@ -141,7 +153,14 @@ AnalysisResult = ResultFolder # for backwards compatibility
 
 
 class SampleResultFolder(ResultFolder, SampleBioInfoFolder):
+    __slots__ = ("sample",)
     parent_field = "sample"
+    uuid_url_prefix = "sample_ars"
+    parent_blob_field = "sample_obj"
+    result_file_type = SampleResultFile
+
+    def listing_urls(self):
+        return [f"sample_ars?sample_id={self.sample.uuid}"] if self.sample.uuid else []
 
     def __init__(self, knex, sample, module_name, replicate=None, metadata={}, is_private=False):
         super().__init__(self)
@@ -150,7 +169,7 @@ class SampleResultFolder(ResultFolder, SampleBioInfoFolder):
         self.parent = self.sample
         self.module_name = module_name
         self.replicate = replicate
-        self._get_field_cache = []
+        self._get_field_cache = ()  # a list once files are listed, most folders never are
         self.metadata = metadata
         self.is_private = is_private
 
@@ -158,12 +177,15 @@ class SampleResultFolder(ResultFolder, SampleBioInfoFolder):
         return self.sample.nested_url() + f"/analysis_results/{self.module_name}"
 
     def _save(self):
-        data = {field: getattr(self, field) for field in self.remote_fields if hasattr(self, field)}
-        data["sample"] = self.sample.uuid
+        data = self.get_patch_data()
+        if self.parent_changed():
+            data["sample"] = self.sample.uuid
+        if not data:
+            return
         url = f"sample_ars/{self.uuid}"
         d = {"data": data, "url": url, "sample_ar": self}
         logger.debug(f"Saving SampleAnalysisResult. {d}")
-        self.knex.put(url, json=data, url_options=self.inherited_url_options)
+        self.knex.patch(url, json=data, url_options=self.inherited_url_options)
 
     def get_post_data(self):
         """Return a dict that can be used to POST this result to the server."""
@@ -200,8 +222,19 @@ class SampleResultFolder(ResultFolder, SampleBioInfoFolder):
     def field(self, *args, **kwargs):
         return self.result_file(*args, **kwargs)
 
-    def get_result_files(self, cache=True):
-        """Return a list of ar-fields fetched from the server."""
+    @classmethod
+    def _new_from_record(cls, record):
+        return record.parent.result_folder(record.module_name, replicate=record.replicate)
+
+    def get_result_files(self, cache=True, records=False):
+        """Return a list of ar-fields fetched from the server.
+
+        With `records` yield immutable records instead, see `geoseeq.records`.
+        """
+        if records:
+            url = f"sample_ar_fields?analysis_result_id={self.uuid}"
+            yield from iter_records(self.knex, url, SampleResultFile, self)
+            return
         if cache and self._get_field_cache:
             for field in self._get_field_cache:
                 yield field
@@ -209,10 +242,12 @@ class SampleResultFolder(ResultFolder, SampleBioInfoFolder):
         url = f"sample_ar_fields?analysis_result_id={self.uuid}"
         # url = self.nested_url() + f"/fields"
         logger.debug(f"Fetching SampleAnalysisResultFields. {self}")
-        result = self.knex.get(url)
-        for result_blob in result["results"]:
+        if cache:
+            self._get_field_cache = []
+        for result_blob in paginated_iterator(self.knex, url):
             result = self.field(result_blob["name"])
             result.load_blob(result_blob)
+            result.cache_blob(result_blob)
             # We just fetched from the server so we change the RemoteObject
             # meta properties to reflect that
             result._already_fetched = True
@@ -235,7 +270,14 @@ SampleAnalysisResult = SampleResultFolder # for backwards compatibility
 
 
 class ProjectResultFolder(ResultFolder):
+    __slots__ = ("grp",)
     parent_field = "grp"
+    uuid_url_prefix = "sample_group_ars"
+    parent_blob_field = "sample_group_obj"
+    result_file_type = ProjectResultFile
+
+    def listing_urls(self):
+        return [f"sample_group_ars?sample_group_id={self.grp.uuid}"] if self.grp.uuid else []
 
     def __init__(self, knex, grp, module_name, replicate=None, metadata={}, is_private=False):
         super().__init__(self)
@@ -251,10 +293,12 @@ class ProjectResultFolder(ResultFolder):
         return self.grp.nested_url() + f"/analysis_results/{self.module_name}"
 
     def _save(self):
-        data = {field: getattr(self, field) for field in self.remote_fields if hasattr(self, field)}
-        data["sample_group"] = self.grp.uuid
-        url = f"sample_group_ars/{self.uuid}"
-        self.knex.put(url, json=data)
+        data = self.get_patch_data()
+        if self.parent_changed():
+            data["sample_group"] = self.grp.uuid
+        if data:
+            url = f"sample_group_ars/{self.uuid}"
+            self.knex.patch(url, json=data)
 
     def _create(self):
         self.grp.idem()
@@ -275,13 +319,23 @@ class ProjectResultFolder(ResultFolder):
     def field(self, *args, **kwargs):
         return self.result_file(*args, **kwargs)
 
-    def get_result_files(self):
-        """Return a list of ar-fields fetched from the server."""
+    @classmethod
+    def _new_from_record(cls, record):
+        return record.parent.result_folder(record.module_name, replicate=record.replicate)
+
+    def get_result_files(self, cache=True, records=False):
+        """Return a list of ar-fields fetched from the server.
+
+        With `records` yield immutable records instead, see `geoseeq.records`.
+        """
         url = f"sample_group_ar_fields?analysis_result_id={self.uuid}"
-        result = self.knex.get(url)
-        for result_blob in result["results"]:
+        if records:
+            yield from iter_records(self.knex, url, ProjectResultFile, self)
+            return
+        for result_blob in paginated_iterator(self.knex, url):
             result = self.field(result_blob["name"])
             result.load_blob(result_blob)
+            result.cache_blob(result_blob)
             # We just fetched from the server so we change the RemoteObject
             # meta properties to reflect that
             result._already_fetched = True
@@ -1,8 +1,11 @@
 from .result import SampleResultFolder, SampleResultFile
 from .remote_object import RemoteObject
+from .records import iter_records
+from .utils import invalidate_listing, paginated_iterator
 
 
 class Sample(RemoteObject):
+    __slots__ = ("lib", "new_lib", "name", "metadata", "library", "description", "_get_result_cache")
     remote_fields = [
         "uuid",
         "created_at",
@@ -14,6 +17,8 @@ class Sample(RemoteObject):
     ]
     parent_field = "lib"
     url_prefix = "samples"
+    uuid_url_prefix = "samples"
+    parent_blob_field = "library_obj"
 
     def __init__(self, knex, lib, name, metadata={}):
         super().__init__(self)
@@ -22,7 +27,7 @@ class Sample(RemoteObject):
         self.new_lib = None
         self.name = name
         self.metadata = metadata
-        self._get_result_cache = []
+        self._get_result_cache = ()  # a list once folders are listed, most samples never are
 
     @property
     def project(self):
@@ -39,25 +44,38 @@ class Sample(RemoteObject):
         self.new_lib = new_lib
         self._modified = True
 
+    def listing_urls(self):
+        lib_uuid = self.lib.uuid if isinstance(self.lib, RemoteObject) else self.lib
+        return [f"sample_groups/{lib_uuid}/samples"] if lib_uuid else []
+
     def _save(self):
-        data = self.get_post_data()
-        url = f"samples/{self.uuid}"
-        self.knex.put(url, json=data, url_options=self.inherited_url_options)
+        data = self.get_patch_data()
+        if self.new_lib:
+            data["library"] = self.get_post_data()["library"]
+        if data:
+            url = f"samples/{self.uuid}"
+            self.knex.patch(url, json=data, url_options=self.inherited_url_options)
         if self.new_lib:
+            for listing_url in self.listing_urls():  # the old library no longer includes this sample
+                invalidate_listing(self.knex, listing_url)
             self.lib = self.new_lib
             self.new_lib = None
 
     def _get(self, allow_overwrite=False):
         """Fetch the result from the server."""
-        self.lib.get()
         blob = self.get_cached_blob()
         if not blob:
             url = self.nested_url()
-            blob = self.knex.get(url, url_options=self.inherited_url_options)
+            blob = self._get_nested_blob(url, url_options=self.inherited_url_options)
             self.load_blob(blob, allow_overwrite=allow_overwrite)
-            self.cache_blob(blob)
+            self.cache_blob(blob, include_parents=True)
         else:
             self.load_blob(blob, allow_overwrite=allow_overwrite)
+        self._load_parent_blobs(blob)
+
+    def _fetch_parent(self):
+        self.lib.get()
+        return False
 
     def get_post_data(self):
         data = {field: getattr(self, field) for field in self.remote_fields if hasattr(self, field)}
@@ -82,6 +100,8 @@ class Sample(RemoteObject):
     def delete(self):
         url = f"samples/{self.uuid}"
         self.knex.delete(url)
+        self.invalidate_cache()
+        self._unregister()
         self._already_fetched = False
         self._deleted = True
 
@@ -97,18 +117,30 @@ class Sample(RemoteObject):
         This is an alias for result_folder."""
         return self.result_folder(*args, **kwargs)
     
-    def get_result_folders(self, cache=True):
-        """Yield sample analysis results fetched from the server."""
+    @classmethod
+    def _new_from_record(cls, record):
+        return record.parent.sample(record.name)
+
+    def get_result_folders(self, cache=True, records=False):
+        """Yield sample analysis results fetched from the server.
+
+        With `records` yield immutable records instead, see `geoseeq.records`.
+        """
         self.get()
+        if records:
+            yield from iter_records(self.knex, f"sample_ars?sample_id={self.uuid}", SampleResultFolder, self)
+            return
         if cache and self._get_result_cache:
             for ar in self._get_result_cache:
                 yield ar
             return
-        url =  f"sample_ars?sample_id={self.uuid}"
-        result = self.knex.get(url)
-        for result_blob in result["results"]:
+        url = f"sample_ars?sample_id={self.uuid}"
+        if cache:
+            self._get_result_cache = []
+        for result_blob in paginated_iterator(self.knex, url):
             result = self.analysis_result(result_blob["module_name"])
             result.load_blob(result_blob)
+            result.cache_blob(result_blob)
             # We just fetched from the server so we change the RemoteObject
             # meta properties to reflect that
             result._already_fetched = True
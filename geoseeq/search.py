@@ -3,7 +3,6 @@ from .knex import GeoseeqInternalError, GeoseeqTimeoutError
 from time import sleep, time
 import json
 from .id_constructors import sample_from_id
-import pandas as pd
 
 
 class Search:
@@ -63,8 +62,9 @@ class Search:
             sleep(poll_interval_ms / 1000)
             poll_interval_ms *= poll_backoff
 
-    def sample_table(self) -> pd.DataFrame:
+    def sample_table(self) -> "pandas.DataFrame":
         """Return a pandas dataframe with sample metadata."""
+        import pandas as pd  # imported lazily, pandas is slow to import
         if not self.search_has_been_run:
             self.run_search()
         rows = []
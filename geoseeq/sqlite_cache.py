@@ -0,0 +1,440 @@
+"""A blob cache stored in a single indexed SQLite database.
+
+`SqliteCache` has the same interface as `FileSystemCache` but keeps every
+blob in one table keyed by the same hash, so lookups are a primary key
+read instead of a directory glob and a file open. The database runs in
+WAL mode so many readers and a writer can use it at once.
+
+Writes are buffered in memory and flushed in a single transaction once
+`WRITE_BATCH_SIZE` writes are pending, `WRITE_BATCH_SECONDS` have passed,
+or the process exits. Pending writes are visible to reads in the same
+process.
+
+The database is bounded by `CACHE_MAX_BYTES` and `CACHE_MAX_ENTRIES`.
+Every `PRUNE_EVERY_WRITES` flushed writes, the least recently used blobs
+are evicted until the cache is back under `PRUNE_LOW_WATER` of its budget.
+Reads update `last_used` and the hit and miss counters lazily, in the same
+transaction as the next flush.
+
+Many processes can share one database, e.g. the workers of a
+`multiprocessing.Pool`. Writes take the database lock up front (`BEGIN
+IMMEDIATE`) and wait up to `SQLITE_BUSY_TIMEOUT_MS` for it. Worker
+processes write through instead of buffering, since pools terminate their
+workers without running exit handlers. A cache that still cannot be read
+or written is treated as a miss, it never fails the call that used it.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from random import randint
+from time import time
+
+from .file_system_cache import CACHED_BLOB_TIME, CACHE_DIR, hash_obj
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_SECONDS = 1.0
+SQLITE_BUSY_TIMEOUT_MS = 10 * 1000
+CACHE_MAX_BYTES = int(os.environ.get("GEOSEEQ_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.environ.get("GEOSEEQ_CACHE_MAX_ENTRIES", 200 * 1000))
+PRUNE_EVERY_WRITES = 1000
+PRUNE_LOW_WATER = 0.9  # evict down to this fraction of the budget
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    blob TEXT NOT NULL,
+    cached_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+# columns added since the first version of the schema, with their definitions
+ADDED_COLUMNS = {
+    "last_used": "REAL NOT NULL DEFAULT 0",
+    "size_bytes": "INTEGER NOT NULL DEFAULT 0",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS blobs_expires_at ON blobs (expires_at);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+"""
+
+
+def in_worker_process():
+    """Return True if this process was started by `multiprocessing`."""
+    multiprocessing = sys.modules.get("multiprocessing")  # not imported means not a worker
+    return multiprocessing is not None and multiprocessing.parent_process() is not None
+
+
+def default_cache_path():
+    return os.path.join(CACHE_DIR, ".geoseeq_api_cache", "v2", "blobs.sqlite3")
+
+
+class SqliteBlobStore:
+    """One SQLite database of blobs, shared by every `SqliteCache` using its path.
+
+    Connections are opened per thread, and reopened after a fork, since
+    SQLite connections cannot be shared across either.
+    """
+
+    def __init__(self, path, max_bytes=None, max_entries=None):
+        self.path = path
+        self.max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entries = CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._local = threading.local()
+        self._reset_buffers()
+        self._pid = os.getpid()
+
+    def _reset_buffers(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> (blob json, cached_at, expires_at)
+        self._touched = {}  # key -> last used, for blobs read since the last flush
+        self._hits = 0
+        self._misses = 0
+        self._writes_since_prune = 0
+        self._last_flush = time()
+        self._write_through = in_worker_process()
+
+    def _check_fork(self):
+        if self._pid != os.getpid():  # forked, nothing from the parent is usable
+            self._local = threading.local()
+            self._reset_buffers()
+            self._pid = os.getpid()
+
+    def _connection(self):
+        self._check_fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            conn.executescript(INDEXES)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(blobs)")}
+        for name, definition in ADDED_COLUMNS.items():
+            if name in columns:
+                continue
+            try:
+                conn.execute(f"ALTER TABLE blobs ADD COLUMN {name} {definition}")
+            except sqlite3.OperationalError:  # another connection added it first
+                pass
+        if "size_bytes" not in columns:
+            conn.execute("UPDATE blobs SET size_bytes = LENGTH(blob), last_used = cached_at")
+
+    def get(self, key, now):
+        """Return the blob json for `key`, or None if it is missing or expired."""
+        self._check_fork()
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending:
+            blob_json, _, expires_at = pending
+        else:
+            row = self._connection().execute(
+                "SELECT blob, expires_at FROM blobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._record_lookup(key, None, now)
+                return None
+            blob_json, expires_at = row
+        if now > expires_at:
+            self.delete(key)
+            self._record_lookup(key, None, now)
+            return None
+        self._record_lookup(key, blob_json, now)
+        return blob_json
+
+    def _record_lookup(self, key, blob_json, now):
+        with self._lock:
+            if blob_json is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._touched[key] = now
+            should_flush = now - self._last_flush >= WRITE_BATCH_SECONDS
+        if should_flush:
+            self.flush()
+
+    def put(self, key, blob_json, now, expires_at):
+        self._check_fork()
+        with self._lock:
+            self._pending[key] = (blob_json, now, expires_at)
+            should_flush = (
+                self._write_through
+                or len(self._pending) >= WRITE_BATCH_SIZE
+                or now - self._last_flush >= WRITE_BATCH_SECONDS
+            )
+        if should_flush:
+            self.flush()
+
+    def delete(self, key):
+        self._check_fork()
+        with self._lock:
+            self._pending.pop(key, None)
+            self._touched.pop(key, None)
+        self._connection().execute("DELETE FROM blobs WHERE key = ?", (key,))
+
+    def flush(self):
+        """Write all pending blobs, reads and counters in one transaction."""
+        self._check_fork()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            hits, misses = self._hits, self._misses
+            self._hits = self._misses = 0
+            self._last_flush = time()
+            self._writes_since_prune += len(pending)
+            should_prune = self._writes_since_prune >= PRUNE_EVERY_WRITES
+            if should_prune:
+                self._writes_since_prune = 0
+        if not (pending or touched or hits or misses):
+            return
+        conn = self._connection()
+        with conn:  # one transaction
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO blobs (key, blob, cached_at, expires_at, last_used, size_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    # json.dumps escapes non ascii text, so characters are bytes
+                    (key, blob_json, cached_at, expires_at, cached_at, len(blob_json))
+                    for key, (blob_json, cached_at, expires_at) in pending.items()
+                ],
+            )
+            conn.executemany(
+                "UPDATE blobs SET last_used = ? WHERE key = ? AND last_used < ?",
+                [(last_used, key, last_used) for key, last_used in touched.items()],
+            )
+            for name, value in (("hits", hits), ("misses", misses)):
+                if value:
+                    conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", (name,))
+                    conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (value, name))
+        if pending:
+            logger.debug(f"Flushed {len(pending)} blobs to cache. {self.path}")
+        if should_prune:
+            self.evict()
+
+    def clear_expired(self, now=None):
+        """Delete every expired blob and return how many were deleted."""
+        self.flush()
+        cursor = self._connection().execute("DELETE FROM blobs WHERE expires_at < ?", (now or time(),))
+        return cursor.rowcount
+
+    def evict(self, max_bytes=None, max_entries=None):
+        """Delete least recently used blobs until the cache fits its budget.
+
+        Returns the number of blobs deleted. Once over budget, blobs are
+        deleted until the cache is under `PRUNE_LOW_WATER` of its budget so
+        that the next few writes do not each trigger an eviction.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_entries = self.max_entries if max_entries is None else max_entries
+        conn = self._connection()
+        n_entries, n_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM blobs").fetchone()
+        if n_entries <= max_entries and n_bytes <= max_bytes:
+            return 0
+        target_entries, target_bytes = int(max_entries * PRUNE_LOW_WATER), int(max_bytes * PRUNE_LOW_WATER)
+        evicted = []
+        for key, size_bytes in conn.execute("SELECT key, size_bytes FROM blobs ORDER BY last_used"):
+            if n_entries <= target_entries and n_bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            n_entries -= 1
+            n_bytes -= size_bytes
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM blobs WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} least recently used blobs from cache. {self.path}")
+        return len(evicted)
+
+    def compact(self):
+        """Return space freed by deleted blobs to the file system."""
+        conn = self._connection()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self):
+        """Delete every blob and reset the counters."""
+        with self._lock:
+            self._pending, self._touched = {}, {}
+            self._hits = self._misses = 0
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM blobs")
+            conn.execute("DELETE FROM counters")
+        self.compact()
+
+    def file_size(self):
+        """Return the size of the database and its write ahead log in bytes."""
+        paths = (self.path, self.path + "-wal", self.path + "-shm")
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def stats(self, now=None):
+        """Return a dict describing the size, age and hit ratio of the cache."""
+        self.flush()
+        now = now or time()
+        conn = self._connection()
+        n_entries, n_bytes, n_expired, oldest, newest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COALESCE(SUM(expires_at < ?), 0), "
+            "MIN(cached_at), MAX(cached_at) FROM blobs",
+            (now,)
+        ).fetchone()
+        median = None
+        if n_entries:
+            median = conn.execute(
+                "SELECT cached_at FROM blobs ORDER BY cached_at LIMIT 1 OFFSET ?", (n_entries // 2,)
+            ).fetchone()[0]
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "path": self.path,
+            "entries": n_entries,
+            "expired_entries": n_expired,
+            "size_bytes": n_bytes,
+            "file_size_bytes": self.file_size(),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None,
+            "oldest_entry_age_sec": now - oldest if oldest is not None else None,
+            "newest_entry_age_sec": now - newest if newest is not None else None,
+            "median_entry_age_sec": now - median if median is not None else None,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _reset_stores_lock():
+    # another thread may have held the lock when this process was forked
+    global _stores_lock
+    _stores_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stores_lock)
+
+
+def get_store(path):
+    """Return the shared store for `path`, creating it if needed."""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SqliteBlobStore(path)
+        return _stores[path]
+
+
+@atexit.register
+def _flush_all_stores():
+    for store in list(_stores.values()):
+        try:
+            store.flush()
+        except sqlite3.Error:
+            logger.debug(f"Could not flush cache at exit. {store.path}")
+
+
+class SqliteCache:
+    """Cache blobs for RemoteObjects and URLs in a SQLite database.
+
+    Creating a cache is cheap, instances with the same path share a store.
+    """
+
+    def __init__(self, timeout=CACHED_BLOB_TIME, path=None):
+        self.no_cache = 'false' in os.environ.get('USE_GEOSEEQ_CACHE', 'TRUE').lower()
+        self.timeout = timeout
+        self.path = path or default_cache_path()
+        self._store = None
+
+    @property
+    def cache_id(self):
+        return f"sqlite:{os.path.abspath(self.path)}"
+
+    def __getstate__(self):
+        # stores hold connections and locks, copies in other processes find their own
+        state = self.__dict__.copy()
+        state["_store"] = None
+        return state
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_store(self.path)
+        return self._store
+
+    def clear_blob(self, obj):
+        if self.no_cache:
+            return
+        logger.debug(f'Clearing cached blob. {obj}')
+        try:
+            self.store.delete(hash_obj(obj))
+        except sqlite3.Error as e:
+            logger.warning(f'Could not clear cached blob. {obj} {e}')
+
+    def get_cached_blob(self, obj):
+        if self.no_cache:
+            return None
+        try:
+            blob_json = self.store.get(hash_obj(obj), time())
+        except sqlite3.Error as e:
+            logger.warning(f'Could not read cache. {obj} {e}')
+            return None
+        if blob_json is None:
+            logger.debug(f'No cached blob found. {obj}')
+            return None
+        logger.debug(f'Found good cached blob. {obj}')
+        return json.loads(blob_json)
+
+    def cache_blob(self, obj, blob):
+        """Cache `blob` for `obj`, replacing any blob already cached for it."""
+        if self.no_cache:
+            return None
+        logger.debug(f'Caching blob. {obj}')
+        now = time()
+        # jitter expiry so blobs cached together do not all expire together
+        expires_at = now + self.timeout + randint(0, self.timeout // 10)
+        try:
+            self.store.put(hash_obj(obj), json.dumps(blob), now, expires_at)
+        except sqlite3.Error as e:
+            logger.warning(f'Could not write cache. {obj} {e}')
+
+    def flush(self):
+        if not self.no_cache:
+            self.store.flush()
+
+    def stats(self):
+        """Return a dict describing the size, age and hit ratio of the cache."""
+        return self.store.stats()
+
+    def prune(self, max_bytes=None, max_entries=None, compact=True):
+        """Delete expired blobs, then least recently used blobs over budget.
+
+        Returns a dict with the number of blobs deleted for each reason.
+        """
+        expired = self.store.clear_expired()
+        evicted = self.store.evict(max_bytes=max_bytes, max_entries=max_entries)
+        if compact:
+            self.store.compact()
+        return {"expired": expired, "evicted": evicted}
+
+    def clear(self):
+        """Delete every cached blob."""
+        self.store.clear()
@@ -0,0 +1,116 @@
+"""Serve stale blobs while they are refreshed in the background.
+
+By default a blob older than `CACHED_BLOB_TIME` is a miss and the caller
+waits for a fresh GET. `StaleWhileRevalidateCache` returns such blobs at
+once, for up to `max_stale` more seconds, and refreshes them on a
+background thread. Blobs older than that are misses as usual.
+
+Only RemoteObjects can be refreshed, they know how to fetch themselves.
+Stale blobs cached under other keys, e.g. listing URLs, are misses.
+
+Blobs are kept under their usual keys, so caches with and without this
+policy share entries: a write through either clears the blob for both, and
+blobs cached by e.g. `geoseeq cache warm` are served. The time a blob was
+cached is kept next to it under its own key. Blobs cached without it are of
+unknown age, they are served and refreshed like stale blobs.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from .file_system_cache import CACHED_BLOB_TIME, hash_obj
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+CACHE_MAX_STALE = float(os.environ.get("GEOSEEQ_CACHE_MAX_STALE", 0))  # seconds, 0 disables
+REVALIDATE_THREADS = 4
+
+
+class StaleWhileRevalidateCache:
+    """Wrap a cache so stale blobs are returned and refreshed in the background.
+
+    `inner` must keep blobs for at least `fresh_time + max_stale` seconds.
+    Refreshes run on non daemon threads, so a process that is exiting
+    finishes them first.
+    """
+
+    def __init__(self, inner, fresh_time=CACHED_BLOB_TIME, max_stale=CACHE_MAX_STALE):
+        self.inner = inner
+        self.fresh_time = fresh_time
+        self.max_stale = max_stale
+        self.no_cache = inner.no_cache
+        self._init_refreshes()
+
+    def _init_refreshes(self):
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_lock", "_refreshing", "_executor"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_refreshes()
+
+    def _cached_at_key(self, obj):
+        return f"stale-while-revalidate/{hash_obj(obj)}"
+
+    def clear_blob(self, obj):
+        self.inner.clear_blob(obj)
+        self.inner.clear_blob(self._cached_at_key(obj))
+
+    def get_cached_blob(self, obj):
+        blob = self.inner.get_cached_blob(obj)
+        if blob is None:
+            return None
+        entry = self.inner.get_cached_blob(self._cached_at_key(obj))
+        age = time() - entry["cached_at"] if entry else None  # None if cached without this policy
+        if age is not None and age <= self.fresh_time:
+            return blob
+        refresher = getattr(obj, "_cached_blob_refresher", None)
+        if refresher is None or (age is not None and age > self.fresh_time + self.max_stale):
+            return None
+        logger.debug(f'Serving stale cached blob while it is refreshed. {obj}')
+        self._start_refresh(self._cached_at_key(obj), refresher)
+        return blob
+
+    def cache_blob(self, obj, blob):
+        result = self.inner.cache_blob(obj, blob)
+        self.inner.cache_blob(self._cached_at_key(obj), {"cached_at": time()})
+        return result
+
+    def flush(self):
+        self.wait_for_refreshes()
+        self.inner.flush()
+
+    def _start_refresh(self, key, refresher):
+        # `refresher` runs here, before the caller loads the stale blob, the refresh it returns runs later
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            refresh = refresher()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(REVALIDATE_THREADS, thread_name_prefix="geoseeq-revalidate")
+            future = self._executor.submit(refresh)
+        future.add_done_callback(lambda future: self._finish_refresh(key, future))
+
+    def _finish_refresh(self, key, future):
+        with self._lock:
+            self._refreshing.discard(key)
+        if future.exception() is not None:
+            logger.warning(f'Could not refresh stale cached blob. {future.exception()}')
+
+    def wait_for_refreshes(self):
+        """Block until every refresh that has started is finished."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
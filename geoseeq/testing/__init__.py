@@ -0,0 +1,3 @@
+"""Tools for testing and benchmarking code that uses the GeoSeeq API client."""
+from .stand_in_kv import StandInKeyValueServer
+from .stand_in_server import StandInServer
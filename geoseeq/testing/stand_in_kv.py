@@ -0,0 +1,105 @@
+"""An in-memory stand in for a networked key value store.
+
+Implements the protocol of `geoseeq.cache_backends.HttpKeyValueClient` so
+caches shared by many processes can be tested without a real store.
+
+```
+with StandInKeyValueServer() as kv:
+    knex = Knex(endpoint, cache=kv.url)
+```
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+
+class StandInKeyValueHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _key(self):
+        return unquote(self.path.lstrip("/"))
+
+    def _send(self, status_code, body=b""):
+        self.send_response(status_code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.record_request("GET", self._key())
+        with self.server.lock:
+            value, expires_at = self.server.values.get(self._key(), (None, 0))
+        if value is None or time.monotonic() > expires_at:
+            return self._send(404)
+        self._send(200, value)
+
+    def do_PUT(self):
+        self.server.record_request("PUT", self._key())
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        expire_seconds = float(self.headers.get("X-Expire-Seconds", 0)) or float("inf")
+        with self.server.lock:
+            self.server.values[self._key()] = (body, time.monotonic() + expire_seconds)
+        self._send(204)
+
+    def do_DELETE(self):
+        self.server.record_request("DELETE", self._key())
+        with self.server.lock:
+            found = self.server.values.pop(self._key(), None)
+        self._send(204 if found else 404)
+
+
+class StandInKeyValueHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, StandInKeyValueHandler)
+        self.url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self.values = {}  # key -> (value bytes, expires at)
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def record_request(self, method, key):
+        with self.lock:
+            self.requests.append((method, key))
+
+
+class StandInKeyValueServer:
+    """Run a stand in key value store on a background thread.
+
+    `url` can be passed to `Knex(cache=...)`. `requests` lists the
+    (method, key) of every request received.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.httpd = StandInKeyValueHTTPServer((host, port))
+        self.thread = None
+
+    @property
+    def url(self):
+        return self.httpd.url
+
+    @property
+    def values(self):
+        return self.httpd.values
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,829 @@
+"""A lightweight, in-memory stand in for the GeoSeeq API.
+
+The stand in implements the endpoints the client uses: organization,
+project, sample, result folder and result file CRUD, nested name lookups,
+paginated listings, the bulk create endpoints for sample level objects, the `ar_fields` multipart upload endpoints and a fake
+presigned S3 target that accepts part PUTs and serves GETs with Range
+support. It is meant for tests and benchmarks, not as a reference for
+server behaviour.
+
+```
+with StandInServer() as server:
+    knex = Knex(server.url)
+    knex.add_api_token("any token")
+    org = Organization(knex, "My Org").idem()
+```
+"""
+import gzip
+import json
+import re
+import threading
+import time
+import uuid as uuid_lib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class StandInError(Exception):
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _new_uuid():
+    return str(uuid_lib.uuid4())
+
+
+class StandInState:
+    """In-memory storage for the objects held by a StandInServer."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.orgs = {}
+        self.projects = {}
+        self.project_samples = {}  # project uuid -> dict of sample uuids, used as an ordered set
+        self.library_sample_names = {}  # (library uuid, sample name) -> sample uuid
+        self.samples = {}
+        self.sample_folders = {}
+        self.project_folders = {}
+        self.sample_files = {}
+        self.project_files = {}
+        self.uploads = {}  # upload id -> {"field": uuid, "key": str, "parts": {n: bytes}}
+        self.s3_objects = {}  # key -> bytes
+
+    # Serialization. Child blobs embed their parent as `<parent>_obj`.
+
+    def org_blob(self, org_uuid):
+        return dict(self.orgs[org_uuid])
+
+    def project_blob(self, project_uuid):
+        blob = dict(self.projects[project_uuid])
+        blob["samples_count"] = len(self.project_samples[project_uuid])
+        blob["organization_obj"] = self.org_blob(blob["organization"])
+        return blob
+
+    def sample_blob(self, sample_uuid):
+        blob = dict(self.samples[sample_uuid])
+        blob["library_obj"] = self.project_blob(blob["library"])
+        return blob
+
+    def sample_folder_blob(self, folder_uuid):
+        blob = dict(self.sample_folders[folder_uuid])
+        blob["sample_obj"] = self.sample_blob(blob["sample"])
+        return blob
+
+    def project_folder_blob(self, folder_uuid):
+        blob = dict(self.project_folders[folder_uuid])
+        blob["sample_group_obj"] = self.project_blob(blob["sample_group"])
+        return blob
+
+    def sample_file_blob(self, file_uuid):
+        blob = dict(self.sample_files[file_uuid])
+        blob["analysis_result_obj"] = self.sample_folder_blob(blob["analysis_result"])
+        return blob
+
+    def project_file_blob(self, file_uuid):
+        blob = dict(self.project_files[file_uuid])
+        blob["analysis_result_obj"] = self.project_folder_blob(blob["analysis_result"])
+        return blob
+
+    # Lookups by name
+
+    def _find(self, table, error_name, **fields):
+        for obj_uuid, obj in table.items():
+            if all(obj.get(key) == val for key, val in fields.items()):
+                return obj_uuid
+        raise StandInError(404, f"{error_name} not found")
+
+    def find_org(self, name):
+        return self._find(self.orgs, "Organization", name=name)
+
+    def find_project(self, org_uuid, name):
+        return self._find(self.projects, "Project", organization=org_uuid, name=name)
+
+    def find_sample(self, project_uuid, name):
+        if (project_uuid, name) in self.library_sample_names:
+            return self.library_sample_names[(project_uuid, name)]
+        for sample_uuid in self.project_samples[project_uuid]:
+            if self.samples[sample_uuid]["name"] == name:
+                return sample_uuid
+        raise StandInError(404, "Sample not found")
+
+    def find_sample_folder(self, sample_uuid, module_name, replicate=None):
+        fields = {"sample": sample_uuid, "module_name": module_name}
+        if replicate:
+            fields["replicate"] = replicate
+        return self._find(self.sample_folders, "Result folder", **fields)
+
+    def find_project_folder(self, project_uuid, module_name, replicate=None):
+        fields = {"sample_group": project_uuid, "module_name": module_name}
+        if replicate:
+            fields["replicate"] = replicate
+        return self._find(self.project_folders, "Result folder", **fields)
+
+    def find_file(self, table, folder_uuid, name):
+        return self._find(table, "Result file", analysis_result=folder_uuid, name=name)
+
+    # Creation
+
+    def _unique(self, table, message, **fields):
+        for obj in table.values():
+            if all(obj.get(key) == val for key, val in fields.items()):
+                raise StandInError(400, message)
+
+    def _require(self, table, obj_uuid, name):
+        if obj_uuid not in table:
+            raise StandInError(400, f"{name} {obj_uuid} does not exist")
+
+    def create_org(self, data):
+        self._unique(self.orgs, "organization with this name already exists.", name=data["name"])
+        org_uuid = data.get("uuid") or _new_uuid()
+        self.orgs[org_uuid] = {
+            "uuid": org_uuid, "name": data["name"], "created_at": _now(), "updated_at": _now(),
+        }
+        return self.org_blob(org_uuid)
+
+    def create_project(self, data):
+        self._require(self.orgs, data.get("organization"), "Organization")
+        self._unique(
+            self.projects, "The fields organization, name must make a unique set.",
+            organization=data["organization"], name=data["name"],
+        )
+        project_uuid = data.get("uuid") or _new_uuid()
+        self.projects[project_uuid] = {
+            "uuid": project_uuid,
+            "name": data["name"],
+            "organization": data["organization"],
+            "description": data.get("description") or "",
+            "privacy_level": data.get("privacy_level") or "private",
+            "is_library": True,
+            "is_public": False,
+            "metadata": data.get("metadata") or {},
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        self.project_samples[project_uuid] = {}
+        return self.project_blob(project_uuid)
+
+    def create_sample(self, data):
+        self._require(self.projects, data.get("library"), "Project")
+        if (data["library"], data["name"]) in self.library_sample_names:
+            raise StandInError(400, "The fields library, name must make a unique set.")
+        sample_uuid = data.get("uuid") or _new_uuid()
+        self.samples[sample_uuid] = {
+            "uuid": sample_uuid,
+            "name": data["name"],
+            "library": data["library"],
+            "metadata": data.get("metadata") or {},
+            "description": data.get("description") or "",
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        self.project_samples[data["library"]][sample_uuid] = None
+        self.library_sample_names[(data["library"], data["name"])] = sample_uuid
+        return self.sample_blob(sample_uuid)
+
+    def _folder(self, data, parent_field):
+        folder_uuid = data.get("uuid") or _new_uuid()
+        return folder_uuid, {
+            "uuid": folder_uuid,
+            parent_field: data[parent_field],
+            "module_name": data["module_name"],
+            "replicate": data.get("replicate"),
+            "description": data.get("description") or "",
+            "is_private": bool(data.get("is_private")),
+            "metadata": data.get("metadata") or {},
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+
+    def create_sample_folder(self, data):
+        self._require(self.samples, data.get("sample"), "Sample")
+        self._unique(
+            self.sample_folders, "The fields sample, module_name, replicate must make a unique set.",
+            sample=data["sample"], module_name=data["module_name"], replicate=data.get("replicate"),
+        )
+        folder_uuid, folder = self._folder(data, "sample")
+        self.sample_folders[folder_uuid] = folder
+        return self.sample_folder_blob(folder_uuid)
+
+    def create_project_folder(self, data):
+        self._require(self.projects, data.get("sample_group"), "Project")
+        self._unique(
+            self.project_folders, "The fields sample_group, module_name, replicate must make a unique set.",
+            sample_group=data["sample_group"], module_name=data["module_name"], replicate=data.get("replicate"),
+        )
+        folder_uuid, folder = self._folder(data, "sample_group")
+        self.project_folders[folder_uuid] = folder
+        return self.project_folder_blob(folder_uuid)
+
+    def _create_file(self, table, folders, data):
+        self._require(folders, data.get("analysis_result"), "Result folder")
+        self._unique(
+            table, "The fields analysis_result, name must make a unique set.",
+            analysis_result=data["analysis_result"], name=data["name"],
+        )
+        file_uuid = data.get("uuid") or _new_uuid()
+        table[file_uuid] = {
+            "uuid": file_uuid,
+            "name": data["name"],
+            "analysis_result": data["analysis_result"],
+            "stored_data": data.get("stored_data") or {},
+            "pipeline_run": data.get("pipeline_run"),
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        return file_uuid
+
+    def create_sample_file(self, data):
+        return self.sample_file_blob(self._create_file(self.sample_files, self.sample_folders, data))
+
+    def create_project_file(self, data):
+        return self.project_file_blob(self._create_file(self.project_files, self.project_folders, data))
+
+    def file_table(self, file_uuid):
+        if file_uuid in self.sample_files:
+            return self.sample_files
+        if file_uuid in self.project_files:
+            return self.project_files
+        raise StandInError(404, "Result file not found")
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # (method, path regex, handler name); paths are relative to /api/
+    api_routes = [
+        ("GET", r"users/me", "get_me"),
+        ("GET", r"nested/([^/]+)", "get_nested_org"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)", "get_nested_project"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)/samples/([^/]+)", "get_nested_sample"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)/samples/([^/]+)/analysis_results/([^/]+)", "get_nested_sample_folder"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)/samples/([^/]+)/analysis_results/([^/]+)/fields/([^/]+)", "get_nested_sample_file"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)/analysis_results/([^/]+)", "get_nested_project_folder"),
+        ("GET", r"nested/([^/]+)/sample_groups/([^/]+)/analysis_results/([^/]+)/fields/([^/]+)", "get_nested_project_file"),
+        ("GET", r"organizations", "list_orgs"),
+        ("POST", r"organizations", "post_org"),
+        ("GET", r"organizations/([^/]+)", "get_org"),
+        ("PUT|PATCH", r"organizations/([^/]+)", "update_org"),
+        ("GET", r"sample_groups", "list_projects"),
+        ("POST", r"sample_groups", "post_project"),
+        ("GET", r"sample_groups/([^/]+)", "get_project"),
+        ("PUT|PATCH", r"sample_groups/([^/]+)", "update_project"),
+        ("DELETE", r"sample_groups/([^/]+)", "delete_project"),
+        ("GET", r"sample_groups/([^/]+)/samples", "list_project_samples"),
+        ("POST", r"sample_groups/([^/]+)/samples", "add_project_samples"),
+        ("DELETE", r"sample_groups/([^/]+)/samples", "remove_project_samples"),
+        ("GET", r"sample_groups/([^/]+)/metadata", "get_project_metadata"),
+        ("POST", r"sample_groups/([^/]+)/download", "post_project_download"),
+        ("POST", r"samples", "post_sample"),
+        ("GET", r"samples/([^/]+)", "get_sample"),
+        ("PUT|PATCH", r"samples/([^/]+)", "update_sample"),
+        ("DELETE", r"samples/([^/]+)", "delete_sample"),
+        ("GET", r"sample_ars", "list_sample_folders"),
+        ("POST", r"sample_ars", "post_sample_folder"),
+        ("GET", r"sample_ars/([^/]+)", "get_sample_folder"),
+        ("PUT|PATCH", r"sample_ars/([^/]+)", "update_sample_folder"),
+        ("GET", r"sample_group_ars", "list_project_folders"),
+        ("POST", r"sample_group_ars", "post_project_folder"),
+        ("GET", r"sample_group_ars/([^/]+)", "get_project_folder"),
+        ("PUT|PATCH", r"sample_group_ars/([^/]+)", "update_project_folder"),
+        ("GET", r"sample_ar_fields", "list_sample_files"),
+        ("POST", r"sample_ar_fields", "post_sample_file"),
+        ("GET", r"sample_ar_fields/([^/]+)", "get_sample_file"),
+        ("PUT|PATCH", r"sample_ar_fields/([^/]+)", "update_file"),
+        ("GET", r"sample_group_ar_fields", "list_project_files"),
+        ("POST", r"sample_group_ar_fields", "post_project_file"),
+        ("GET", r"sample_group_ar_fields/([^/]+)", "get_project_file"),
+        ("PUT|PATCH", r"sample_group_ar_fields/([^/]+)", "update_file"),
+        ("POST", r"bulk_samples", "post_bulk_samples"),
+        ("POST", r"bulk_sample_results", "post_bulk_sample_folders"),
+        ("POST", r"bulk_sample_result_fields", "post_bulk_sample_files"),
+        ("POST", r"ar_fields/([^/]+)/create_upload", "post_create_upload"),
+        ("POST", r"ar_fields/([^/]+)/create_upload_urls", "post_create_upload_urls"),
+        ("POST", r"ar_fields/([^/]+)/complete_upload", "post_complete_upload"),
+    ]
+    compiled_routes = [
+        (re.compile(f"^(?:{method})$"), re.compile(f"^{path}$"), name)
+        for method, path, name in api_routes
+    ]
+
+    def log_message(self, format, *args):  # silence the default stderr logging
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _send(self, status_code, body=b"", headers=None):
+        self.send_response(status_code)
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status_code, blob):
+        if status_code == 204:  # no content, a body would be read as the start of the next response
+            return self._send(status_code)
+        self._send(status_code, json.dumps(blob).encode("utf-8"), {"Content-Type": "application/json"})
+
+    def _dispatch(self, method):
+        split = urlsplit(self.path)
+        self.query = {key: vals[-1] for key, vals in parse_qs(split.query).items()}
+        raw_body = self._read_body()
+        self.server.record_request(method, self.path)
+        if split.path.startswith("/s3/"):
+            return self._handle_s3(method, unquote(split.path[len("/s3/"):]), raw_body)
+        if not split.path.startswith("/api/"):
+            return self._send_json(404, {"detail": "Not found."})
+        path = split.path[len("/api/"):].strip("/")
+        try:
+            self.json = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            return self._send_json(400, {"detail": "JSON parse error"})
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        for method_regex, path_regex, name in self.compiled_routes:
+            match = path_regex.match(path)
+            if match and method_regex.match(method):
+                args = [unquote(arg) for arg in match.groups()]
+                try:
+                    with self.state.lock:
+                        status_code, blob = getattr(self, name)(*args)
+                except StandInError as e:
+                    return self._send_json(e.status_code, {"detail": e.message})
+                return self._send_json(status_code, blob)
+        return self._send_json(404, {"detail": "Not found."})
+
+    # Helpers
+
+    def _paginate(self, items, url_path, to_blob=None):
+        """Return one page of `items`, serializing only that page with `to_blob`."""
+        page = int(self.query.get("page", 1))
+        page_size = int(self.query.get("page_size", self.server.page_size))
+        start = (page - 1) * page_size
+        results = items[start:start + page_size]
+        if to_blob:
+            results = [to_blob(item) for item in results]
+        next_url = None
+        if start + page_size < len(items):
+            query = dict(self.query, page=page + 1, page_size=page_size)
+            next_url = f"{self.server.url}/api/{url_path}?{urlencode(query)}"
+        return {"count": len(items), "next": next_url, "previous": None, "results": results}
+
+    def _update(self, table, obj_uuid, editable):
+        if obj_uuid not in table:
+            raise StandInError(404, "Not found.")
+        for key, val in self.json.items():
+            if key in editable:
+                table[obj_uuid][key] = val
+        table[obj_uuid]["updated_at"] = _now()
+
+    # Users
+
+    def get_me(self):
+        return 200, {"name": "stand-in user", "email": "stand-in@example.com"}
+
+    # Nested name lookups
+
+    def _nested_project(self, org_name, project_name):
+        return self.state.find_project(self.state.find_org(org_name), project_name)
+
+    def _nested_sample(self, org_name, project_name, sample_name):
+        return self.state.find_sample(self._nested_project(org_name, project_name), sample_name)
+
+    def get_nested_org(self, org_name):
+        return 200, self.state.org_blob(self.state.find_org(org_name))
+
+    def get_nested_project(self, org_name, project_name):
+        return 200, self.state.project_blob(self._nested_project(org_name, project_name))
+
+    def get_nested_sample(self, org_name, project_name, sample_name):
+        return 200, self.state.sample_blob(self._nested_sample(org_name, project_name, sample_name))
+
+    def get_nested_sample_folder(self, org_name, project_name, sample_name, module_name):
+        sample_uuid = self._nested_sample(org_name, project_name, sample_name)
+        folder_uuid = self.state.find_sample_folder(sample_uuid, module_name, self.query.get("replicate"))
+        return 200, self.state.sample_folder_blob(folder_uuid)
+
+    def get_nested_sample_file(self, org_name, project_name, sample_name, module_name, file_name):
+        sample_uuid = self._nested_sample(org_name, project_name, sample_name)
+        folder_uuid = self.state.find_sample_folder(sample_uuid, module_name)
+        file_uuid = self.state.find_file(self.state.sample_files, folder_uuid, file_name)
+        return 200, self.state.sample_file_blob(file_uuid)
+
+    def get_nested_project_folder(self, org_name, project_name, module_name):
+        project_uuid = self._nested_project(org_name, project_name)
+        folder_uuid = self.state.find_project_folder(project_uuid, module_name, self.query.get("replicate"))
+        return 200, self.state.project_folder_blob(folder_uuid)
+
+    def get_nested_project_file(self, org_name, project_name, module_name, file_name):
+        project_uuid = self._nested_project(org_name, project_name)
+        folder_uuid = self.state.find_project_folder(project_uuid, module_name)
+        file_uuid = self.state.find_file(self.state.project_files, folder_uuid, file_name)
+        return 200, self.state.project_file_blob(file_uuid)
+
+    # Organizations
+
+    def list_orgs(self):
+        blobs = [self.state.org_blob(org_uuid) for org_uuid in self.state.orgs]
+        return 200, self._paginate(blobs, "organizations")
+
+    def post_org(self):
+        return 201, self.state.create_org(self.json)
+
+    def get_org(self, org_uuid):
+        if org_uuid not in self.state.orgs:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.org_blob(org_uuid)
+
+    def update_org(self, org_uuid):
+        self._update(self.state.orgs, org_uuid, {"name"})
+        return 200, self.state.org_blob(org_uuid)
+
+    # Projects
+
+    def list_projects(self):
+        org_uuid = self.query.get("organization_id")
+        blobs = [
+            self.state.project_blob(project_uuid)
+            for project_uuid, project in self.state.projects.items()
+            if not org_uuid or project["organization"] == org_uuid
+        ]
+        return 200, self._paginate(blobs, "sample_groups")
+
+    def post_project(self):
+        return 201, self.state.create_project(self.json)
+
+    def get_project(self, project_uuid):
+        if project_uuid not in self.state.projects:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.project_blob(project_uuid)
+
+    def update_project(self, project_uuid):
+        self._update(
+            self.state.projects, project_uuid,
+            {"name", "description", "privacy_level", "organization", "metadata"},
+        )
+        return 200, self.state.project_blob(project_uuid)
+
+    def delete_project(self, project_uuid):
+        self.state.projects.pop(project_uuid, None)
+        self.state.project_samples.pop(project_uuid, None)
+        return 204, {}
+
+    def list_project_samples(self, project_uuid):
+        if project_uuid not in self.state.projects:
+            raise StandInError(404, "Not found.")
+        return 200, self._paginate(
+            list(self.state.project_samples[project_uuid]),
+            f"sample_groups/{project_uuid}/samples",
+            to_blob=self.state.sample_blob,
+        )
+
+    def add_project_samples(self, project_uuid):
+        members = self.state.project_samples[project_uuid]
+        for sample_uuid in self.json.get("sample_uuids", []):
+            self.state._require(self.state.samples, sample_uuid, "Sample")
+            members[sample_uuid] = None
+        return 200, {"sample_uuids": list(members)}
+
+    def remove_project_samples(self, project_uuid):
+        for sample_uuid in self.json.get("sample_uuids", []):
+            self.state.project_samples[project_uuid].pop(sample_uuid, None)
+        return 204, {}
+
+    def get_project_metadata(self, project_uuid):
+        return 200, {
+            self.state.samples[sample_uuid]["name"]: self.state.samples[sample_uuid]["metadata"]
+            for sample_uuid in self.state.project_samples[project_uuid]
+        }
+
+    def post_project_download(self, project_uuid):
+        """Find files in a project, a simplified version of the real filters."""
+        sample_uuids = set(self.json.get("sample_uuids") or self.state.project_samples[project_uuid])
+        folder_type = self.json.get("folder_type") or "all"
+        extensions = self.json.get("extensions") or []
+        links, total_size = {}, 0
+
+        def add_file(path, blob):
+            nonlocal total_size
+            if extensions and not any(path.endswith(ext) for ext in extensions):
+                return
+            stored_data = blob["stored_data"]
+            links[path] = stored_data.get("presigned_url") or stored_data.get("uri") or ""
+            total_size += stored_data.get("file_size_bytes", 0)
+
+        if folder_type in ("all", "sample"):
+            for file_blob in self.state.sample_files.values():
+                folder = self.state.sample_folders[file_blob["analysis_result"]]
+                if folder["sample"] in sample_uuids:
+                    sample = self.state.samples[folder["sample"]]
+                    add_file(f"{sample['name']}/{folder['module_name']}/{file_blob['name']}", file_blob)
+        if folder_type in ("all", "project"):
+            for file_blob in self.state.project_files.values():
+                folder = self.state.project_folders[file_blob["analysis_result"]]
+                if folder["sample_group"] == project_uuid:
+                    add_file(f"{folder['module_name']}/{file_blob['name']}", file_blob)
+        return 200, {"file_size_bytes": total_size, "links": links, "no_size_info_count": 0}
+
+    # Samples
+
+    def post_sample(self):
+        return 201, self.state.create_sample(self.json)
+
+    def get_sample(self, sample_uuid):
+        if sample_uuid not in self.state.samples:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.sample_blob(sample_uuid)
+
+    def update_sample(self, sample_uuid):
+        if sample_uuid not in self.state.samples:
+            raise StandInError(404, "Not found.")
+        sample = self.state.samples[sample_uuid]
+        self.state.library_sample_names.pop((sample["library"], sample["name"]), None)
+        self._update(self.state.samples, sample_uuid, {"name", "metadata", "description"})
+        new_library = self.json.get("library")
+        if new_library and new_library != sample["library"]:
+            self.state._require(self.state.projects, new_library, "Project")
+            sample["library"] = new_library
+            self.state.project_samples[new_library][sample_uuid] = None
+        self.state.library_sample_names[(sample["library"], sample["name"])] = sample_uuid
+        return 200, self.state.sample_blob(sample_uuid)
+
+    def delete_sample(self, sample_uuid):
+        sample = self.state.samples.pop(sample_uuid, None)
+        if sample:
+            self.state.library_sample_names.pop((sample["library"], sample["name"]), None)
+        for members in self.state.project_samples.values():
+            members.pop(sample_uuid, None)
+        return 204, {}
+
+    # Result folders
+
+    def list_sample_folders(self):
+        sample_uuid = self.query.get("sample_id")
+        blobs = [
+            self.state.sample_folder_blob(folder_uuid)
+            for folder_uuid, folder in self.state.sample_folders.items()
+            if not sample_uuid or folder["sample"] == sample_uuid
+        ]
+        return 200, self._paginate(blobs, "sample_ars")
+
+    def post_sample_folder(self):
+        return 201, self.state.create_sample_folder(self.json)
+
+    def get_sample_folder(self, folder_uuid):
+        if folder_uuid not in self.state.sample_folders:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.sample_folder_blob(folder_uuid)
+
+    def update_sample_folder(self, folder_uuid):
+        if "sample" in self.json:
+            self.state._require(self.state.samples, self.json["sample"], "Sample")
+        self._update(self.state.sample_folders, folder_uuid, {"sample", "description", "is_private", "metadata"})
+        return 200, self.state.sample_folder_blob(folder_uuid)
+
+    def list_project_folders(self):
+        project_uuid = self.query.get("sample_group_id")
+        blobs = [
+            self.state.project_folder_blob(folder_uuid)
+            for folder_uuid, folder in self.state.project_folders.items()
+            if not project_uuid or folder["sample_group"] == project_uuid
+        ]
+        return 200, self._paginate(blobs, "sample_group_ars")
+
+    def post_project_folder(self):
+        return 201, self.state.create_project_folder(self.json)
+
+    def get_project_folder(self, folder_uuid):
+        if folder_uuid not in self.state.project_folders:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.project_folder_blob(folder_uuid)
+
+    def update_project_folder(self, folder_uuid):
+        if "sample_group" in self.json:
+            self.state._require(self.state.projects, self.json["sample_group"], "Project")
+        self._update(
+            self.state.project_folders, folder_uuid, {"sample_group", "description", "is_private", "metadata"},
+        )
+        return 200, self.state.project_folder_blob(folder_uuid)
+
+    # Result files
+
+    def list_sample_files(self):
+        folder_uuid = self.query.get("analysis_result_id")
+        blobs = [
+            self.state.sample_file_blob(file_uuid)
+            for file_uuid, file_blob in self.state.sample_files.items()
+            if not folder_uuid or file_blob["analysis_result"] == folder_uuid
+        ]
+        return 200, self._paginate(blobs, "sample_ar_fields")
+
+    def post_sample_file(self):
+        return 201, self.state.create_sample_file(self.json)
+
+    def get_sample_file(self, file_uuid):
+        if file_uuid not in self.state.sample_files:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.sample_file_blob(file_uuid)
+
+    def list_project_files(self):
+        folder_uuid = self.query.get("analysis_result_id")
+        blobs = [
+            self.state.project_file_blob(file_uuid)
+            for file_uuid, file_blob in self.state.project_files.items()
+            if not folder_uuid or file_blob["analysis_result"] == folder_uuid
+        ]
+        return 200, self._paginate(blobs, "sample_group_ar_fields")
+
+    def post_project_file(self):
+        return 201, self.state.create_project_file(self.json)
+
+    def get_project_file(self, file_uuid):
+        if file_uuid not in self.state.project_files:
+            raise StandInError(404, "Not found.")
+        return 200, self.state.project_file_blob(file_uuid)
+
+    def update_file(self, file_uuid):
+        table = self.state.file_table(file_uuid)
+        if "analysis_result" in self.json:
+            folders = self.state.sample_folders if table is self.state.sample_files else self.state.project_folders
+            self.state._require(folders, self.json["analysis_result"], "Result folder")
+        self._update(table, file_uuid, {"analysis_result", "name", "stored_data", "pipeline_run"})
+        if table is self.state.sample_files:
+            return 200, self.state.sample_file_blob(file_uuid)
+        return 200, self.state.project_file_blob(file_uuid)
+
+    # Bulk creates. Objects that already exist come back as null.
+
+    def _bulk_create(self, list_key, create):
+        blobs = []
+        for data in self.json.get(list_key, []):
+            try:
+                blobs.append(create(data))
+            except StandInError as e:
+                if "unique set" not in e.message:
+                    raise
+                blobs.append(None)
+        return 200, {list_key: blobs}
+
+    def post_bulk_samples(self):
+        return self._bulk_create("samples", self.state.create_sample)
+
+    def post_bulk_sample_folders(self):
+        return self._bulk_create("sample_results", self.state.create_sample_folder)
+
+    def post_bulk_sample_files(self):
+        return self._bulk_create("sample_result_fields", self.state.create_sample_file)
+
+    # Multipart uploads
+
+    def post_create_upload(self, file_uuid):
+        self.state.file_table(file_uuid)
+        upload_id = _new_uuid()
+        self.state.uploads[upload_id] = {
+            "field": file_uuid,
+            "key": f"{file_uuid}/{self.json['filename']}",
+            "optional_fields": self.json.get("optional_fields") or {},
+            "parts": {},
+        }
+        return 200, {"upload_id": upload_id}
+
+    def post_create_upload_urls(self, file_uuid):
+        upload = self.state.uploads[self.json["upload_id"]]
+        return 200, {
+            str(part): (
+                f"{self.server.url}/s3/{upload['key']}?partNumber={part}&uploadId={self.json['upload_id']}"
+                f"&AWSAccessKeyId=stand-in&Signature=stand-in"
+            )
+            for part in self.json["parts"]
+        }
+
+    def post_complete_upload(self, file_uuid):
+        upload = self.state.uploads.pop(self.json["upload_id"])
+        parts = sorted(self.json["parts"], key=lambda part: part["PartNumber"])
+        self.state.s3_objects[upload["key"]] = b"".join(upload["parts"][part["PartNumber"]] for part in parts)
+        table = self.state.file_table(file_uuid)
+        stored_data = {
+            "__type__": "s3",
+            "uri": f"s3://stand-in/{upload['key']}",
+            "endpoint_url": self.server.url,
+            "presigned_url": f"{self.server.url}/s3/{upload['key']}",
+        }
+        stored_data.update(upload["optional_fields"])
+        table[file_uuid]["stored_data"] = stored_data
+        return 200, {"status": "success"}
+
+    # Fake presigned S3 target
+
+    def _handle_s3(self, method, key, body):
+        if method == "PUT":
+            upload = self.state.uploads.get(self.query.get("uploadId"))
+            if upload is None:
+                return self._send(404)
+            with self.state.lock:
+                upload["parts"][int(self.query["partNumber"])] = body
+            return self._send(200, headers={"ETag": f'"{uuid_lib.uuid5(uuid_lib.NAMESPACE_OID, key)}"'})
+        if method == "GET":
+            content = self.state.s3_objects.get(key)
+            if content is None:
+                return self._send(404)
+            range_header = self.headers.get("Range")
+            if range_header:  # e.g. "bytes=0-1023", end is inclusive
+                start, end = range_header.split("=")[1].split("-")
+                content = content[int(start):int(end) + 1 if end else None]
+                return self._send(206, content, {"Content-Type": "application/octet-stream"})
+            return self._send(200, content, {"Content-Type": "application/octet-stream"})
+        return self._send(405)
+
+
+class StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state, page_size=DEFAULT_PAGE_SIZE, latency=0.0):
+        super().__init__(address, StandInRequestHandler)
+        self.state = state
+        self.page_size = page_size
+        self.latency = latency
+        self.url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self.requests = []
+        self._requests_lock = threading.Lock()
+
+    def record_request(self, method, path):
+        with self._requests_lock:
+            self.requests.append((method, path))
+
+
+class StandInServer:
+    """Run a stand in GeoSeeq API on a background thread.
+
+    `url` can be passed to `Knex` as the endpoint. `requests` lists the
+    (method, path) of every request received, which is useful for counting
+    round trips. `latency` adds a delay, in seconds, to every API request.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, page_size=DEFAULT_PAGE_SIZE, latency=0.0):
+        self.state = StandInState()
+        self.httpd = StandInHTTPServer((host, port), self.state, page_size=page_size, latency=latency)
+        self.thread = None
+
+    @property
+    def url(self):
+        return self.httpd.url
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def reset_requests(self):
+        with self.httpd._requests_lock:
+            self.httpd.requests.clear()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
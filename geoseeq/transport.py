@@ -0,0 +1,204 @@
+"""Pluggable transports that send Knex requests.
+
+A transport is any object with a `send(session, method, url, data, headers)`
+method that returns a `requests.Response`. Knex uses `SessionTransport` by
+default, which sends the request with the knex's `requests.Session`.
+
+`RecordingTransport` saves every request and response to a JSON cassette and
+`ReplayTransport` answers requests from a cassette without touching the
+network, which makes SDK runs reproducible for tests and benchmarks.
+Transfers to presigned storage URLs do not go through Knex and are not
+recorded.
+
+Set `GEOSEEQ_CASSETTE` to a cassette path and `GEOSEEQ_CASSETTE_MODE` to
+`record` or `replay` to use a cassette with every Knex in a process.
+Recordings are added to the cassette, delete it to record from scratch.
+"""
+import base64
+import gzip
+import json
+import logging
+import os
+import threading
+from multiprocessing.util import Finalize
+
+from .file_system_cache import cache_dir_lock, write_atomic
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+CASSETTE_VERSION = 1
+RECORDED_RESPONSE_HEADERS = ["Content-Type"]
+
+
+class CassetteMismatchError(Exception):
+    pass
+
+
+def relative_url(url):
+    """Return the part of `url` after the API root, e.g. `samples/<uuid>?format=json`."""
+    if "/api/" in url:
+        return url.split("/api/", 1)[1]
+    return url
+
+
+def _decode_request_body(data, headers):
+    if data is None:
+        return None
+    if headers and headers.get("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    try:
+        return json.loads(data)
+    except ValueError:
+        return data
+
+
+def _encode_response_body(content):
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_response_body(body):
+    if "base64" in body:
+        return base64.b64decode(body["base64"])
+    return body["text"].encode("utf-8")
+
+
+class SessionTransport:
+    """Send requests with the knex's `requests.Session`."""
+
+    def send(self, session, method, url, data=None, headers=None):
+        return session.request(method, url, data=data, headers=headers)
+
+    def close(self):
+        pass
+
+
+class RecordingTransport:
+    """Send requests with `inner` and record each interaction to a cassette file.
+
+    Interactions are added to the cassette when `save()` is called, when
+    the transport is closed with its knex and when the process exits, so
+    every knex and worker process recording to one path adds to it.
+    """
+
+    def __init__(self, cassette_path, inner=None):
+        self.cassette_path = cassette_path
+        self.inner = inner or SessionTransport()
+        self.interactions = []
+        self._n_saved = 0
+        self._lock = threading.Lock()
+        # Runs at interpreter exit through atexit, and when multiprocessing
+        # workers exit, which skip atexit. The CLI never closes its knex.
+        Finalize(None, self.save, exitpriority=10)
+
+    def __reduce__(self):
+        return (RecordingTransport, (self.cassette_path, self.inner))
+
+    def send(self, session, method, url, data=None, headers=None):
+        response = self.inner.send(session, method, url, data=data, headers=headers)
+        interaction = {
+            "request": {
+                "method": method,
+                "url": relative_url(url),
+                "body": _decode_request_body(data, headers),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": {
+                    key: response.headers[key]
+                    for key in RECORDED_RESPONSE_HEADERS if key in response.headers
+                },
+                "body": _encode_response_body(response.content),
+            },
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return response
+
+    def save(self):
+        """Add the interactions recorded since the last save to the cassette."""
+        with self._lock:
+            new_interactions = self.interactions[self._n_saved:]
+            if not new_interactions:
+                return
+            dirpath = os.path.dirname(os.path.abspath(self.cassette_path))
+            with cache_dir_lock(dirpath):
+                try:
+                    with open(self.cassette_path) as f:
+                        interactions = json.load(f)["interactions"]
+                except FileNotFoundError:
+                    interactions = []
+                cassette = {"version": CASSETTE_VERSION, "interactions": interactions + new_interactions}
+                write_atomic(self.cassette_path, json.dumps(cassette, indent=1))
+            self._n_saved += len(new_interactions)
+
+    def close(self):
+        self.save()
+        self.inner.close()
+
+
+class ReplayTransport:
+    """Answer requests from a cassette recorded by `RecordingTransport`.
+
+    Requests are matched on method, relative URL and JSON body. Matching
+    interactions are replayed in the order they were recorded. Once all
+    recorded matches have been used the last one is repeated, so replays
+    that make extra identical requests (e.g. with a colder cache) still work.
+    """
+
+    def __init__(self, cassette_path):
+        self.cassette_path = cassette_path
+        with open(cassette_path) as f:
+            cassette = json.load(f)
+        self._queues = {}
+        for interaction in cassette["interactions"]:
+            self._queues.setdefault(self._key(**interaction["request"]), []).append(interaction["response"])
+        self._used = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (ReplayTransport, (self.cassette_path,))
+
+    def _key(self, method, url, body):
+        return (method.upper(), url, json.dumps(body, sort_keys=True))
+
+    def send(self, session, method, url, data=None, headers=None):
+        key = self._key(method, relative_url(url), _decode_request_body(data, headers))
+        with self._lock:
+            responses = self._queues.get(key)
+            if not responses:
+                raise CassetteMismatchError(f"No recorded response for {method} {relative_url(url)}")
+            index = self._used.get(key, 0)
+            self._used[key] = index + 1
+            recorded = responses[min(index, len(responses) - 1)]
+        response = Response()
+        response.status_code = recorded["status_code"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = _decode_response_body(recorded["body"])
+        response.url = url
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+
+def transport_from_env():
+    """Return a transport configured by GEOSEEQ_CASSETTE and GEOSEEQ_CASSETTE_MODE."""
+    cassette_path = os.environ.get("GEOSEEQ_CASSETTE")
+    if not cassette_path:
+        return SessionTransport()
+    mode = os.environ.get("GEOSEEQ_CASSETTE_MODE", "replay").lower()
+    if mode == "record":
+        return RecordingTransport(cassette_path)
+    if mode == "replay":
+        return ReplayTransport(cassette_path)
+    raise ValueError(f'Unknown GEOSEEQ_CASSETTE_MODE "{mode}", must be "record" or "replay"')
@@ -0,0 +1,121 @@
+"""Queue creates and saves and send them through the bulk endpoints.
+
+Creating 10k samples with a folder each one by one takes a GET and a POST
+per object. Inside `with knex.batch():` samples, sample result folders and
+sample result files that are created, with `create()` or `idem()`, are
+queued instead. When the block exits they are sent through the bulk
+endpoints in dependency order, samples then folders then files,
+`chunk_size` objects per request and `n_threads` requests at a time. The
+server blobs are loaded back into the queued objects, so they have UUIDs
+once the block exits. Objects that already existed are loaded from a
+listing of their parent, see `bulk_upsert`.
+
+Saves of fetched objects are queued too and sent after the creates, on the
+same threads. A save of an object whose create is queued is folded into
+the create; if the object already existed its changed fields are put back
+after the server's are loaded and it is saved like the others. Objects of
+other types are created at once, as outside a batch. If the block raises
+nothing queued is sent.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .bulk_creators import (
+    BULK_CHUNK_SIZE,
+    BULK_SAMPLES,
+    BULK_SAMPLE_RESULT_FOLDERS,
+    BULK_SAMPLE_RESULT_FILES,
+    bulk_upsert,
+)
+
+logger = logging.getLogger("geoseeq_api")  # Same name as calling module
+logger.addHandler(logging.NullHandler())  # No output unless configured by calling program
+
+BATCH_CHUNK_SIZE = BULK_CHUNK_SIZE
+BATCH_THREADS = 8
+
+
+def _bulk_levels():
+    """Return (type, bulk endpoint) pairs in the order they are created."""
+    from .sample import Sample  # import here to avoid circular import
+    from .result import SampleResultFile, SampleResultFolder
+    return [
+        (Sample, BULK_SAMPLES),
+        (SampleResultFolder, BULK_SAMPLE_RESULT_FOLDERS),
+        (SampleResultFile, BULK_SAMPLE_RESULT_FILES),
+    ]
+
+
+class Batch:
+    """The creates and saves queued by one `knex.batch()` block."""
+
+    def __init__(self, knex, chunk_size=BATCH_CHUNK_SIZE, n_threads=BATCH_THREADS):
+        self.knex = knex
+        self.chunk_size = chunk_size
+        self.n_threads = n_threads
+        self._levels = _bulk_levels()
+        self._batched_types = tuple(obj_type for obj_type, _ in self._levels)
+        self._creates = {}  # id(obj) -> obj, in the order queued
+        self._saves = {}
+        self._folded_saves = {}  # saves of objects with a queued create
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._creates) + len(self._saves)
+
+    def queue_create(self, obj):
+        """Queue `obj` for a bulk create. Return False if its type has no bulk endpoint."""
+        if not isinstance(obj, self._batched_types):
+            return False
+        with self._lock:
+            self._creates.setdefault(id(obj), obj)
+        return True
+
+    def queue_save(self, obj):
+        """Queue `obj` to be saved. Return False if it can not be saved in this batch."""
+        with self._lock:
+            if id(obj) in self._creates:
+                self._folded_saves.setdefault(id(obj), obj)  # the create sends its current fields
+                return True
+            if not obj._already_fetched:
+                return False
+            self._saves.setdefault(id(obj), obj)
+        return True
+
+    def flush(self):
+        """Send the queued creates, level by level, then the queued saves."""
+        with self._lock:
+            creates, self._creates = list(self._creates.values()), {}
+            saves, self._saves = list(self._saves.values()), {}
+            folded, self._folded_saves = list(self._folded_saves.values()), {}
+        logger.debug(f"Flushing batch. {len(creates)} creates, {len(saves)} saves")
+        local_fields = {id(obj): _set_fields(obj) for obj in folded}
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            for obj_type, bulk_endpoint in self._levels:
+                objs = [obj for obj in creates if isinstance(obj, obj_type)]
+                if not objs:
+                    continue
+                existed = bulk_upsert(
+                    self.knex, bulk_endpoint, objs, chunk_size=self.chunk_size, map_fn=executor.map,
+                    overwritable=folded,
+                )
+                for obj in existed:
+                    if id(obj) in local_fields and _restore_fields(obj, local_fields[id(obj)]):
+                        saves.append(obj)
+            list(executor.map(lambda obj: obj.save(), saves))
+
+
+def _set_fields(obj):
+    """Return the remote fields of an unfetched `obj` that loading a blob would conflict with."""
+    return {field: val for field in obj.remote_fields for val in (getattr(obj, field, None),) if val}
+
+
+def _restore_fields(obj, fields):
+    """Set `fields` on `obj` where they differ from the loaded blob. Return True if any did."""
+    changed = False
+    for field, val in fields.items():
+        if getattr(obj, field, None) != val:
+            setattr(obj, field, val)
+            changed = True
+    return changed
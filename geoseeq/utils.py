@@ -3,10 +3,11 @@ import os
 import logging
 from ftplib import FTP
 from threading import Timer
-from .file_system_cache import FileSystemCache
 from os.path import join, exists
 import json
 from os import environ, makedirs
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from uuid import uuid4
 from .constants import CONFIG_DIR, PROFILES_PATH, DEFAULT_ENDPOINT
 
 logger = logging.getLogger('geoseeq_api')  # Same name as calling module
@@ -45,25 +46,65 @@ def set_profile(token, endpoint=DEFAULT_ENDPOINT, profile="", overwrite=False):
         json.dump(profiles, f, indent=4)
 
 
+LISTING_PARENT_FILTERS = ('sample_id', 'sample_group_id', 'analysis_result_id')
+
+
+def listing_namespace(url):
+    """Return the path of a listing URL and its parent filter, without the rest of the query or the API endpoint."""
+    split = urlsplit(url)
+    path = split.path.strip('/')
+    if path.startswith('api/'):
+        path = path[len('api/'):]
+    parent_filter = sorted((k, v) for k, v in parse_qsl(split.query) if k in LISTING_PARENT_FILTERS)
+    if parent_filter:
+        path += '?' + urlencode(parent_filter)
+    return path
+
+
+def _listing_generation(cache, url):
+    key = f'listing-generation/{listing_namespace(url)}'
+    blob = cache.get_cached_blob(key)
+    if blob is None:
+        blob = {'generation': uuid4().hex}
+        cache.cache_blob(key, blob)
+    return blob['generation']
+
+
+def invalidate_listing(knex, url):
+    """Evict every cached page of the listing at `url`, whatever its query."""
+    knex.cache.clear_blob(f'listing-generation/{listing_namespace(url)}')
+
+
 def paginated_iterator(knex, initial_url, error_handler=None):
-    cache = FileSystemCache()
-    result = cache.get_cached_blob(initial_url)
-    if not result:
-        try:
-            result = knex.get(initial_url)
-        except Exception as e:
-            logger.debug(f'Error fetching blob:\n\t{initial_url}\n\t{e}')
-            if error_handler:
-                error_handler(e)
-            else:
+    """Yield every blob in a paginated listing, caching each page."""
+    for page in paginated_pages(knex, initial_url, error_handler=error_handler):
+        yield from page['results']
+
+
+def paginated_pages(knex, initial_url, error_handler=None):
+    """Yield every page of a paginated listing, caching each page.
+
+    Pages are cached under a generation of their listing, clearing the
+    generation with `invalidate_listing` evicts all of them at once.
+    """
+    cache = knex.cache
+    generation = _listing_generation(cache, initial_url)
+    url = initial_url
+    while url:
+        page_key = f'listing/{generation}/{url}'
+        result = cache.get_cached_blob(page_key)
+        if not result:
+            try:
+                result = knex.get(url)
+            except Exception as e:
+                logger.debug(f'Error fetching blob:\n\t{url}\n\t{e}')
+                if error_handler:
+                    error_handler(e)
+                    return
                 raise
-        cache.cache_blob(initial_url, result)
-    for blob in result['results']:
-        yield blob
-    next_page = result.get('next', None)
-    if next_page:
-        for blob in paginated_iterator(knex, next_page):
-            yield blob
+            cache.cache_blob(page_key, result)
+        yield result
+        url = result.get('next', None)
 
 
 def md5_checksum(fname):
@@ -9,7 +9,7 @@ setuptools.setup(
     author="David C. Danko",
     author_email='dcdanko@biotia.io',
     description=open('README.md').read(),
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     package_dir={'geoseeq': 'geoseeq'},
     install_requires=[
         'requests',
@@ -0,0 +1,73 @@
+"""Test suite for idempotent bulk upserts."""
+from geoseeq import Organization
+from geoseeq.bulk_creators import (
+    bulk_create_samples,
+    bulk_upsert_sample_result_files,
+    bulk_upsert_sample_result_folders,
+    bulk_upsert_samples,
+)
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestBulkUpsert(StandInTestCase):
+    """Test that upserts return created and existing objects."""
+
+    page_size = 2
+
+    def setUp(self):
+        super().setUp()
+        self.proj = Organization(self.knex, "org").idem().project("proj").idem()
+
+    def ingest(self, n_samples, chunk_size=2):
+        samples = bulk_upsert_samples(
+            self.knex, [self.proj.sample(f"sample {i}") for i in range(n_samples)], chunk_size=chunk_size,
+        )
+        folders = bulk_upsert_sample_result_folders(
+            self.knex, [sample.result_folder("module") for sample in samples.values()], chunk_size=chunk_size,
+        )
+        files = bulk_upsert_sample_result_files(
+            self.knex, [folder.result_file("reads") for folder in folders.values()], chunk_size=chunk_size,
+        )
+        return samples, folders, files
+
+    def test_returns_every_object(self):
+        """Test that the map includes objects that already existed."""
+        existing = self.proj.sample("sample 1").idem()
+        samples = bulk_upsert_samples(self.knex, [self.proj.sample(f"sample {i}") for i in range(3)])
+        self.assertEqual(sorted(samples), [(self.proj.uuid, f"sample {i}") for i in range(3)])
+        self.assertEqual(samples[(self.proj.uuid, "sample 1")].uuid, existing.uuid)
+        self.assertTrue(all(sample._already_fetched for sample in samples.values()))
+
+    def test_nested_keys(self):
+        """Test that folders and files are keyed by their parent's UUID and their names."""
+        samples, folders, files = self.ingest(2)
+        sample = samples[(self.proj.uuid, "sample 1")]
+        self.assertIn((sample.uuid, "module", None), folders)
+        folder = folders[(sample.uuid, "module", None)]
+        self.assertIsNotNone(files[(folder.uuid, "reads")].uuid)
+
+    def test_same_names_in_other_projects(self):
+        """Test that samples with the same name in different projects do not collide."""
+        other = Organization(self.knex, "org").project("other").idem()
+        samples = bulk_upsert_samples(self.knex, [self.proj.sample("sample"), other.sample("sample")])
+        self.assertEqual(len(samples), 2)
+        self.assertNotEqual(samples[(self.proj.uuid, "sample")].uuid, samples[(other.uuid, "sample")].uuid)
+
+    def test_rerun_has_no_per_object_requests(self):
+        """Test that a rerun lists each parent once instead of fetching each object."""
+        first = self.ingest(5)
+        self.knex.identity_map.clear()
+        self.server.reset_requests()
+        second = self.ingest(5)
+        for before, after in zip(first, second):
+            self.assertEqual({k: v.uuid for k, v in before.items()}, {k: v.uuid for k, v in after.items()})
+        gets = [path for method, path in self.server.requests if method == "GET"]
+        self.assertFalse(any("nested/" in path for path in gets), gets)
+        self.assertEqual(len([path for path in gets if "/samples" in path]), 3)  # 5 samples, 2 per page
+
+    def test_create_still_returns_new_objects_only(self):
+        """Test that bulk_create_samples keeps returning only created samples."""
+        self.proj.sample("sample 0").idem()
+        created = bulk_create_samples(self.knex, [self.proj.sample(f"sample {i}") for i in range(2)])
+        self.assertEqual([sample.name for sample in created], ["sample 1"])
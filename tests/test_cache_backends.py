@@ -0,0 +1,116 @@
+"""Test suite for selecting blob cache backends per Knex."""
+import os
+import pickle
+from unittest import TestCase, mock
+
+from geoseeq import Knex, Organization
+from geoseeq.cache_backends import (
+    HttpKeyValueClient,
+    KeyValueCache,
+    MemoryBlobCache,
+    NullCache,
+    make_cache,
+)
+from geoseeq.file_system_cache import FileSystemCache
+from geoseeq.memory_cache import TieredCache
+from geoseeq.sqlite_cache import SqliteCache
+from geoseeq.testing import StandInKeyValueServer
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestMakeCache(TestCase):
+    """Test building cache backends from specs."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_specs(self):
+        """Test that each spec builds the matching backend."""
+        self.assertIsInstance(make_cache("none"), NullCache)
+        self.assertIsInstance(make_cache("memory"), MemoryBlobCache)
+        directory = make_cache("directory:/tmp/geoseeq-cache")
+        self.assertIsInstance(directory.persistent, FileSystemCache)
+        self.assertEqual(directory.persistent.cache_dir, "/tmp/geoseeq-cache")
+        sqlite = make_cache("sqlite:/tmp/geoseeq-cache/blobs.sqlite3")
+        self.assertIsInstance(sqlite.persistent, SqliteCache)
+        self.assertEqual(sqlite.persistent.path, "/tmp/geoseeq-cache/blobs.sqlite3")
+        self.assertIsInstance(make_cache("http://localhost:1234/cache").persistent, KeyValueCache)
+        with self.assertRaises(ValueError):
+            make_cache("tape")
+
+    def test_env(self):
+        """Test that the default backend follows the environment."""
+        with mock.patch.dict(os.environ, {"GEOSEEQ_CACHE_BACKEND": "memory"}):
+            self.assertIsInstance(make_cache(), MemoryBlobCache)
+        with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}):
+            self.assertIsInstance(make_cache("sqlite"), NullCache)
+
+    def test_backend_objects(self):
+        """Test that backend objects are used as they are."""
+        cache = NullCache()
+        self.assertIs(Knex("http://localhost", cache=cache).cache, cache)
+
+    def test_memory_pickle(self):
+        """Test that memory caches start empty in other processes."""
+        cache = MemoryBlobCache()
+        cache.cache_blob("org", {"name": "org"})
+        self.assertIsNone(pickle.loads(pickle.dumps(cache)).get_cached_blob("org"))
+
+    def test_unreachable_key_value_store(self):
+        """Test that an unreachable key value store is treated as a miss."""
+        cache = KeyValueCache(HttpKeyValueClient("http://127.0.0.1:9", timeout=1))
+        cache.cache_blob("org", {"name": "org"})
+        self.assertIsNone(cache.get_cached_blob("org"))
+
+
+class TestKnexCacheBackends(StandInTestCase):
+    """Test that remote objects use the cache of their knex."""
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        Organization(self.knex, "org").create()
+
+    def make_knex(self, cache):
+        knex = Knex(self.server.url, cache=cache)
+        knex.add_api_token("stand-in-token")
+        self.addCleanup(knex.close)
+        return knex
+
+    def count_org_lookups(self):
+        return len([r for r in self.server.requests if r[1] == "/api/nested/org"])
+
+    def test_memory(self):
+        """Test that a memory cache is used by objects of its knex only."""
+        knex = self.make_knex("memory")
+        self.server.reset_requests()
+        Organization(knex, "org").get()
+        Organization(knex, "org").get()
+        self.assertEqual(self.count_org_lookups(), 1)
+        Organization(self.make_knex("memory"), "org").get()
+        self.assertEqual(self.count_org_lookups(), 2)
+
+    def test_none(self):
+        """Test that nothing is cached with the none backend."""
+        knex = self.make_knex("none")
+        self.server.reset_requests()
+        Organization(knex, "org").get()
+        Organization(knex, "org").get()
+        self.assertEqual(self.count_org_lookups(), 2)
+
+    def test_shared_key_value_store(self):
+        """Test that knexes on different machines can share one key value store."""
+        with StandInKeyValueServer() as kv:
+            first = self.make_knex(kv.url)
+            self.server.reset_requests()
+            Organization(first, "org").get()
+            # a copy in another process does not share the memory tier
+            second = pickle.loads(pickle.dumps(self.make_knex(kv.url)))
+            self.assertEqual(Organization(second, "org").get().name, "org")
+            self.assertEqual(self.count_org_lookups(), 1)
+            self.assertEqual(len(kv.values), 2)  # under its name and its UUID
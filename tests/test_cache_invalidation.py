@@ -0,0 +1,113 @@
+"""Test suite for evicting cached listings when objects change."""
+import os
+from unittest import mock
+
+from geoseeq import Knex, Organization
+from geoseeq.bulk_creators import bulk_create_samples
+from geoseeq.utils import listing_namespace
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestListingInvalidation(StandInTestCase):
+    """Test that writes evict the cached listings that include the written object."""
+
+    page_size = 2
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.knex = Knex(self.server.url, cache="memory")
+        self.knex.add_api_token("stand-in-token")
+        self.addCleanup(self.knex.close)
+        self.org = Organization(self.knex, "org").idem()
+        self.proj = self.org.project("proj").idem()
+        for i in range(3):
+            self.proj.sample(f"sample {i}").create()
+
+    def sample_names(self, proj=None):
+        proj = proj or self.proj
+        return sorted(sample.name for sample in proj.get_samples(cache=False))
+
+    def test_listing_is_cached(self):
+        """Test that listing twice sends the paginated requests once."""
+        self.sample_names()
+        self.server.reset_requests()
+        self.assertEqual(self.sample_names(), ["sample 0", "sample 1", "sample 2"])
+        self.assertEqual(self.server.requests, [])
+
+    def test_create(self):
+        """Test that creating a sample evicts its project's listing."""
+        self.sample_names()
+        self.proj.sample("sample 3").create()
+        self.assertEqual(self.sample_names(), ["sample 0", "sample 1", "sample 2", "sample 3"])
+
+    def test_save(self):
+        """Test that saving a sample evicts its project's listing."""
+        self.sample_names()
+        sample = self.proj.sample("sample 0").get()
+        sample.metadata = {"site": "a"}
+        sample.save()
+        metadata = {s.name: s.metadata for s in self.proj.get_samples(cache=False)}
+        self.assertEqual(metadata["sample 0"], {"site": "a"})
+
+    def test_delete(self):
+        """Test that deleting a sample evicts its project's listing and blob."""
+        self.sample_names()
+        self.proj.sample("sample 1").get().delete()
+        self.assertEqual(self.sample_names(), ["sample 0", "sample 2"])
+        self.assertFalse(self.proj.sample("sample 1").exists())
+
+    def test_add_sample_to_project(self):
+        """Test that adding a sample to another project evicts that project's listing."""
+        other = self.org.project("other").idem()
+        self.assertEqual(self.sample_names(other), [])
+        other.add_sample(self.proj.sample("sample 0").get()).save()
+        self.assertEqual(self.sample_names(other), ["sample 0"])
+
+    def test_bulk_create(self):
+        """Test that bulk creating samples evicts their project's listing."""
+        self.sample_names()
+        with mock.patch.object(self.knex, "post", return_value={"samples": []}):
+            bulk_create_samples(self.knex, [self.proj.sample("sample 3")])
+        self.proj.sample("sample 3").create()  # the mocked bulk request did not create it
+        self.assertIn("sample 3", self.sample_names())
+
+    def test_create_folder_and_file(self):
+        """Test that creating folders and files evicts their listings."""
+        sample = self.proj.sample("sample 0").get()
+        folder = sample.result_folder("module").create()
+        self.assertEqual([f.name for f in sample.get_result_folders(cache=False)], ["module"])
+        self.assertEqual(list(folder.get_result_files(cache=False)), [])
+        sample.result_folder("other module").create()
+        folder.result_file("reads").create()
+        self.assertEqual(len(list(sample.get_result_folders(cache=False))), 2)
+        self.assertEqual([f.name for f in folder.get_result_files(cache=False)], ["reads"])
+
+    def test_listing_namespace(self):
+        """Test that pages of one listing share a namespace."""
+        self.assertEqual(
+            listing_namespace("sample_groups/abc/samples"),
+            listing_namespace("https://example.com/api/sample_groups/abc/samples?page=2"),
+        )
+
+    def test_listing_namespace_keeps_parent(self):
+        """Test that listings of different parents have different namespaces."""
+        self.assertEqual(
+            listing_namespace("sample_ars?sample_id=a"),
+            listing_namespace("https://example.com/api/sample_ars?format=json&sample_id=a&page=2"),
+        )
+        self.assertNotEqual(listing_namespace("sample_ars?sample_id=a"), listing_namespace("sample_ars?sample_id=b"))
+
+    def test_write_keeps_other_listings(self):
+        """Test that writing a folder leaves the folder listings of other samples cached."""
+        sample, other = self.proj.sample("sample 0").get(), self.proj.sample("sample 1").get()
+        sample.result_folder("module").create()
+        list(other.get_result_folders(cache=False))
+        sample.result_folder("other module").create()
+        self.server.reset_requests()
+        self.assertEqual(list(other.get_result_folders(cache=False)), [])
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(len(list(sample.get_result_folders(cache=False))), 2)
@@ -0,0 +1,87 @@
+"""Test suite for prefetching projects into the cache."""
+import json
+import os
+import tempfile
+from time import perf_counter
+from unittest import TestCase, mock
+
+from click.testing import CliRunner
+
+from geoseeq import Knex, Organization
+from geoseeq.cache_warmer import RateLimiter, warm_project_cache
+from geoseeq.cli.main import main
+from geoseeq.id_constructors import result_file_from_uuid, sample_from_uuid
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestRateLimiter(TestCase):
+    """Test the request rate limiter."""
+
+    def test_rate_is_limited(self):
+        """Test that calls beyond the rate wait for their slot."""
+        limiter = RateLimiter(50)
+        start = perf_counter()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(perf_counter() - start, 0.09)
+
+
+class TestCacheWarmer(StandInTestCase):
+    """Test that a warmed cache serves a project without requests."""
+
+    page_size = 2
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        org = Organization(self.knex, "org").idem()
+        self.proj = org.project("proj").idem()
+        self.files = []
+        for i in range(3):
+            folder = self.proj.sample(f"sample {i}").idem().result_folder("module").idem()
+            self.files.append(folder.result_file("reads").idem())
+        self.proj.result_folder("summary").idem().result_file("table").idem()
+
+    def make_knex(self):
+        knex = Knex(self.server.url, cache="memory")
+        knex.add_api_token("stand-in-token")
+        self.addCleanup(knex.close)
+        return knex
+
+    def test_warm_project(self):
+        """Test that names, UUIDs and listings are served from the warmed cache."""
+        knex = self.make_knex()
+        proj = Organization(knex, "org").project("proj").get()
+        progress = warm_project_cache(proj, n_threads=2)
+        self.assertEqual((progress.samples, progress.folders, progress.files), (3, 4, 4))
+        self.assertEqual(progress.errors, 0)
+
+        self.server.reset_requests()
+        sample = Organization(knex, "org").project("proj").sample("sample 1").get()
+        self.assertEqual(sample_from_uuid(knex, sample.uuid).name, "sample 1")
+        result_file = result_file_from_uuid(knex, self.files[2].uuid)
+        self.assertEqual(result_file.name, "reads")
+        folders = list(sample.get_result_folders(cache=False))
+        self.assertEqual([f.name for f in folders[0].get_result_files(cache=False)], ["reads"])
+        self.assertEqual(len(list(proj.get_samples(cache=False))), 3)
+        self.assertEqual(self.server.requests, [])
+
+    def test_max_rate(self):
+        """Test that the crawl is slowed to the maximum request rate."""
+        knex = self.make_knex()
+        proj = Organization(knex, "org").project("proj").get()
+        progress = warm_project_cache(proj, max_requests_per_second=100)
+        self.assertGreaterEqual(progress.seconds, (progress.requests - 1) / 100)
+
+    def test_cli(self):
+        """Test that `geoseeq cache warm` reports what it cached."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as profiles:
+            json.dump({"__default__": {"endpoint": self.server.url, "token": "stand-in-token"}}, profiles)
+            profiles.flush()
+            with mock.patch("geoseeq.utils.PROFILES_PATH", profiles.name):
+                result = CliRunner().invoke(main, ["cache", "warm", "org/proj"], env={"GEOSEEQ_CACHE_BACKEND": "memory"})
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Cached 11 objects", result.output)
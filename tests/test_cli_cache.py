@@ -0,0 +1,64 @@
+"""Test suite for the cache management CLI."""
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from click.testing import CliRunner
+
+from geoseeq.cli.main import main
+from geoseeq.sqlite_cache import SqliteCache
+
+
+class TestCliCache(TestCase):
+    """Test the `geoseeq cache` commands."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "blobs.sqlite3")
+        cache = SqliteCache(path=self.path)
+        for i in range(10):
+            cache.cache_blob(f"samples/{i}", {"i": i})
+        cache.get_cached_blob("samples/0")
+        cache.get_cached_blob("samples/missing")
+        cache.flush()
+
+    def invoke(self, *args):
+        result = CliRunner().invoke(main, ["cache", *args, "--cache-path", self.path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.output
+
+    def test_stats(self):
+        """Test that stats report entries and hit ratio."""
+        self.assertIn("Hit ratio:      50.0%", self.invoke("stats"))
+        stats = json.loads(self.invoke("stats", "--json"))
+        self.assertEqual(stats["entries"], 10)
+
+    def test_prune(self):
+        """Test that prune evicts entries over the given budget."""
+        self.assertIn("6 least recently used", self.invoke("prune", "--max-entries", "5"))
+        self.assertEqual(SqliteCache(path=self.path).stats()["entries"], 4)
+
+    def test_clear(self):
+        """Test that clear deletes every entry."""
+        self.assertIn("Cache cleared.", self.invoke("clear", "--yes"))
+        self.assertEqual(SqliteCache(path=self.path).stats()["entries"], 0)
+
+    def test_uses_configured_backend(self):
+        """Test that the cache set by GEOSEEQ_CACHE_BACKEND is used without --cache-path."""
+        with mock.patch.dict(os.environ, {"GEOSEEQ_CACHE_BACKEND": f"sqlite:{self.path}"}):
+            result = CliRunner().invoke(main, ["cache", "stats", "--json"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(json.loads(result.output)["entries"], 10)
+
+    def test_unsupported_backend(self):
+        """Test that backends without stats give a clear error."""
+        with mock.patch.dict(os.environ, {"GEOSEEQ_CACHE_BACKEND": f"directory:{self.tmpdir.name}"}):
+            result = CliRunner().invoke(main, ["cache", "prune"])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('"directory:', result.output)
+        self.assertIn("does not support prune", result.output)
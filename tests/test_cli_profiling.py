@@ -0,0 +1,72 @@
+"""Test suite for profiling CLI commands."""
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import click
+from click.testing import CliRunner
+
+from geoseeq import Knex, Organization
+from geoseeq.cli.profiling import profiling_options
+from geoseeq.testing import StandInServer
+
+
+def make_cli(server_url):
+    """Return a click group with profiling options and one command that calls the API."""
+
+    @click.group()
+    @profiling_options
+    def cli():
+        pass
+
+    @cli.command()
+    def make_org():
+        knex = Knex(server_url)
+        knex.add_api_token("stand-in-token")
+        Organization(knex, "profiled org").idem()
+        click.echo("done")
+
+    return cli
+
+
+class TestCliProfiling(TestCase):
+    """Test that the profiling options write a profile and summary."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.server = StandInServer().start()
+        self.addCleanup(self.server.stop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.prefix = os.path.join(self.tmpdir.name, "run")
+
+    def test_profile_output(self):
+        """Test that a profiled command writes a profile and reports the endpoints it used."""
+        result = CliRunner().invoke(
+            make_cli(self.server.url),
+            ["--profile-output", self.prefix, "--profile-sample-interval", "0.001", "--profile-memory", "make-org"],
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(os.path.isfile(f"{self.prefix}.prof"))
+        self.assertTrue(os.path.isfile(f"{self.prefix}.folded.txt"))
+        with open(f"{self.prefix}.summary.json") as f:
+            summary = json.load(f)
+        endpoints = {row["endpoint"] for row in summary["top_endpoints"]}
+        self.assertIn("POST organizations", endpoints)
+        self.assertTrue(summary["top_functions"])
+        self.assertIn("peak_bytes", summary["memory"])
+
+    def test_profile_env_var(self):
+        """Test that profiling can be turned on with an environment variable."""
+        result = CliRunner().invoke(make_cli(self.server.url), ["make-org"], env={"GEOSEEQ_PROFILE": self.prefix})
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(os.path.isfile(f"{self.prefix}.prof"))
+
+    def test_no_profile_by_default(self):
+        """Test that nothing is written unless profiling is requested."""
+        result = CliRunner().invoke(make_cli(self.server.url), ["make-org"], env={"GEOSEEQ_PROFILE": None})
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertFalse(os.listdir(self.tmpdir.name))
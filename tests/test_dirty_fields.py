@@ -0,0 +1,65 @@
+"""Test suite for dirty field tracking and PATCH saves."""
+from unittest import mock
+
+from geoseeq import Organization
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestDirtyFields(StandInTestCase):
+    """Test that saves send only the fields changed since the last fetch."""
+
+    def setUp(self):
+        super().setUp()
+        self.proj = Organization(self.knex, "org").idem().project("proj").idem()
+        self.sample = self.proj.sample("sample", metadata={"site": "a", "depth": 1}).idem()
+        self.result_file = self.sample.result_folder("module").idem().result_file("reads")
+        self.result_file.stored_data = {"uri": "s3://bucket/reads.fq"}
+        self.result_file.idem()
+
+    def saved_payloads(self, obj):
+        with mock.patch.object(self.knex, "patch", wraps=self.knex.patch) as patch:
+            obj.save()
+        return [call.kwargs["json"] for call in patch.call_args_list]
+
+    def test_fetched_objects_are_clean(self):
+        """Test that fetched objects have no dirty fields and saving sends nothing."""
+        self.assertEqual(self.sample.dirty_fields(), [])
+        self.assertEqual(self.saved_payloads(self.sample), [])
+
+    def test_nested_metadata_change(self):
+        """Test that changing a key inside metadata is saved."""
+        self.sample.metadata["depth"] = 2
+        self.assertEqual(self.sample.dirty_fields(), ["metadata"])
+        payloads = self.saved_payloads(self.sample)
+        self.assertEqual(payloads, [{"metadata": {"site": "a", "depth": 2}}])
+        self.assertEqual(self.sample.dirty_fields(), [])
+        fetched = self.proj.sample("sample").get()
+        self.assertEqual(fetched.metadata["depth"], 2)
+
+    def test_only_changed_fields(self):
+        """Test that the PATCH holds only the changed field of a file."""
+        self.result_file.stored_data["uri"] = "s3://bucket/other.fq"
+        payloads = self.saved_payloads(self.result_file)
+        self.assertEqual(payloads, [{"stored_data": {"uri": "s3://bucket/other.fq"}}])
+
+    def test_set_fields_are_dirty(self):
+        """Test that a set field is dirty and the unchanged fields are not sent."""
+        self.sample.description = "changed"
+        self.assertEqual(self.sample.dirty_fields(), ["description"])
+        self.assertEqual(self.saved_payloads(self.sample), [{"description": "changed"}])
+
+    def test_reparent(self):
+        """Test that moving a file to another folder sends the new folder and evicts both listings."""
+        folder, other = self.result_file.parent, self.sample.result_folder("other").idem()
+        self.assertEqual(list(other.get_result_files()), [])
+        self.result_file.parent = other
+        self.assertEqual(self.result_file.dirty_fields(), [])
+        self.assertEqual(self.saved_payloads(self.result_file), [{"analysis_result": other.uuid}])
+        self.assertEqual([f.uuid for f in other.get_result_files()], [self.result_file.uuid])
+        self.assertEqual(list(folder.get_result_files()), [])
+        self.assertFalse(self.result_file.parent_changed())
+
+    def test_snapshot_holds_no_copies(self):
+        """Test that fetched objects keep digests of their containers rather than copies."""
+        self.assertNotIn({"site": "a", "depth": 1}, [val for _, val in self.sample._clean_state])
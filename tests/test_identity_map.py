@@ -0,0 +1,61 @@
+"""Test suite for the per knex identity map."""
+import gc
+import pickle
+
+from geoseeq import Organization
+from geoseeq.id_constructors import sample_from_uuid
+from geoseeq.identity_map import IdentityMap
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestIdentityMap(StandInTestCase):
+    """Test that each server object is materialized once per knex."""
+
+    def setUp(self):
+        super().setUp()
+        proj = Organization(self.knex, "org").idem().project("proj").idem()
+        self.sample_uuids = [proj.sample(f"sample {i}").idem().uuid for i in range(3)]
+        self.knex.identity_map.clear()
+
+    def test_parents_are_shared(self):
+        """Test that samples built from blobs share one project and organization."""
+        samples = [sample_from_uuid(self.knex, uuid) for uuid in self.sample_uuids]
+        self.assertIs(samples[0].lib, samples[1].lib)
+        self.assertIs(samples[0].lib.org, samples[2].lib.org)
+        self.assertIs(sample_from_uuid(self.knex, self.sample_uuids[0]), samples[0])
+
+    def test_fetched_by_name_is_reused(self):
+        """Test that an object fetched by name is the one parents resolve to."""
+        org = Organization(self.knex, "org").get()
+        sample = sample_from_uuid(self.knex, self.sample_uuids[0])
+        self.assertIs(sample.lib.org, org)
+
+    def test_parent_idem_is_a_no_op(self):
+        """Test that idem on a shared, fetched parent sends no requests."""
+        samples = [sample_from_uuid(self.knex, uuid) for uuid in self.sample_uuids]
+        self.server.reset_requests()
+        for sample in samples:
+            sample.lib.idem()
+        self.assertEqual(self.server.requests, [])
+
+    def test_deleted_objects_are_forgotten(self):
+        """Test that deleting an object removes it from the map."""
+        sample = sample_from_uuid(self.knex, self.sample_uuids[0])
+        sample.delete()
+        self.assertIsNone(self.knex.identity_map.get(type(sample), self.sample_uuids[0]))
+
+    def test_weak_references(self):
+        """Test that the map does not keep objects alive."""
+        sample_from_uuid(self.knex, self.sample_uuids[0])
+        gc.collect()
+        self.assertEqual(len(self.knex.identity_map), 0)
+
+    def test_pickle_starts_empty(self):
+        """Test that copies of the map sent to other processes are empty."""
+        sample = sample_from_uuid(self.knex, self.sample_uuids[0])
+        copied = pickle.loads(pickle.dumps(self.knex.identity_map))
+        self.assertIsInstance(copied, IdentityMap)
+        self.assertEqual(len(copied), 0)
+        self.assertGreater(len(self.knex.identity_map), 0)
+        del sample
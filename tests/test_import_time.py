@@ -0,0 +1,46 @@
+"""Test suite guarding the import time of the library and CLI."""
+import json
+import subprocess
+import sys
+from unittest import TestCase
+
+# Modules that are slow to import and only needed by a few functions
+HEAVY_MODULES = ["pandas", "numpy", "tqdm", "Bio", "multiprocessing.pool"]
+
+CLI_VERSION = """
+from geoseeq.cli import main
+try:
+    main(["version"])
+except SystemExit:
+    pass
+"""
+
+CHECK_MODULES = """
+import json, sys
+{code}
+print(json.dumps([name for name in {modules!r} if name in sys.modules]))
+"""
+
+
+def modules_loaded(code, modules=HEAVY_MODULES):
+    """Run `code` in a fresh interpreter and return which of `modules` it imported."""
+    script = CHECK_MODULES.format(code=code, modules=modules)
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestImportTime(TestCase):
+    """Test that heavy dependencies are only imported when they are used."""
+
+    def test_import_geoseeq(self):
+        """Test that importing the library does not import heavy dependencies."""
+        self.assertEqual(modules_loaded("import geoseeq"), [])
+
+    def test_cli_version(self):
+        """Test that a trivial CLI command does not import heavy dependencies."""
+        self.assertEqual(modules_loaded(CLI_VERSION), [])
+
+    def test_cli_lazy_subcommands(self):
+        """Test that CLI subcommand modules are only imported when their command runs."""
+        subcommand_modules = ["geoseeq.cli.view", "geoseeq.cli.manage", "geoseeq.cli.upload.upload"]
+        self.assertEqual(modules_loaded(CLI_VERSION, subcommand_modules), [])
@@ -0,0 +1,220 @@
+"""Test suite for the Knex request layer that does not need a server."""
+import gzip
+import json
+import logging
+import pickle
+from unittest import TestCase
+
+from requests.models import Response
+
+from geoseeq import Knex, GeoseeqNotFoundError
+from geoseeq.knex import GeoseeqOtherError
+from geoseeq.hooks import (
+    HookBus,
+    ProgressTrackerHook,
+    ALL_EVENTS,
+    REQUEST_START,
+    REQUEST_FINISH,
+    FILE_STARTED,
+    PART_UPLOADED,
+    FILE_COMPLETED,
+)
+from geoseeq.metrics import KnexMetrics, endpoint_key, to_prometheus
+
+
+def make_response(status_code, content=b'{}'):
+    """Return a requests Response with the given status and body."""
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class RecordingSession:
+    """Stand in for a requests Session that records calls and returns canned responses."""
+
+    def __init__(self, *status_codes, content=b'{}'):
+        self.status_codes = list(status_codes) or [200]
+        self.content = content
+        self.calls = []
+
+    def request(self, method, url, data=None, headers=None):
+        self.calls.append((method, url, data, headers or {}))
+        status_code = self.status_codes.pop(0) if len(self.status_codes) > 1 else self.status_codes[0]
+        return make_response(status_code, self.content)
+
+
+class TestKnexCompression(TestCase):
+    """Test gzip compression of request bodies."""
+
+    def test_accept_encoding_advertised(self):
+        """Test that the session advertises compressed responses."""
+        knex = Knex("http://example.com")
+        self.assertIn("gzip", knex.sess.headers["Accept-Encoding"])
+
+    def test_small_body_not_compressed(self):
+        """Test that bodies below the threshold are sent as plain JSON."""
+        knex = Knex("http://example.com", compress_threshold=1024)
+        body, headers = knex._encode_json_body({"a": 1})
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(json.loads(body), {"a": 1})
+
+    def test_large_body_compressed(self):
+        """Test that bodies above the threshold are gzipped."""
+        knex = Knex("http://example.com", compress_threshold=1024)
+        data = {"sample_uuids": [f"uuid-{i}" for i in range(1000)]}
+        body, headers = knex._encode_json_body(data)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertLess(len(body), len(json.dumps(data)))
+        self.assertEqual(json.loads(gzip.decompress(body)), data)
+
+    def test_compression_disabled(self):
+        """Test that compression can be turned off."""
+        knex = Knex("http://example.com", compress_threshold=None)
+        _, headers = knex._encode_json_body({"names": ["x" * 100] * 1000})
+        self.assertNotIn("Content-Encoding", headers)
+
+    def test_rejected_compressed_body_is_resent(self):
+        """Test that a compressed body rejected by the server is resent uncompressed."""
+        knex = Knex("http://example.com", compress_threshold=10)
+        knex.sess = RecordingSession(415, 200)
+        knex.post("bulk_samples", json={"samples": ["a long enough body"]})
+        self.assertEqual(len(knex.sess.calls), 2)
+        self.assertEqual(knex.sess.calls[0][3]["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Encoding", knex.sess.calls[1][3])
+        self.assertIsNone(knex.compress_threshold)
+
+    def test_encoding_error_is_resent(self):
+        """Test that a 400 about the content encoding is resent uncompressed."""
+        knex = Knex("http://example.com", compress_threshold=10)
+        knex.sess = RecordingSession(400, 200, content=b'{"detail": "Unsupported Content-Encoding: gzip"}')
+        knex.post("bulk_samples", json={"samples": ["a long enough body"]})
+        self.assertEqual(len(knex.sess.calls), 2)
+
+    def test_validation_error_is_not_resent(self):
+        """Test that other 400s are raised without a resend and compression stays on."""
+        knex = Knex("http://example.com", compress_threshold=10)
+        knex.sess = RecordingSession(400, content=b'{"name": ["This field is required."]}')
+        with self.assertRaises(GeoseeqOtherError):
+            knex.post("bulk_samples", json={"samples": ["a long enough body"]})
+        self.assertEqual(len(knex.sess.calls), 1)
+        self.assertEqual(knex.compress_threshold, 10)
+
+
+class TestKnexMetrics(TestCase):
+    """Test per-endpoint request metrics."""
+
+    def test_endpoint_key(self):
+        """Test that endpoint keys do not include ids or names."""
+        uuid = "2b721a88-7387-4085-86df-4995d263b3f9"
+        self.assertEqual(endpoint_key("get", f"samples/{uuid}?format=json"), "GET samples/{uuid}")
+        self.assertEqual(
+            endpoint_key("get", "http://example.com/api/nested/My Org/sample_groups/My Project"),
+            "GET nested/{name}/sample_groups/{name}",
+        )
+
+    def test_requests_are_counted(self):
+        """Test that requests are recorded in the knex metrics snapshot."""
+        knex = Knex("http://example.com")
+        knex.sess = RecordingSession(200, 404)
+        knex.get("samples/2b721a88-7387-4085-86df-4995d263b3f9")
+        with self.assertRaises(GeoseeqNotFoundError):
+            knex.get("samples/746424e7-2408-407e-a68d-786c7f5c5da6")
+        stats = knex.metrics()["endpoints"]["GET samples/{uuid}"]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["status_codes"], {"200": 1, "404": 1})
+        self.assertEqual(stats["latency"]["count"], 2)
+
+    def test_prometheus_format(self):
+        """Test that a snapshot can be rendered in the Prometheus text format."""
+        metrics = KnexMetrics()
+        metrics.record_request("GET samples/{uuid}", 200, 0.02, bytes_in=100)
+        metrics.record_part("upload", 1024, 0.5)
+        text = to_prometheus(metrics.snapshot())
+        self.assertIn('geoseeq_requests_total{endpoint="GET samples/{uuid}",status="200"} 1', text)
+        self.assertIn('geoseeq_transfer_part_duration_seconds_count{direction="upload"} 1', text)
+
+    def test_knex_can_be_pickled(self):
+        """Test that a knex can still be sent to worker processes."""
+        knex = Knex("http://example.com")
+        copied = pickle.loads(pickle.dumps(knex))
+        self.assertEqual(copied.metrics(), {"endpoints": {}, "transfers": {}})
+
+
+class TestHookBus(TestCase):
+    """Test the event hook bus."""
+
+    def test_emit_without_subscribers(self):
+        """Test that emitting an event with no subscribers does nothing."""
+        bus = HookBus()
+        self.assertFalse(bus.has_subscribers(REQUEST_START))
+        bus.emit(REQUEST_START, url="samples")
+
+    def test_subscribe_and_unsubscribe(self):
+        """Test that subscribers receive events until they unsubscribe."""
+        bus, seen = HookBus(), []
+        callback = bus.subscribe(ALL_EVENTS, lambda event, **payload: seen.append(event))
+        bus.emit(REQUEST_START, url="samples")
+        bus.emit(FILE_COMPLETED, filepath="a.txt")
+        bus.unsubscribe(ALL_EVENTS, callback)
+        bus.emit(REQUEST_START, url="samples")
+        self.assertEqual(seen, [REQUEST_START, FILE_COMPLETED])
+
+    def test_knex_emits_request_events(self):
+        """Test that knex emits start and finish events for requests."""
+        knex = Knex("http://example.com")
+        knex.sess = RecordingSession(200)
+        seen = []
+        knex.hooks.subscribe(REQUEST_FINISH, lambda event, **payload: seen.append(payload))
+        knex.get("organizations")
+        self.assertEqual(seen[0]["endpoint"], "GET organizations")
+        self.assertEqual(seen[0]["status_code"], 200)
+
+    def test_progress_tracker_hook(self):
+        """Test that progress trackers only see events for their own file."""
+
+        class Tracker:
+            total, done = 0, 0
+
+            def set_num_chunks(self, n):
+                self.total = n
+
+            def update(self, n):
+                self.done += n
+
+        bus, tracker = HookBus(), Tracker()
+        ProgressTrackerHook(tracker, "a.txt").attach(bus)
+        bus.emit(FILE_STARTED, direction="upload", filepath="a.txt", file_size=10)
+        bus.emit(PART_UPLOADED, filepath="a.txt", part_number=1, n_bytes=4, seconds=0.1)
+        bus.emit(PART_UPLOADED, filepath="b.txt", part_number=1, n_bytes=4, seconds=0.1)
+        self.assertEqual((tracker.total, tracker.done), (10, 4))
+
+
+class TestKnexLogging(TestCase):
+    """Test that debug logging costs nothing when it is disabled."""
+
+    def test_body_not_rendered_without_debug(self):
+        """Test that request bodies are not rendered unless debug logging is on."""
+        knex = Knex("http://example.com")
+        knex.sess = RecordingSession(200)
+        rendered = []
+        knex._render_request = lambda url, json=None: rendered.append(url)
+        logger = logging.getLogger("geoseeq_api")
+        original_level = logger.level
+        try:
+            logger.setLevel(logging.WARNING)
+            knex.post("bulk_samples", json={"samples": []})
+            self.assertEqual(rendered, [])
+            logger.setLevel(logging.DEBUG)
+            knex.post("bulk_samples", json={"samples": []})
+            self.assertEqual(rendered, ["bulk_samples"])
+        finally:
+            logger.setLevel(original_level)
+
+    def test_rendered_body_is_truncated(self):
+        """Test that large bodies are truncated and tokens are not logged."""
+        knex = Knex("http://example.com")
+        knex.add_api_token("secret-token")
+        info = knex._render_request("bulk_samples", {"names": ["x" * 100] * 1000})
+        self.assertLess(len(info["json"]), 3000)
+        self.assertNotIn("secret-token", str(info))
@@ -0,0 +1,139 @@
+"""Test suite for the in memory blob cache tier."""
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from geoseeq.cache_backends import default_cache
+from geoseeq.memory_cache import MemoryCache, TieredCache
+from geoseeq.sqlite_cache import SqliteCache
+
+
+class TestMemoryCache(TestCase):
+    """Test the LRU memory cache."""
+
+    def test_lru_eviction_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = MemoryCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_eviction_by_bytes(self):
+        """Test that entries are evicted to stay under the byte budget."""
+        cache = MemoryCache(max_bytes=10)
+        cache.put("a", "x" * 6)
+        cache.put("b", "y" * 6)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 1)
+        cache.put("c", "z" * 11)  # too big to cache at all
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.get("b"), "y" * 6)
+
+    def test_ttl(self):
+        """Test that entries expire."""
+        cache = MemoryCache(ttl=0.01)
+        cache.put("a", "1")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_threads(self):
+        """Test that concurrent puts and gets keep the cache consistent."""
+        cache = MemoryCache(max_entries=50)
+
+        def work(i):
+            cache.put(str(i % 100), str(i))
+            cache.get(str((i + 1) % 100))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(5000)))
+        self.assertLessEqual(len(cache), 50)
+        self.assertEqual(cache._n_bytes, sum(len(text) for text, _ in cache._entries.values()))
+
+
+class TestTieredCache(TestCase):
+    """Test the memory tier in front of the persistent cache."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.persistent = SqliteCache(path=os.path.join(self.tmpdir.name, "blobs.sqlite3"))
+        self.cache = TieredCache(self.persistent, memory=MemoryCache())
+
+    def test_hits_do_not_read_persistent_cache(self):
+        """Test that blobs in memory are returned without touching the persistent cache."""
+        self.cache.cache_blob("org", {"name": "org"})
+        with mock.patch.object(self.persistent, "get_cached_blob") as persistent_get:
+            self.assertEqual(self.cache.get_cached_blob("org"), {"name": "org"})
+        persistent_get.assert_not_called()
+
+    def test_persistent_hits_are_promoted(self):
+        """Test that blobs found in the persistent cache are kept in memory."""
+        self.persistent.cache_blob("org", {"name": "org"})
+        self.assertEqual(self.cache.get_cached_blob("org"), {"name": "org"})
+        self.assertEqual(len(self.cache.memory), 1)
+
+    def test_clear_blob(self):
+        """Test that clearing a blob removes it from both tiers."""
+        self.cache.cache_blob("org", {"name": "org"})
+        self.cache.clear_blob("org")
+        self.assertIsNone(self.cache.get_cached_blob("org"))
+        self.assertIsNone(self.persistent.get_cached_blob("org"))
+
+    def test_hits_are_copies(self):
+        """Test that mutating a returned blob does not change the cached blob."""
+        self.cache.cache_blob("sample", {"metadata": {"a": 1}})
+        self.cache.get_cached_blob("sample")["metadata"]["a"] = 2
+        self.assertEqual(self.cache.get_cached_blob("sample"), {"metadata": {"a": 1}})
+
+    def test_stores_do_not_share_entries(self):
+        """Test that caches over different stores or endpoints do not read each other's blobs."""
+        other_store = TieredCache(
+            SqliteCache(path=os.path.join(self.tmpdir.name, "other.sqlite3")), memory=self.cache.memory,
+        )
+        other_endpoint = TieredCache(self.persistent, memory=self.cache.memory, namespace="https://other/api")
+        self.cache.cache_blob("org", {"name": "org"})
+        self.assertIsNone(other_store.get_cached_blob("org"))
+        self.assertNotIn(other_endpoint._memory_key("org"), self.cache.memory._entries)
+
+    def test_ttl_capped_by_persistent_timeout(self):
+        """Test that blobs are not kept in memory longer than in the persistent cache."""
+        self.persistent.timeout = 0.01
+        self.cache = TieredCache(self.persistent, memory=MemoryCache())
+        self.cache.cache_blob("org", {"name": "org"})
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.memory.get(self.cache._memory_key("org")))
+
+    def test_listing_generations_skip_memory(self):
+        """Test that listing generations are always read from the persistent cache."""
+        self.cache.cache_blob("listing-generation/samples", {"generation": "a"})
+        self.assertEqual(len(self.cache.memory), 0)
+        self.persistent.clear_blob("listing-generation/samples")
+        self.assertIsNone(self.cache.get_cached_blob("listing-generation/samples"))
+
+    def test_pickle(self):
+        """Test that copies in other processes use their own process wide memory cache."""
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertIsNotNone(copy.memory)
+
+
+class TestDefaultCache(TestCase):
+    """Test the process wide default cache."""
+
+    def test_shared(self):
+        """Test that the default cache is shared and follows USE_GEOSEEQ_CACHE."""
+        with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"}):
+            self.assertIs(default_cache(), default_cache())
+            self.assertFalse(default_cache().no_cache)
+        with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}):
+            self.assertTrue(default_cache().no_cache)
@@ -0,0 +1,92 @@
+"""Test suite for caches shared by many processes."""
+import json
+import multiprocessing
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from geoseeq import file_system_cache
+from geoseeq.file_system_cache import FileSystemCache, write_atomic
+from geoseeq.sqlite_cache import SqliteCache
+
+N_WORKERS = 8
+N_KEYS = 5
+N_ROUNDS = 40
+
+
+def churn_cache(args):
+    """Write, read and clear a few shared keys, as upload workers do."""
+    cache, worker = args
+    seen = 0
+    for i in range(N_ROUNDS):
+        key = f"samples/{i % N_KEYS}"
+        cache.cache_blob(key, {"name": key, "worker": worker, "payload": "x" * 10000})
+        blob = cache.get_cached_blob(key)
+        if blob is not None:
+            assert blob["name"] == key
+            seen += 1
+        if i % 7 == 0:
+            cache.clear_blob(key)
+    cache.cache_blob(f"workers/{worker}", {"worker": worker})
+    return seen
+
+
+class MultiProcessCacheTestCase:
+    """Tests shared by every cache backend."""
+
+    def make_cache(self):
+        raise NotImplementedError()
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_many_workers(self):
+        """Test that workers sharing a cache never read a partial blob."""
+        cache = self.make_cache()
+        with multiprocessing.get_context("fork").Pool(N_WORKERS) as pool:
+            results = pool.map(churn_cache, [(cache, worker) for worker in range(N_WORKERS)])
+        self.assertEqual(len(results), N_WORKERS)
+        for worker in range(N_WORKERS):  # written before the pool was terminated
+            self.assertEqual(cache.get_cached_blob(f"workers/{worker}"), {"worker": worker})
+
+
+class TestMultiProcessSqliteCache(MultiProcessCacheTestCase, TestCase):
+    """Test the SQLite cache with many processes."""
+
+    def make_cache(self):
+        return SqliteCache(path=os.path.join(self.tmpdir.name, "blobs.sqlite3"))
+
+
+class TestMultiProcessFileSystemCache(MultiProcessCacheTestCase, TestCase):
+    """Test the file system cache with many processes."""
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = mock.patch.object(file_system_cache, "CACHE_DIR", self.tmpdir.name)
+        cache_dir.start()
+        self.addCleanup(cache_dir.stop)
+
+    def make_cache(self):
+        return FileSystemCache()
+
+    def test_write_atomic(self):
+        """Test that atomic writes leave no temporary files behind."""
+        filepath = os.path.join(self.tmpdir.name, "blob.json")
+        write_atomic(filepath, json.dumps({"a": 1}))
+        write_atomic(filepath, json.dumps({"a": 2}))
+        self.assertEqual(os.listdir(self.tmpdir.name), ["blob.json"])
+        with open(filepath) as f:
+            self.assertEqual(json.load(f), {"a": 2})
+
+    def test_partial_blob_is_a_miss(self):
+        """Test that an unreadable blob is treated as a miss and removed."""
+        cache = self.make_cache()
+        blob_filepath, _ = cache.get_cached_blob_filepath("samples/1")
+        with open(blob_filepath, "w") as f:
+            f.write('{"name": ')
+        self.assertIsNone(cache.get_cached_blob("samples/1"))
+        self.assertFalse(os.path.exists(blob_filepath))
@@ -0,0 +1,71 @@
+"""Test suite for fetching nested objects in one request."""
+from geoseeq import Knex, Organization
+from geoseeq.knex import GeoseeqNotFoundError
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestNestedGet(StandInTestCase):
+    """Test that objects fetched by name fill their parents from their blob."""
+
+    def setUp(self):
+        super().setUp()
+        sample = Organization(self.knex, "org").idem().project("proj").idem().sample("sample").idem()
+        sample.result_folder("module").idem().result_file("reads").idem()
+
+    def fresh_file(self):
+        knex = Knex(self.server.url)
+        knex.add_api_token("stand-in-token")
+        org = Organization(knex, "org")
+        return org.project("proj").sample("sample").result_folder("module").result_file("reads")
+
+    def test_one_request(self):
+        """Test that a file and its parents are fetched with one GET."""
+        result_file = self.fresh_file()
+        self.server.reset_requests()
+        result_file.get()
+        self.assertEqual([method for method, _ in self.server.requests], ["GET"])
+        folder = result_file.parent
+        self.assertTrue(folder._already_fetched)
+        self.assertFalse(folder.sample.lib.org._modified)
+        self.assertEqual(folder.sample.lib.org.name, "org")
+        self.assertIsNotNone(folder.sample.lib.uuid)
+
+    def test_fetched_parents_are_shared(self):
+        """Test that filled parents are the knex's instances."""
+        result_file = self.fresh_file()
+        result_file.get()
+        sample = result_file.parent.sample
+        self.assertIs(result_file.knex.identity_map.get(type(sample), sample.uuid), sample)
+
+    def test_idem_creates_missing_parents(self):
+        """Test that idem still creates parents that do not exist."""
+        org = Organization(self.knex, "org")
+        result_file = org.project("proj").sample("new sample").result_folder("new module").result_file("reads")
+        result_file.idem()
+        self.assertIsNotNone(result_file.uuid)
+        self.assertIsNotNone(result_file.parent.sample.uuid)
+
+    def request_methods(self):
+        return [method for method, _ in self.server.requests]
+
+    def test_idem_new_sample(self):
+        """Test that idem of a new sample under a fetched project sends one GET and one POST."""
+        proj = Organization(self.knex, "org").project("proj").get()
+        self.server.reset_requests()
+        proj.sample("new sample").idem()
+        self.assertEqual(self.request_methods(), ["GET", "POST"])
+
+    def test_idem_new_folder(self):
+        """Test that idem of a new folder under an unfetched sample sends two GETs and one POST."""
+        sample = Organization(self.knex, "org").project("proj").sample("sample")
+        self.server.reset_requests()
+        sample.result_folder("new module").idem()
+        self.assertEqual(self.request_methods(), ["GET", "GET", "POST"])
+        self.assertTrue(sample._already_fetched)
+
+    def test_get_missing_parent(self):
+        """Test that getting an object with a missing parent still raises a 404."""
+        sample = Organization(self.knex, "org").project("other proj").sample("sample")
+        with self.assertRaises(GeoseeqNotFoundError):
+            sample.get()
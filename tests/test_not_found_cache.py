@@ -0,0 +1,93 @@
+"""Test suite for caching 404s during ID resolution."""
+import pickle
+import time
+from unittest import TestCase
+
+from geoseeq import Organization, GeoseeqNotFoundError
+from geoseeq.id_constructors import result_folder_from_uuid
+from geoseeq.not_found_cache import NotFoundCache
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestNotFoundCache(TestCase):
+    """Test the record of URLs that were not found."""
+
+    def test_ttl(self):
+        """Test that URLs are forgotten after the TTL."""
+        cache = NotFoundCache(ttl=0.01)
+        cache.add("samples/1")
+        self.assertIn("samples/1", cache)
+        time.sleep(0.02)
+        self.assertNotIn("samples/1", cache)
+
+    def test_disabled(self):
+        """Test that a TTL of zero disables the cache."""
+        cache = NotFoundCache(ttl=0)
+        cache.add("samples/1")
+        self.assertNotIn("samples/1", cache)
+
+    def test_order(self):
+        """Test that the last guess to resolve an ID is tried first."""
+        cache = NotFoundCache()
+        self.assertEqual(cache.order("folder", ["sample", "project"]), ["sample", "project"])
+        cache.record("folder", "project")
+        self.assertEqual(cache.order("folder", ["sample", "project"]), ["project", "sample"])
+
+    def test_pickle(self):
+        """Test that the cache can be sent to worker processes."""
+        cache = NotFoundCache()
+        cache.add("samples/1")
+        cache.record("folder", "project")
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertIn("samples/1", copy)
+        self.assertEqual(copy.hints, {"folder": "project"})
+
+
+class TestNotFoundResolution(StandInTestCase):
+    """Test that resolving IDs stops sending requests that are known to fail."""
+
+    def setUp(self):
+        super().setUp()
+        self.proj = Organization(self.knex, "org").idem().project("proj").idem()
+
+    def count_requests(self, prefix):
+        return len([r for r in self.server.requests if r[1].startswith(f"/api/{prefix}/")])
+
+    def test_batch_of_project_folders(self):
+        """Test that a batch of project folder UUIDs pays for the wrong guess once."""
+        uuids = [self.proj.result_folder(f"module {i}").idem().uuid for i in range(5)]
+        self.server.reset_requests()
+        folders = [result_folder_from_uuid(self.knex, uuid) for uuid in uuids]
+        self.assertEqual([folder.uuid for folder in folders], uuids)
+        self.assertEqual(self.count_requests("sample_ars"), 1)
+        self.assertEqual(self.count_requests("sample_group_ars"), 5)
+
+    def test_repeated_lookup(self):
+        """Test that a guessed URL that was not found is not requested again."""
+        for _ in range(3):
+            with self.assertRaises(GeoseeqNotFoundError):
+                with self.knex.remembering_not_found():
+                    self.knex.get("samples/missing")
+        self.assertEqual(self.count_requests("samples"), 1)
+
+    def test_polling_reaches_server(self):
+        """Test that GETs outside of ID resolution are not answered from the record."""
+        for _ in range(3):
+            with self.assertRaises(GeoseeqNotFoundError):
+                self.knex.get("samples/missing")
+        self.assertEqual(self.count_requests("samples"), 3)
+        self.assertNotIn("samples/missing", self.knex.not_found)
+
+    def test_knex_pickle(self):
+        """Test that a knex with per thread state can be sent to worker processes."""
+        copy = pickle.loads(pickle.dumps(self.knex))
+        with copy.remembering_not_found():
+            self.assertTrue(copy._local.remember_not_found)
+
+    def test_writes_clear_not_found(self):
+        """Test that an object created after a 404 can be fetched."""
+        sample = self.proj.sample("later")
+        self.assertFalse(sample.exists())
+        sample.create()
+        self.assertTrue(self.proj.sample("later").exists())
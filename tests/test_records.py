@@ -0,0 +1,57 @@
+"""Test suite for records and columnar pages from listings."""
+from geoseeq import Organization
+from geoseeq.sample import Sample
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestRecords(StandInTestCase):
+    """Test listing samples, folders and files as records."""
+
+    page_size = 2
+
+    def setUp(self):
+        super().setUp()
+        self.proj = Organization(self.knex, "org").idem().project("proj").idem()
+        for i in range(3):
+            self.proj.sample(f"sample {i}").idem()
+        self.folder = self.proj.sample("sample 0").get().result_folder("module").idem()
+        self.folder.result_file("reads").idem()
+
+    def test_sample_records(self):
+        """Test that sample records carry the remote fields and their project."""
+        records = list(self.proj.get_samples(records=True))
+        self.assertEqual(sorted(record.name for record in records), ["sample 0", "sample 1", "sample 2"])
+        self.assertIs(records[0].parent, self.proj)
+        self.assertIsInstance(records[0], tuple)
+        with self.assertRaises(AttributeError):
+            records[0].name = "renamed"
+
+    def test_to_object(self):
+        """Test that a record converts to a fetched object without a request."""
+        record = next(self.proj.get_samples(records=True))
+        self.server.reset_requests()
+        sample = record.to_object()
+        self.assertIsInstance(sample, Sample)
+        self.assertEqual((sample.uuid, sample.name), (record.uuid, record.name))
+        self.assertTrue(sample._already_fetched)
+        self.assertFalse(sample._modified)
+        self.assertEqual(self.server.requests, [])
+
+    def test_file_records(self):
+        """Test that folders and files list as records."""
+        sample = self.proj.sample("sample 0").get()
+        folder_record, = sample.get_result_folders(records=True)
+        self.assertEqual(folder_record.module_name, "module")
+        file_record, = folder_record.to_object().get_result_files(records=True)
+        self.assertEqual(file_record.name, "reads")
+        self.assertEqual(file_record.to_object().parent.uuid, self.folder.uuid)
+
+    def test_column_pages(self):
+        """Test that each page is returned as columns."""
+        pages = list(self.proj.get_sample_columns(fields=("uuid", "name")))
+        self.assertEqual([len(page["name"]) for page in pages], [2, 1])
+        names = sorted(name for page in pages for name in page["name"])
+        self.assertEqual(names, ["sample 0", "sample 1", "sample 2"])
+        columns, = self.folder.get_result_file_columns(fields=("name",))
+        self.assertEqual(columns, {"name": ["reads"]})
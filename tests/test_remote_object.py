@@ -0,0 +1,46 @@
+"""Test suite for the compact representation of remote objects."""
+import os
+import pickle
+from copy import copy
+from unittest import TestCase, mock
+
+from geoseeq import Knex, Organization
+
+
+class TestCompactRemoteObjects(TestCase):
+    """Test samples, folders and files without a per instance __dict__."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.knex = Knex("http://localhost:1")
+        self.sample = Organization(self.knex, "org").project("proj").sample("sample")
+        self.folder = self.sample.result_folder("module")
+        self.result_file = self.folder.result_file("reads")
+
+    def test_no_instance_dict(self):
+        """Test that listed types store their attributes in slots."""
+        for obj in (self.sample, self.folder, self.result_file):
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj))
+
+    def test_shared_cache(self):
+        """Test that objects use their knex's cache rather than their own."""
+        self.assertIs(self.sample.cache, self.knex.cache)
+        self.assertIs(self.result_file.cache, self.knex.cache)
+
+    def test_setting_fields_marks_modified(self):
+        """Test that only remote fields and the parent mark an object modified."""
+        self.sample._modified = False
+        self.sample.url_options = {}
+        self.assertFalse(self.sample._modified)
+        self.sample.metadata = {"a": 1}
+        self.assertTrue(self.sample._modified)
+
+    def test_pickle_and_copy_keep_state(self):
+        """Test that restored copies are not marked modified."""
+        self.result_file._modified = False
+        for restored in (pickle.loads(pickle.dumps(self.result_file)), copy(self.result_file)):
+            self.assertEqual(restored.name, "reads")
+            self.assertEqual(restored.parent.name, "module")
+            self.assertFalse(restored._modified)
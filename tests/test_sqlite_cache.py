@@ -0,0 +1,190 @@
+"""Test suite for the SQLite blob cache."""
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from geoseeq import sqlite_cache
+from geoseeq.sqlite_cache import SqliteCache, SqliteBlobStore
+
+
+class TestSqliteCache(TestCase):
+    """Test that the SQLite cache behaves like the file system cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "cache", "blobs.sqlite3")
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def count_rows(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def test_hit_miss_and_clear(self):
+        """Test that cached blobs are returned until they are cleared."""
+        cache = SqliteCache(path=self.path)
+        self.assertIsNone(cache.get_cached_blob("samples/1"))
+        cache.cache_blob("samples/1", {"name": "one"})
+        self.assertEqual(cache.get_cached_blob("samples/1"), {"name": "one"})
+        cache.clear_blob("samples/1")
+        self.assertIsNone(cache.get_cached_blob("samples/1"))
+
+    def test_instances_share_pending_writes(self):
+        """Test that a blob written by one cache is visible to another before it is flushed."""
+        SqliteCache(path=self.path).cache_blob("samples/1", {"name": "one"})
+        self.assertEqual(SqliteCache(path=self.path).get_cached_blob("samples/1"), {"name": "one"})
+
+    def test_batched_writes(self):
+        """Test that writes are buffered and flushed in batches."""
+        cache = SqliteCache(path=self.path)
+        with mock.patch.object(sqlite_cache, "WRITE_BATCH_SIZE", 10), \
+                mock.patch.object(sqlite_cache, "WRITE_BATCH_SECONDS", 3600):
+            cache.store.clear_expired()  # creates the database
+            for i in range(9):
+                cache.cache_blob(f"samples/{i}", {"i": i})
+            self.assertEqual(self.count_rows(), 0)
+            cache.cache_blob("samples/9", {"i": 9})
+            self.assertEqual(self.count_rows(), 10)
+
+    def test_persisted_across_stores(self):
+        """Test that flushed blobs can be read by a new store, as in a new process."""
+        cache = SqliteCache(path=self.path)
+        cache.cache_blob("samples/1", {"name": "one"})
+        cache.flush()
+        store = SqliteBlobStore(self.path)
+        self.assertIsNotNone(store.get(sqlite_cache.hash_obj("samples/1"), time.time()))
+
+    def test_expired_blobs(self):
+        """Test that blobs older than the timeout are not returned."""
+        cache = SqliteCache(timeout=0, path=self.path)
+        cache.cache_blob("samples/1", {"name": "one"})
+        time.sleep(0.01)
+        self.assertIsNone(cache.get_cached_blob("samples/1"))
+
+    def test_disabled(self):
+        """Test that nothing is cached when USE_GEOSEEQ_CACHE is false."""
+        with mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"}):
+            cache = SqliteCache(path=self.path)
+            cache.cache_blob("samples/1", {"name": "one"})
+            self.assertIsNone(cache.get_cached_blob("samples/1"))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_threads(self):
+        """Test that many threads can read and write the cache at once."""
+        cache = SqliteCache(path=self.path)
+
+        def work(i):
+            cache.cache_blob(f"samples/{i}", {"i": i})
+            cache.flush()
+            return cache.get_cached_blob(f"samples/{i}")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(work, range(200)))
+        self.assertEqual(results, [{"i": i} for i in range(200)])
+
+    def test_pickle(self):
+        """Test that caches can be sent to other processes."""
+        cache = SqliteCache(path=self.path)
+        cache.cache_blob("samples/1", {"name": "one"})
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(copy.get_cached_blob("samples/1"), {"name": "one"})
+
+
+class TestSqliteCacheBudget(TestCase):
+    """Test eviction, stats and compaction of the SQLite cache."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "blobs.sqlite3")
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_evicts_least_recently_used(self):
+        """Test that eviction removes the blobs that were read least recently."""
+        store = SqliteBlobStore(self.path, max_entries=3)
+        for i in range(4):
+            store.put(str(i), "{}", now=100 + i, expires_at=10 ** 10)
+        store.flush()
+        store.get("0", now=200)  # now the most recently used
+        store.flush()
+        self.assertEqual(store.evict(), 2)  # evicted down to 90% of the budget
+        self.assertIsNotNone(store.get("0", now=201))
+        self.assertIsNone(store.get("1", now=201))
+        self.assertIsNone(store.get("2", now=201))
+        self.assertIsNotNone(store.get("3", now=201))
+
+    def test_evicts_by_bytes(self):
+        """Test that eviction keeps the cache under its byte budget."""
+        store = SqliteBlobStore(self.path, max_bytes=1000)
+        for i in range(10):
+            store.put(str(i), "x" * 200, now=100 + i, expires_at=10 ** 10)
+        store.flush()
+        store.evict()
+        self.assertLessEqual(store.stats()["size_bytes"], 900)
+
+    def test_evicts_periodically(self):
+        """Test that flushes evict once enough blobs have been written."""
+        store = SqliteBlobStore(self.path, max_entries=10)
+        with mock.patch.object(sqlite_cache, "PRUNE_EVERY_WRITES", 20):
+            for i in range(20):
+                store.put(str(i), "{}", now=time.time(), expires_at=10 ** 10)
+            store.flush()
+        self.assertLessEqual(store.stats()["entries"], 10)
+
+    def test_stats(self):
+        """Test that stats report entries, size, hit ratio and ages."""
+        cache = SqliteCache(path=self.path)
+        cache.cache_blob("samples/1", {"name": "one"})
+        cache.get_cached_blob("samples/1")
+        cache.get_cached_blob("samples/1")
+        cache.get_cached_blob("samples/2")
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["size_bytes"], len('{"name": "one"}'))
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3)
+        self.assertGreaterEqual(stats["oldest_entry_age_sec"], 0)
+        self.assertGreater(stats["file_size_bytes"], 0)
+
+    def test_prune_and_clear(self):
+        """Test that pruning deletes expired blobs and clearing deletes every blob."""
+        cache = SqliteCache(path=self.path)
+        store = cache.store
+        store.put("old", "{}", now=1, expires_at=2)
+        store.put("new", "{}", now=time.time(), expires_at=10 ** 10)
+        self.assertEqual(cache.prune(), {"expired": 1, "evicted": 0})
+        self.assertEqual(cache.stats()["entries"], 1)
+        cache.clear()
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 0)
+        self.assertIsNone(stats["hit_ratio"])
+
+    def test_migrates_old_schema(self):
+        """Test that databases from earlier versions gain the new columns."""
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE blobs (key TEXT PRIMARY KEY, blob TEXT NOT NULL, "
+                         "cached_at REAL NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("INSERT INTO blobs VALUES ('a', '{\"a\": 1}', 5, 1e10)")
+        store = SqliteBlobStore(self.path)
+        self.assertEqual(store.get("a", now=10), '{"a": 1}')
+        self.assertEqual(store.stats()["size_bytes"], len('{"a": 1}'))
+
+
+class TestDefaultCacheDir(TestCase):
+    """Test where the cache is kept by default."""
+
+    def test_xdg_cache_home(self):
+        """Test that the cache is kept under XDG_CACHE_HOME unless GEOSEEQ_API_CACHE_DIR is set."""
+        from geoseeq.file_system_cache import default_cache_dir
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": "/xdg", "GEOSEEQ_API_CACHE_DIR": ""}):
+            self.assertEqual(default_cache_dir(), os.path.join("/xdg", "geoseeq"))
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": "/xdg", "GEOSEEQ_API_CACHE_DIR": "/api"}):
+            self.assertEqual(default_cache_dir(), "/api")
@@ -0,0 +1,149 @@
+"""Test suite for serving stale cached blobs while they are refreshed."""
+import os
+import pickle
+import threading
+import time
+from unittest import TestCase, mock
+
+from geoseeq import Knex, Organization
+from geoseeq.cache_backends import MemoryBlobCache, make_cache
+from geoseeq.stale_cache import StaleWhileRevalidateCache
+
+from .test_stand_in_server import StandInTestCase
+
+
+class Refreshable:
+    """Stands in for a RemoteObject that can refresh its cached blob."""
+
+    def __init__(self, name, cache):
+        self.name = name
+        self.cache = cache
+        self.refreshed = threading.Event()
+        self.release = threading.Event()
+        self.n_refreshes = 0
+
+    def pre_hash(self):
+        return self.name
+
+    def _cached_blob_refresher(self):
+        return self.refresh
+
+    def refresh(self):
+        self.n_refreshes += 1
+        self.release.wait(5)
+        self.cache.cache_blob(self, {"name": self.name, "version": 2})
+        self.refreshed.set()
+
+
+class TestStaleWhileRevalidateCache(TestCase):
+    """Test the stale while revalidate policy."""
+
+    def setUp(self):
+        self.cache = StaleWhileRevalidateCache(MemoryBlobCache(timeout=1000), fresh_time=10, max_stale=100)
+        self.obj = Refreshable("sample", self.cache)
+        self.cache.cache_blob(self.obj, {"name": "sample", "version": 1})
+
+    def at(self, seconds_later):
+        return mock.patch("geoseeq.stale_cache.time", return_value=self.cached_at() + seconds_later)
+
+    def cached_at(self):
+        return self.cache.inner.get_cached_blob(self.cache._cached_at_key(self.obj))["cached_at"]
+
+    def test_fresh(self):
+        """Test that fresh blobs are returned without a refresh."""
+        with self.at(5):
+            self.assertEqual(self.cache.get_cached_blob(self.obj)["version"], 1)
+        self.assertEqual(self.obj.n_refreshes, 0)
+
+    def test_stale(self):
+        """Test that stale blobs are returned at once and refreshed once."""
+        with self.at(50):
+            self.assertEqual(self.cache.get_cached_blob(self.obj)["version"], 1)
+            self.assertEqual(self.cache.get_cached_blob(self.obj)["version"], 1)
+        self.obj.release.set()
+        self.cache.wait_for_refreshes()
+        self.assertEqual(self.obj.n_refreshes, 1)
+        self.assertEqual(self.cache.get_cached_blob(self.obj)["version"], 2)
+
+    def test_too_stale(self):
+        """Test that blobs past the maximum staleness are misses."""
+        with self.at(200):
+            self.assertIsNone(self.cache.get_cached_blob(self.obj))
+        self.assertEqual(self.obj.n_refreshes, 0)
+
+    def test_not_refreshable(self):
+        """Test that stale blobs cached under plain keys are misses."""
+        self.cache.cache_blob("samples?page=1", {"results": []})
+        with mock.patch("geoseeq.stale_cache.time", return_value=self.cached_at() + 50):
+            self.assertIsNone(self.cache.get_cached_blob("samples?page=1"))
+
+    def test_plain_clear(self):
+        """Test that clearing a blob through a cache without the policy clears it for both."""
+        self.cache.inner.clear_blob(self.obj)
+        self.assertIsNone(self.cache.get_cached_blob(self.obj))
+
+    def test_plain_entries_are_served(self):
+        """Test that blobs cached without the policy are served and refreshed."""
+        other = Refreshable("other", self.cache)
+        self.cache.inner.cache_blob(other, {"name": "other", "version": 1})
+        self.assertEqual(self.cache.get_cached_blob(other)["version"], 1)
+        other.release.set()
+        self.cache.wait_for_refreshes()
+        self.assertEqual(other.n_refreshes, 1)
+        self.assertEqual(self.cache.inner.get_cached_blob(other)["version"], 2)
+
+    def test_pickle(self):
+        """Test that the cache can be sent to worker processes."""
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.max_stale, 100)
+
+
+class TestStaleRemoteObjects(StandInTestCase):
+    """Test that remote objects are served stale and refreshed in the background."""
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        Organization(self.knex, "org").create()
+        self.stale_knex = Knex(self.server.url, cache=make_cache("memory", max_stale=100))
+        self.stale_knex.add_api_token("stand-in-token")
+        self.addCleanup(self.stale_knex.close)
+
+    def count_org_lookups(self):
+        return len([r for r in self.server.requests if r[1] == "/api/nested/org"])
+
+    def test_refresh(self):
+        """Test that a stale organization is returned and refreshed."""
+        Organization(self.stale_knex, "org").get()
+        self.server.reset_requests()
+        cache = self.stale_knex.cache
+        later = cache.fresh_time + 10
+        with mock.patch("geoseeq.stale_cache.time", side_effect=lambda: time.time() + later):
+            org = Organization(self.stale_knex, "org").get()
+        self.assertEqual(org.name, "org")
+        cache.wait_for_refreshes()
+        self.assertEqual(self.count_org_lookups(), 1)
+        Organization(self.stale_knex, "org").get()  # fresh again
+        self.assertEqual(self.count_org_lookups(), 1)
+
+    def test_refresh_after_stale_load(self):
+        """Test that a refresh that starts after the stale blob was loaded caches the changed blob."""
+        proj = Organization(self.knex, "org").project("proj").create()
+        proj.sample("sample").create()
+        stale_proj = Organization(self.stale_knex, "org").project("proj").get()
+        stale_proj.sample("sample").get()
+        changed = proj.sample("sample").get()
+        changed.metadata = {"site": "a"}
+        changed.save()
+        cache = self.stale_knex.cache
+        refreshes = []
+        later = cache.fresh_time + 10
+        with mock.patch.object(cache, "_start_refresh", side_effect=lambda key, refresher: refreshes.append(refresher())):
+            with mock.patch("geoseeq.stale_cache.time", side_effect=lambda: time.time() + later):
+                sample = stale_proj.sample("sample").get()
+        self.assertEqual(sample.metadata, {})
+        self.assertEqual(len(refreshes), 1)
+        refreshes[0]()  # runs after the caller loaded the stale blob
+        self.assertEqual(stale_proj.sample("sample").get().metadata, {"site": "a"})
@@ -0,0 +1,141 @@
+"""Test suite for the stand in API server and record/replay transports."""
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+from geoseeq import Knex, Organization, GeoseeqNotFoundError, GeoseeqOtherError
+from geoseeq.testing import StandInServer
+from geoseeq.transport import RecordingTransport, ReplayTransport, CassetteMismatchError
+
+
+class StandInTestCase(TestCase):
+    """Start a stand in server and an authenticated knex for each test."""
+
+    page_size = 100
+
+    def setUp(self):
+        # the blob cache is keyed by names, not servers, so it must not outlive a test
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "false"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.server = StandInServer(page_size=self.page_size).start()
+        self.addCleanup(self.server.stop)
+        self.knex = Knex(self.server.url)
+        self.knex.add_api_token("stand-in-token")
+        self.addCleanup(self.knex.close)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+
+class TestStandInServer(StandInTestCase):
+    """Test that the client works against the stand in server."""
+
+    page_size = 3
+
+    def test_create_hierarchy(self):
+        """Test that we can create and reload an org, project, sample, folder and file."""
+        org = Organization(self.knex, "stand in org").idem()
+        proj = org.project("stand in project").idem()
+        sample = proj.sample("sample 1").idem()
+        folder = sample.result_folder("module").idem()
+        result_file = folder.result_file("field").idem()
+        self.assertTrue(result_file.uuid)
+
+        reloaded = Organization(self.knex, "stand in org").project("stand in project").get()
+        self.assertEqual(reloaded.uuid, proj.uuid)
+        self.assertEqual(sample.lib.uuid, proj.uuid)
+
+    def test_not_found_and_duplicates(self):
+        """Test that missing objects raise 404s and duplicate creates raise 400s."""
+        with self.assertRaises(GeoseeqNotFoundError):
+            Organization(self.knex, "missing org").get()
+        Organization(self.knex, "dup org").create()
+        with self.assertRaises(GeoseeqOtherError):
+            Organization(self.knex, "dup org").create()
+
+    def test_paginated_samples(self):
+        """Test that listing samples follows pagination across pages."""
+        proj = Organization(self.knex, "org").idem().project("proj").idem()
+        names = {f"sample {i}" for i in range(8)}
+        for name in names:
+            proj.sample(name).create()
+        self.server.reset_requests()
+        self.assertEqual({sample.name for sample in proj.get_samples()}, names)
+        sample_list_requests = [r for r in self.server.requests if r[1].startswith(f"/api/sample_groups/{proj.uuid}/samples")]
+        self.assertEqual(len(sample_list_requests), 3)
+
+    def test_multipart_upload_and_download(self):
+        """Test that a multipart upload can be downloaded intact."""
+        content = os.urandom(3 * 1024 * 1024 + 17)
+        path = self.write_file("upload.bin", content)
+        proj = Organization(self.knex, "org").idem().project("proj").idem()
+        folder = proj.sample("s1").idem().result_folder("module").idem()
+        folder.result_file("reads").idem().multipart_upload_file(
+            path, len(content), chunk_size=1024 * 1024, threads=2
+        )
+        result_file = folder.result_file("reads").get()
+
+        downloaded = result_file.download(filename=os.path.join(self.tmpdir.name, "download.bin"))
+        with open(downloaded, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+
+class TestRecordReplayTransport(StandInTestCase):
+    """Test that a recorded session can be replayed offline."""
+
+    def test_record_then_replay(self):
+        """Test that replaying a cassette returns the recorded responses."""
+        cassette = os.path.join(self.tmpdir.name, "cassette.json")
+        recording_knex = Knex(self.server.url, transport=RecordingTransport(cassette))
+        recording_knex.add_api_token("stand-in-token")
+        proj = Organization(recording_knex, "org").idem().project("proj").idem()
+        proj.sample("s1").idem()
+        recording_knex.close()
+
+        # nothing listens on the discard port, replays must not touch the network
+        replay_knex = Knex("http://127.0.0.1:9", transport=ReplayTransport(cassette))
+        replay_knex.add_api_token("stand-in-token")
+        replayed = Organization(replay_knex, "org").idem().project("proj").idem()
+        self.assertEqual(replayed.uuid, proj.uuid)
+        replayed.sample("s1").idem()
+        with self.assertRaises(CassetteMismatchError):
+            replayed.sample("never recorded").idem()
+
+    def test_recordings_are_merged(self):
+        """Test that knexes recording to one cassette add to it rather than overwrite it."""
+        cassette = os.path.join(self.tmpdir.name, "cassette.json")
+        for org_name in ("org 1", "org 2"):
+            transport = RecordingTransport(cassette)
+            knex = Knex(self.server.url, transport=pickle.loads(pickle.dumps(transport)))
+            knex.add_api_token("stand-in-token")
+            Organization(knex, org_name).idem()
+            knex.transport.save()
+            knex.transport.save()  # saving twice does not add interactions twice
+        with open(cassette) as f:
+            urls = [interaction["request"]["url"] for interaction in json.load(f)["interactions"]]
+        self.assertEqual(urls.count("nested/org 1"), 1)
+        self.assertEqual(urls.count("nested/org 2"), 1)
+
+    def test_saved_at_exit(self):
+        """Test that a process that never closes its knex still writes its cassette."""
+        cassette = os.path.join(self.tmpdir.name, "cassette.json")
+        script = (
+            "from geoseeq import Knex, Organization\n"
+            f"knex = Knex({self.server.url!r})\n"
+            "knex.add_api_token('stand-in-token')\n"
+            "Organization(knex, 'org').idem()\n"
+        )
+        env = dict(os.environ, GEOSEEQ_CASSETTE=cassette, GEOSEEQ_CASSETTE_MODE="record", USE_GEOSEEQ_CACHE="false")
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+        with open(cassette) as f:
+            self.assertGreater(len(json.load(f)["interactions"]), 0)
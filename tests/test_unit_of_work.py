@@ -0,0 +1,98 @@
+"""Test suite for batching creates and saves with knex.batch()."""
+import threading
+
+from geoseeq import Organization
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestBatch(StandInTestCase):
+    """Test that creates and saves in a batch go through the bulk endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        self.proj = Organization(self.knex, "org").idem().project("proj").idem()
+        self.server.reset_requests()
+
+    def request_paths(self, method=None):
+        return [
+            path.split("?")[0].replace("/api/", "")
+            for request_method, path in self.server.requests
+            if method is None or request_method == method
+        ]
+
+    def test_bulk_creates_in_order(self):
+        """Test that samples, folders and files are created in chunks, parents first."""
+        samples, folders, files = [], [], []
+        with self.knex.batch(chunk_size=2):
+            for i in range(5):
+                sample = self.proj.sample(f"sample {i}").idem()
+                folder = sample.result_folder("module").idem()
+                files.append(folder.result_file("reads").idem())
+                samples.append(sample)
+                folders.append(folder)
+            self.assertEqual(self.server.requests, [])
+        expected = ["bulk_samples"] * 3 + ["bulk_sample_results"] * 3 + ["bulk_sample_result_fields"] * 3
+        self.assertEqual(self.request_paths(), expected)
+        for obj in samples + folders + files:
+            self.assertIsNotNone(obj.uuid)
+            self.assertTrue(obj._already_fetched)
+        self.assertEqual(files[0].parent.uuid, folders[0].uuid)
+        self.assertEqual(self.proj.sample("sample 4").get().uuid, samples[4].uuid)
+
+    def test_existing_objects_are_fetched(self):
+        """Test that objects that already exist are loaded from the server."""
+        existing = self.proj.sample("sample 0").idem()
+        self.knex.identity_map.clear()
+        with self.knex.batch():
+            samples = [self.proj.sample(f"sample {i}").idem() for i in range(2)]
+        self.assertEqual(samples[0].uuid, existing.uuid)
+        self.assertIsNotNone(samples[1].uuid)
+
+    def test_saves_are_deferred(self):
+        """Test that saves are sent when the block exits."""
+        sample = self.proj.sample("sample").idem()
+        self.server.reset_requests()
+        with self.knex.batch():
+            sample.metadata["site"] = "a"
+            sample.save()
+            self.assertEqual(self.server.requests, [])
+        self.assertEqual(self.request_paths("PATCH"), [f"samples/{sample.uuid}"])
+
+    def test_save_of_existing_object_with_queued_create(self):
+        """Test that a save folded into the create of an object that already existed is sent as a PATCH."""
+        self.proj.sample("sample", metadata={"site": "a"}).idem()
+        self.knex.identity_map.clear()
+        self.server.reset_requests()
+        with self.knex.batch():
+            sample = self.proj.sample("sample").idem()
+            sample.metadata = {"site": "b"}
+            sample.save()
+        self.assertEqual(self.request_paths("PATCH"), [f"samples/{sample.uuid}"])
+        self.assertEqual(sample.dirty_fields(), [])
+        self.knex.identity_map.clear()
+        self.assertEqual(self.proj.sample("sample").get().metadata, {"site": "b"})
+
+    def test_error_discards_queue(self):
+        """Test that nothing is sent if the block raises."""
+        with self.assertRaises(ValueError):
+            with self.knex.batch():
+                sample = self.proj.sample("sample").idem()
+                raise ValueError()
+        self.assertEqual(self.server.requests, [])
+        self.assertIsNone(sample.uuid)
+        self.assertIsNone(self.knex.active_batch)
+
+    def test_other_threads_are_not_batched(self):
+        """Test that creates on other threads are sent at once, not queued in this thread's batch."""
+        created = {}
+
+        def create_elsewhere():
+            created["sample"] = self.proj.sample("elsewhere").idem()
+
+        with self.knex.batch() as batch:
+            thread = threading.Thread(target=create_elsewhere)
+            thread.start()
+            thread.join()
+            self.assertIsNotNone(created["sample"].uuid)
+            self.assertEqual(len(batch), 0)
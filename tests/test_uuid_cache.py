@@ -0,0 +1,67 @@
+"""Test suite for caching blobs under their UUIDs."""
+import os
+from unittest import mock
+
+from geoseeq import GeoseeqNotFoundError, Knex, Organization
+from geoseeq.id_constructors import (
+    result_file_from_uuid,
+    result_folder_from_uuid,
+    sample_from_uuid,
+)
+
+from .test_stand_in_server import StandInTestCase
+
+
+class TestUUIDCache(StandInTestCase):
+    """Test that UUID lookups and name lookups share cached blobs."""
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {"USE_GEOSEEQ_CACHE": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.knex = Knex(self.server.url, cache="memory")
+        self.knex.add_api_token("stand-in-token")
+        self.addCleanup(self.knex.close)
+        self.org = Organization(self.knex, "org").idem()
+        self.proj = self.org.project("proj").idem()
+        self.sample = self.proj.sample("sample").idem()
+        self.folder = self.sample.result_folder("module").idem()
+        self.result_file = self.folder.result_file("reads").idem()
+
+    def test_uuid_lookup_is_cached(self):
+        """Test that looking up a sample by UUID twice sends one request."""
+        self.server.reset_requests()
+        sample_from_uuid(self.knex, self.sample.uuid)
+        sample = sample_from_uuid(self.knex, self.sample.uuid)
+        self.assertEqual(sample.name, "sample")
+        self.assertEqual(sample.lib.name, "proj")
+        self.assertEqual(self.server.requests, [("GET", f"/api/samples/{self.sample.uuid}")])
+
+    def test_uuid_lookup_uses_blob_cached_by_name(self):
+        """Test that a sample fetched by name is then found by UUID without a request."""
+        self.proj.sample("sample").get()
+        self.server.reset_requests()
+        sample = sample_from_uuid(self.knex, self.sample.uuid)
+        self.assertEqual(sample.uuid, self.sample.uuid)
+        self.assertEqual(self.server.requests, [])
+
+    def test_parents_are_cached(self):
+        """Test that a UUID lookup caches the parent blobs nested in the response."""
+        knex = Knex(self.server.url, cache="memory")
+        knex.add_api_token("stand-in-token")
+        self.addCleanup(knex.close)
+        result_file_from_uuid(knex, self.result_file.uuid)
+        self.server.reset_requests()
+        folder = result_folder_from_uuid(knex, self.folder.uuid)
+        sample = Organization(knex, "org").project("proj").sample("sample").get()
+        self.assertEqual(folder.uuid, self.folder.uuid)
+        self.assertEqual(sample.uuid, self.sample.uuid)
+        self.assertEqual(self.server.requests, [])
+
+    def test_delete_evicts_uuid_entry(self):
+        """Test that deleting a sample evicts the blob cached under its UUID."""
+        sample_from_uuid(self.knex, self.sample.uuid)
+        self.sample.delete()
+        with self.assertRaises(GeoseeqNotFoundError):
+            sample_from_uuid(self.knex, self.sample.uuid)